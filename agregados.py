@@ -0,0 +1,172 @@
+"""
+agregados.py
+============
+Agregados nacionales precalculados por provincia × bandera × producto × horario:
+mediana, mínimo, máximo, percentiles 10/25/75/90 y cantidad de estaciones.
+
+Se calculan una sola vez por dataset, sobre el snapshot columnar: primero el
+registro vigente de cada (idempresa, idproducto, idtipohorario), como el
+changefeed, y después un único groupby sobre las columnas categóricas. Cada
+grupo se calcula también con empresabandera = TODAS (la mediana provincial de
+todas las banderas).
+
+El resultado es una tabla chica (miles de filas) que se guarda por día en
+data/cache/agregados/AAAA-MM-DD.csv (se conservan las últimas CONSERVAR;
+ultimo.json apunta a la vigente). Los reportes la consultan para comparar
+una estación con su provincia sin volver a agregar el dataset.
+
+Uso:
+  python agregados.py                                     resumen de la última tabla
+  python agregados.py --provincia "BUENOS AIRES" --producto "Nafta (súper) entre 92 y 95 Ron"
+"""
+
+import argparse
+import glob
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from cambios import vigentes
+from snapshot import DIR_SNAPSHOT, cargar_snapshot, leer_meta_snapshot
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA        = "data"
+DIR_AGREGADOS   = os.path.join(DIR_DATA, "cache", "agregados")
+ARCHIVO_ULTIMO  = os.path.join(DIR_AGREGADOS, "ultimo.json")
+
+CONSERVAR = 90
+
+COLUMNAS_GRUPO = ['provincia', 'empresabandera', 'producto', 'tipohorario']
+COLUMNAS_LECTURA = COLUMNAS_GRUPO + ['idempresa', 'idproducto', 'idtipohorario', 'precio', 'fecha_vigencia']
+PERCENTILES = (0.10, 0.25, 0.75, 0.90)
+COLUMNAS_AGREGADOS = COLUMNAS_GRUPO + ['estaciones', 'mediana', 'minimo', 'maximo'] + [
+    f"p{int(q * 100)}" for q in PERCENTILES]
+TODAS = 'TODAS'
+
+
+def _agregar(df: pd.DataFrame, grupo: list) -> pd.DataFrame:
+    agrupado = df.groupby(grupo, observed=True, sort=False)
+    tabla = agrupado.agg(estaciones=('idempresa', 'nunique'), mediana=('precio', 'median'),
+                         minimo=('precio', 'min'), maximo=('precio', 'max'))
+    percentiles = agrupado['precio'].quantile(list(PERCENTILES)).unstack()
+    percentiles.columns = [f"p{int(q * 100)}" for q in percentiles.columns]
+    return tabla.join(percentiles).reset_index()
+
+
+def calcular_agregados(df: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de agregados (columnas de COLUMNAS_AGREGADOS) de un dataset ya tipado."""
+    df = vigentes(df).reset_index(drop=True)
+    df = df[df['precio'].notna() & (df['precio'] > 0)]
+    por_bandera = _agregar(df, COLUMNAS_GRUPO)
+    sin_bandera = [c for c in COLUMNAS_GRUPO if c != 'empresabandera']
+    todas = _agregar(df, sin_bandera).assign(empresabandera=TODAS)
+    tabla = pd.concat([por_bandera.astype({c: str for c in COLUMNAS_GRUPO}),
+                       todas.astype({c: str for c in sin_bandera})], ignore_index=True)
+    tabla = tabla[COLUMNAS_AGREGADOS].sort_values(COLUMNAS_GRUPO, kind='stable').reset_index(drop=True)
+    return tabla.round({c: 2 for c in COLUMNAS_AGREGADOS[len(COLUMNAS_GRUPO) + 1:]})
+
+
+def leer_ultimo() -> dict:
+    """Metadatos de la última tabla (sha256, archivo, filas, creado) o {}."""
+    try:
+        with open(ARCHIVO_ULTIMO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def actualizar_agregados(sha256: str) -> pd.DataFrame | None:
+    """
+    Agregados del dataset `sha256`. Se calculan una sola vez por dataset; las
+    corridas siguientes leen la tabla guardada. None si el snapshot vigente no
+    es ese dataset.
+    """
+    meta = leer_ultimo()
+    if meta.get('sha256') == sha256 and os.path.exists(meta.get('archivo', '')):
+        return cargar_agregados(meta['archivo'])
+    meta_snapshot = leer_meta_snapshot(DIR_SNAPSHOT)
+    if meta_snapshot.get('sha256') != sha256:
+        return None
+
+    columnas = [c for c in COLUMNAS_LECTURA if c in meta_snapshot.get('columnas', {})]
+    tabla = calcular_agregados(cargar_snapshot(columnas))
+    os.makedirs(DIR_AGREGADOS, exist_ok=True)
+    # Una tabla por día: si hay dos datasets el mismo día (modo demonio), queda el último
+    archivo = os.path.join(DIR_AGREGADOS, f"{datetime.now():%Y-%m-%d}.csv")
+    tmp = archivo + ".tmp"
+    tabla.to_csv(tmp, index=False)
+    os.replace(tmp, archivo)
+    meta = {"sha256": sha256, "archivo": archivo, "filas": len(tabla),
+            "creado": datetime.now().isoformat(timespec="seconds")}
+    tmp = ARCHIVO_ULTIMO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ARCHIVO_ULTIMO)
+
+    for viejo in sorted(glob.glob(os.path.join(DIR_AGREGADOS, "????-??-??.csv")))[:-CONSERVAR]:
+        os.remove(viejo)
+    return tabla
+
+
+def cargar_agregados(ruta: str | None = None) -> pd.DataFrame:
+    """Lee una tabla de agregados guardada (por defecto, la última)."""
+    ruta = ruta or leer_ultimo()['archivo']
+    return pd.read_csv(ruta, dtype={c: str for c in COLUMNAS_GRUPO}, keep_default_na=False)
+
+
+def _normalizar(texto) -> str:
+    return str(texto).strip().casefold()
+
+
+def buscar_agregado(tabla: pd.DataFrame, provincia, empresabandera, producto, tipohorario) -> pd.Series | None:
+    """Fila de la tabla para ese grupo (empresabandera=TODAS para toda la provincia), o None."""
+    mascara = pd.Series(True, index=tabla.index)
+    for col, valor in zip(COLUMNAS_GRUPO, (provincia, empresabandera, producto, tipohorario)):
+        mascara &= tabla[col].str.strip().str.casefold() == _normalizar(valor)
+    filas = tabla[mascara]
+    return filas.iloc[0] if len(filas) else None
+
+
+def contexto_provincial(tabla: pd.DataFrame, registro) -> str:
+    """Una línea para el reporte: la estación contra la mediana de su provincia (y de su bandera)."""
+    claves = (registro['provincia'], registro['producto'], registro['tipohorario'])
+    provincia = buscar_agregado(tabla, claves[0], TODAS, *claves[1:])
+    if provincia is None or int(provincia['estaciones']) < 2:
+        return ""
+    precio = float(registro['precio'])
+    diff = (precio - provincia['mediana']) / provincia['mediana'] * 100
+    linea = (f"📍 Mediana en {str(registro['provincia']).strip().title()}: ${provincia['mediana']:,.2f} "
+             f"({diff:+.1f}% la nuestra)")
+    bandera = buscar_agregado(tabla, claves[0], registro['empresabandera'], *claves[1:])
+    if bandera is not None and int(bandera['estaciones']) >= 2:
+        linea += f"; {registro['empresabandera']}: ${bandera['mediana']:,.2f}"
+    return linea
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregados nacionales por provincia, bandera y producto.")
+    parser.add_argument("--provincia", help="solo esta provincia")
+    parser.add_argument("--producto", help="solo este producto")
+    parser.add_argument("--horario", default="Diurno")
+    parser.add_argument("--limite", type=int, default=30)
+    args = parser.parse_args()
+
+    meta = leer_ultimo()
+    if not os.path.exists(meta.get('archivo', '')):
+        print(f"ℹ️ No hay agregados en {DIR_AGREGADOS}. Corré nafta_tracker.py.")
+        raise SystemExit(0)
+    tabla = cargar_agregados(meta['archivo'])
+    tabla = tabla[tabla['tipohorario'].str.casefold() == _normalizar(args.horario)]
+    if args.provincia:
+        tabla = tabla[tabla['provincia'].str.casefold() == _normalizar(args.provincia)]
+    if args.producto:
+        tabla = tabla[tabla['producto'].str.casefold() == _normalizar(args.producto)]
+    else:
+        tabla = tabla[tabla['empresabandera'] == TODAS]
+    print(f"📊 Agregados {meta['archivo']} ({meta.get('filas', len(tabla))} grupos, dataset {meta['sha256'][:12]})")
+    for _, fila in tabla.head(args.limite).iterrows():
+        print(f"   {fila['provincia'][:20]:<20} {fila['empresabandera'][:16]:<16} {fila['producto'][:32]:<32} "
+              f"{int(fila['estaciones']):>5}  mediana ${fila['mediana']:>10,.2f}  "
+              f"[{fila['minimo']:,.2f} – {fila['maximo']:,.2f}]")
@@ -0,0 +1,296 @@
+"""
+analitica.py
+============
+Estadísticas rodantes incrementales de una serie de precios (ARS o USD):
+
+  - variación a 7/30/90/365 días (contra el último registro de hace N días o
+    antes; si la serie es más corta, contra el registro más antiguo)
+  - media móvil de cada ventana
+  - volatilidad: desvío estándar de los retornos logarítmicos diarios (%)
+  - días desde el último cambio de precio
+
+Cada ventana guarda un "ancla" (último registro que quedó fuera) y sumas
+acumuladas (valores, retornos y sus cuadrados). Agregar un registro suma sus
+aportes y corre el ancla de cada ventana hacia adelante restando lo que sale:
+O(1) amortizado, sin releer el histórico. Solo se conservan los registros de
+la ventana más larga.
+
+El estado se guarda en data/cache/analitica/ (un JSON por CSV y columna),
+junto con el resumen ya calculado para que reportes y consultas externas lo
+lean directo. sincronizar() lo valida contra la serie completa en O(1) y solo
+procesa las filas nuevas; si el histórico se reescribió, lo reconstruye.
+Solo usa la biblioteca estándar.
+
+Uso:
+  python analitica.py           resumen de todas las series guardadas
+  python analitica.py --json    el mismo resumen en JSON
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+from collections import deque
+from datetime import date, timedelta
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA      = "data"
+DIR_ANALITICA = os.path.join(DIR_DATA, "cache", "analitica")
+
+VENTANAS = (7, 30, 90, 365)
+VERSION  = 1
+
+
+def _ruta_estado(ruta_csv: str, columna: str) -> str:
+    nombre = os.path.normpath(ruta_csv).replace(os.sep, "__")
+    return os.path.join(DIR_ANALITICA, f"{nombre}__{columna}.json")
+
+
+def _a_fecha(texto: str) -> date | None:
+    try:
+        return date.fromisoformat(str(texto)[:10])
+    except ValueError:
+        return None
+
+
+def _a_float(valor) -> float | None:
+    """float o None (vacío, no numérico o NaN)."""
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(valor) else valor
+
+
+def _ventana_vacia() -> dict:
+    return {"ancla": None, "suma": 0.0, "n": 0, "suma_r": 0.0, "suma_r2": 0.0, "n_r": 0}
+
+
+class SerieRodante:
+    """Estado incremental de una serie (fecha ISO, valor) en orden cronológico."""
+
+    def __init__(self, ruta_csv: str = "", columna: str = "precio", ventanas: tuple = VENTANAS):
+        self.ruta_csv = ruta_csv
+        self.columna = columna
+        self.ventanas = tuple(sorted(ventanas))
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        self.filas = 0               # registros de la serie consumidos (válidos o no)
+        self.ultima = None           # último registro consumido, para validar contra la fuente
+        self.entradas = deque()      # [fecha, valor, retorno] de la ventana más larga (+ anclas)
+        self.base = 0                # índice absoluto de entradas[0]
+        self.ultimo_cambio = None
+        self.estado = {w: _ventana_vacia() for w in self.ventanas}
+
+    # ── Actualización ────────────────────────────────────────────────────────
+    def agregar(self, fecha: str, valor) -> None:
+        """Incorpora un registro. Fechas o valores inválidos se cuentan pero no se usan."""
+        valor = _a_float(valor)
+        self.filas += 1
+        self.ultima = [fecha, valor]
+        dia = _a_fecha(fecha)
+        if dia is None or valor is None:
+            return
+
+        previo = self.entradas[-1][1] if self.entradas else None
+        retorno = math.log(valor / previo) if previo and previo > 0 and valor > 0 else None
+        if previo is None or valor != previo:
+            self.ultimo_cambio = fecha
+        self.entradas.append([fecha, valor, retorno])
+
+        for w in self.ventanas:
+            st = self.estado[w]
+            self._sumar(st, valor, retorno, +1)
+            # Todo registro con fecha <= límite queda fuera de la ventana; el último de ellos es el ancla
+            limite = str(dia - timedelta(days=w))
+            siguiente = (st["ancla"] + 1) if st["ancla"] is not None else self.base
+            while siguiente - self.base < len(self.entradas) and self.entradas[siguiente - self.base][0] <= limite:
+                _, v, r = self.entradas[siguiente - self.base]
+                self._sumar(st, v, r, -1)
+                st["ancla"] = siguiente
+                siguiente += 1
+
+        # Se descartan los registros anteriores al ancla de la ventana más larga
+        ancla_min = self.estado[self.ventanas[-1]]["ancla"]
+        while ancla_min is not None and self.base < ancla_min:
+            self.entradas.popleft()
+            self.base += 1
+
+    @staticmethod
+    def _sumar(st: dict, valor: float, retorno, signo: int) -> None:
+        st["suma"] += signo * valor
+        st["n"] += signo
+        if retorno is not None:
+            st["suma_r"] += signo * retorno
+            st["suma_r2"] += signo * retorno * retorno
+            st["n_r"] += signo
+
+    def sincronizar(self, fechas: list, valores: list) -> int:
+        """
+        Alinea el estado con la serie completa (fechas, valores). Si el estado es un
+        prefijo de la serie solo procesa las filas nuevas; si no, la reconstruye.
+        Devuelve cuántas filas se procesaron.
+        """
+        n = len(fechas)
+        previa = self.filas
+        prefijo = previa <= n and (previa == 0 or (
+            fechas[previa - 1] == self.ultima[0] and _a_float(valores[previa - 1]) == self.ultima[1]))
+        if not prefijo:
+            self.reiniciar()
+        for i in range(self.filas, n):
+            self.agregar(fechas[i], valores[i])
+        return n - (previa if prefijo else 0)
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+    def _entrada(self, indice: int) -> list:
+        return self.entradas[indice - self.base]
+
+    def actual(self) -> list | None:
+        return self.entradas[-1] if self.entradas else None
+
+    def delta(self, dias: int) -> dict | None:
+        """Variación contra el último registro de hace `dias` días o antes (o el más antiguo)."""
+        actual = self.actual()
+        if actual is None:
+            return None
+        ancla = self.estado[dias]["ancla"]
+        desde = self._entrada(ancla) if ancla is not None else self.entradas[0]
+        diff = actual[1] - desde[1]
+        return {
+            "desde": desde[0],
+            "valor_desde": desde[1],
+            "dias": (_a_fecha(actual[0]) - _a_fecha(desde[0])).days,
+            "completa": ancla is not None,
+            "diff": diff,
+            "pct": diff / desde[1] * 100 if desde[1] else None,
+        }
+
+    def media(self, dias: int) -> float | None:
+        st = self.estado[dias]
+        return st["suma"] / st["n"] if st["n"] else None
+
+    def volatilidad(self, dias: int) -> float | None:
+        """Desvío estándar muestral de los retornos log diarios de la ventana, en %."""
+        st = self.estado[dias]
+        if st["n_r"] < 2:
+            return None
+        media = st["suma_r"] / st["n_r"]
+        varianza = max(0.0, (st["suma_r2"] - st["n_r"] * media * media) / (st["n_r"] - 1))
+        return math.sqrt(varianza) * 100
+
+    def dias_sin_cambio(self) -> int | None:
+        actual = self.actual()
+        if actual is None or self.ultimo_cambio is None:
+            return None
+        return (_a_fecha(actual[0]) - _a_fecha(self.ultimo_cambio)).days
+
+    def resumen(self) -> dict:
+        actual = self.actual()
+        return {
+            "csv": self.ruta_csv,
+            "columna": self.columna,
+            "fecha": actual[0] if actual else None,
+            "valor": actual[1] if actual else None,
+            "ultimo_cambio": self.ultimo_cambio,
+            "dias_sin_cambio": self.dias_sin_cambio(),
+            "ventanas": {
+                str(w): {
+                    "delta": self.delta(w),
+                    "media": self.media(w),
+                    "volatilidad_pct": self.volatilidad(w),
+                    "registros": self.estado[w]["n"],
+                } for w in self.ventanas
+            },
+        }
+
+    # ── Persistencia ─────────────────────────────────────────────────────────
+    def a_dict(self) -> dict:
+        return {
+            "version": VERSION,
+            "csv": self.ruta_csv,
+            "columna": self.columna,
+            "filas": self.filas,
+            "ultima": self.ultima,
+            "base": self.base,
+            "entradas": list(self.entradas),
+            "ultimo_cambio": self.ultimo_cambio,
+            "ventanas": {str(w): st for w, st in self.estado.items()},
+            "resumen": self.resumen(),
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "SerieRodante":
+        serie = cls(datos["csv"], datos["columna"], tuple(int(w) for w in datos["ventanas"]))
+        serie.filas = datos["filas"]
+        serie.ultima = datos["ultima"]
+        serie.base = datos["base"]
+        serie.entradas = deque(datos["entradas"])
+        serie.ultimo_cambio = datos["ultimo_cambio"]
+        serie.estado = {int(w): st for w, st in datos["ventanas"].items()}
+        return serie
+
+    def guardar(self) -> None:
+        ruta = _ruta_estado(self.ruta_csv, self.columna)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tmp = ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.a_dict(), f, ensure_ascii=False)
+        os.replace(tmp, ruta)
+
+
+def cargar_serie(ruta_csv: str, columna: str = "precio") -> SerieRodante:
+    """Estado guardado de la serie (o uno vacío si no existe o es de otra versión)."""
+    ruta = _ruta_estado(ruta_csv, columna)
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        if datos.get("version") == VERSION and tuple(sorted(int(w) for w in datos["ventanas"])) == VENTANAS:
+            return SerieRodante.desde_dict(datos)
+    except (OSError, ValueError, KeyError):
+        pass
+    return SerieRodante(ruta_csv, columna)
+
+
+def actualizar_serie(ruta_csv: str, columna: str, fechas: list, valores: list) -> SerieRodante:
+    """Carga el estado, le incorpora lo nuevo de (fechas, valores) y lo guarda si cambió."""
+    serie = cargar_serie(ruta_csv, columna)
+    if serie.sincronizar(fechas, valores) or not os.path.exists(_ruta_estado(ruta_csv, columna)):
+        serie.guardar()
+    return serie
+
+
+def resumenes() -> list:
+    """Resúmenes precalculados de todas las series guardadas (sin recalcular nada)."""
+    salida = []
+    for ruta in sorted(glob.glob(os.path.join(DIR_ANALITICA, "*.json"))):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                salida.append(json.load(f)["resumen"])
+        except (OSError, ValueError, KeyError):
+            continue
+    return salida
+
+
+def _fmt(valor, patron: str = "{:,.2f}") -> str:
+    return "-" if valor is None else patron.format(valor)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estadísticas rodantes de los históricos.")
+    parser.add_argument("--json", action="store_true", help="imprimir los resúmenes en JSON")
+    args = parser.parse_args()
+
+    datos = resumenes()
+    if args.json:
+        print(json.dumps(datos, indent=2, ensure_ascii=False))
+    elif not datos:
+        print(f"ℹ️ No hay estadísticas en {DIR_ANALITICA}. Corré nafta_tracker.py.")
+    for r in ([] if args.json else datos):
+        print(f"\n📈 {r['csv']} [{r['columna']}] — {r['fecha']}: {_fmt(r['valor'], '{:,.4f}')}")
+        print(f"   Último cambio: {r['ultimo_cambio']} ({_fmt(r['dias_sin_cambio'], '{}')} días)")
+        for w, v in r["ventanas"].items():
+            d = v["delta"] or {}
+            print(f"   {w:>3}d  Δ {_fmt(d.get('pct'), '{:+.2f}%'):>9}  media {_fmt(v['media'], '{:,.4f}'):>12}"
+                  f"  vol {_fmt(v['volatilidad_pct'], '{:.3f}%'):>8}")
@@ -0,0 +1,280 @@
+"""
+api.py
+======
+API HTTP de solo lectura sobre los históricos, servida desde memoria.
+
+Cada histórico (ARS de cada objetivo y el CSV en USD) se carga una vez en una
+copia indexada por fecha, con sus estadísticas rodantes (analitica.py). Cuando
+el CSV crece solo se leen los bytes agregados (LectorIncremental, el mismo de
+normalizado.py); si se reescribió, se vuelve a cargar completo. El disco se
+consulta como mucho cada INTERVALO_REFRESCO segundos, no en cada pedido.
+
+Las respuestas llevan ETag (versión de los datos), Last-Modified y
+Cache-Control: un cliente que revalida con If-None-Match recibe 304 sin
+cuerpo. Los cuerpos ya serializados se guardan hasta que cambian los datos.
+
+Endpoints (JSON; `serie` es el nombre del CSV sin .csv, por defecto el principal):
+  GET /series                                   series disponibles
+  GET /ultimo?serie=historico_precios           último precio
+  GET /historico?serie=...&desde=AAAA-MM-DD&hasta=AAAA-MM-DD
+  GET /usd?desde=...&hasta=...                  serie en USD (A3500)
+  GET /mensual?serie=...                        comparativa a 30 días
+  GET /estadisticas?serie=...                   variaciones, medias y volatilidad por ventana
+
+Las recargas se miden (metricas.py) en data/cache/metricas_api.jsonl, no en
+data/metricas.jsonl: ese archivo es de las corridas y se versiona, y la API
+no escribe nada de lo que se commitea.
+
+Solo usa la biblioteca estándar.
+
+Uso:
+  python api.py [--host 127.0.0.1] [--puerto 8000]
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from analitica import cargar_serie
+from configuracion import ARCHIVO_HISTORICO
+from metricas import etapa, usar_archivo
+from normalizado import ARCHIVO_USD, LectorIncremental, historicos_existentes
+
+INTERVALO_REFRESCO = 2.0   # segundos entre chequeos de los CSV
+MAX_AGE            = 60    # Cache-Control para los clientes
+DIAS_MENSUAL       = 30
+
+ARCHIVO_METRICAS_API = os.path.join("data", "cache", "metricas_api.jsonl")
+
+
+def _a_float(valor) -> float | None:
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if valor != valor else valor
+
+
+def nombre_serie(ruta: str) -> str:
+    return os.path.splitext(os.path.basename(ruta))[0]
+
+
+class SerieEnMemoria:
+    """Copia en memoria de un histórico, ordenada por fecha, que se actualiza leyendo solo lo nuevo."""
+
+    def __init__(self, ruta: str, columna: str = "precio"):
+        self.ruta = ruta
+        self.columna = columna
+        self.nombre = nombre_serie(ruta)
+        self._estado = {}
+        self._firma = None
+        self.fechas = []         # fecha de comparación (fecha_chequeo o fecha_vigencia), ordenada
+        self.filas = []          # dict por fila, alineadas con self.fechas
+        self.version = ""
+        self.modificado = 0.0
+        self.rodante = None
+
+    def refrescar(self) -> bool:
+        """Incorpora lo que cambió en el CSV. Devuelve True si hubo cambios."""
+        try:
+            st = os.stat(self.ruta)
+        except OSError:
+            return False
+        firma = (st.st_size, st.st_mtime_ns)
+        if firma == self._firma:
+            return False
+        with etapa("api_recarga", serie=self.nombre) as m:
+            completo, nuevas = LectorIncremental(self.ruta, self._estado).leer()
+            if completo:
+                self.fechas, self.filas, self.rodante = [], [], None
+            for fila in nuevas:
+                self._agregar(fila)
+            if self.rodante is None:
+                # El estado persistido por la corrida diaria evita recalcular desde cero
+                self.rodante = cargar_serie(self.ruta, self.columna)
+            self.rodante.sincronizar(self.fechas, [f["valor"] for f in self.filas])
+            m.anotar(completo=completo, filas=len(nuevas), total=len(self.filas))
+        self._firma = firma
+        self.modificado = st.st_mtime
+        self.version = hashlib.sha1(f"{self._estado['bytes']}:{self._estado.get('ultima', '')}"
+                                    .encode("utf-8")).hexdigest()[:16]
+        return True
+
+    def _agregar(self, fila: dict) -> None:
+        chequeo = fila.get("fecha_chequeo") or ""
+        fecha = chequeo or fila.get("fecha_vigencia", "")
+        registro = {
+            "fecha": fecha,
+            "fecha_vigencia": fila.get("fecha_vigencia", ""),
+            "precio": _a_float(fila.get("precio")),
+            "variacion_pct": _a_float(fila.get("%_variacion")),
+            "valor": _a_float(fila.get(self.columna)),
+        }
+        if self.columna != "precio":
+            registro[self.columna] = registro["valor"]
+        # Los históricos se escriben en orden: casi siempre es un append
+        i = bisect.bisect_right(self.fechas, fecha)
+        self.fechas.insert(i, fecha)
+        self.filas.insert(i, registro)
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+    def rango(self, desde: str = "", hasta: str = "") -> list:
+        i = bisect.bisect_left(self.fechas, desde) if desde else 0
+        j = bisect.bisect_right(self.fechas, hasta + "\uffff") if hasta else len(self.fechas)
+        return [{k: v for k, v in f.items() if k != "valor"} for f in self.filas[i:j]]
+
+    def ultimo(self) -> dict | None:
+        if not self.filas:
+            return None
+        fila = {k: v for k, v in self.filas[-1].items() if k != "valor"}
+        fila["dias_sin_cambio"] = self.rodante.dias_sin_cambio()
+        fila["ultimo_cambio"] = self.rodante.ultimo_cambio
+        return fila
+
+
+class Datos:
+    """Todas las series, con refresco acotado y caché de respuestas serializadas."""
+
+    def __init__(self):
+        self.series = {}
+        self._lock = threading.Lock()
+        self._ultimo_refresco = 0.0
+        self._respuestas = {}
+
+    def refrescar(self, forzar: bool = False) -> None:
+        with self._lock:
+            if not forzar and time.monotonic() - self._ultimo_refresco < INTERVALO_REFRESCO:
+                return
+            rutas = {r: "precio" for r in historicos_existentes()}
+            if os.path.exists(ARCHIVO_USD):
+                rutas[ARCHIVO_USD] = "price_usd"
+            cambio = set(rutas) != {s.ruta for s in self.series.values()}
+            self.series = {nombre_serie(r): self.series.get(nombre_serie(r)) or SerieEnMemoria(r, c)
+                           for r, c in rutas.items()}
+            for serie in self.series.values():
+                cambio = serie.refrescar() or cambio
+            if cambio:
+                self._respuestas = {}
+            self._ultimo_refresco = time.monotonic()
+
+    def version(self, nombres: list) -> str:
+        return hashlib.sha1("|".join(f"{n}:{self.series[n].version}" for n in sorted(nombres))
+                            .encode("utf-8")).hexdigest()[:16]
+
+    def modificado(self, nombres: list) -> float:
+        return max((self.series[n].modificado for n in nombres), default=0.0)
+
+    def respuesta(self, ruta: str, consulta: dict) -> tuple:
+        """(estado HTTP, etag, last-modified, cuerpo JSON) de un pedido, cacheado por URL."""
+        clave = (ruta, tuple(sorted((k, v[-1]) for k, v in consulta.items())))
+        en_cache = self._respuestas.get(clave)
+        if en_cache is not None:
+            return en_cache
+        with self._lock:
+            try:
+                nombres, cuerpo = self._resolver(ruta, {k: v[-1] for k, v in consulta.items()})
+                estado = 200
+            except LookupError as e:
+                nombres, cuerpo, estado = [], {"error": str(e)}, 404
+            except ValueError as e:
+                nombres, cuerpo, estado = [], {"error": str(e)}, 400
+            resultado = (estado, f'"{self.version(nombres)}"', self.modificado(nombres),
+                         json.dumps(cuerpo, ensure_ascii=False).encode("utf-8"))
+            if estado == 200:
+                self._respuestas[clave] = resultado
+        return resultado
+
+    def _serie(self, consulta: dict, por_defecto: str = nombre_serie(ARCHIVO_HISTORICO)) -> SerieEnMemoria:
+        nombre = consulta.get("serie", por_defecto)
+        if nombre not in self.series:
+            raise LookupError(f"serie desconocida: {nombre}")
+        return self.series[nombre]
+
+    def _resolver(self, ruta: str, consulta: dict) -> tuple:
+        for clave in ("desde", "hasta"):
+            if consulta.get(clave) and len(consulta[clave]) < 4:
+                raise ValueError(f"{clave} debe ser AAAA-MM-DD (o un prefijo: AAAA, AAAA-MM)")
+        if ruta == "/series":
+            return list(self.series), [
+                {"serie": s.nombre, "csv": s.ruta, "columna": s.columna, "filas": len(s.filas),
+                 "desde": s.fechas[0] if s.fechas else None, "hasta": s.fechas[-1] if s.fechas else None}
+                for s in self.series.values()]
+        if ruta == "/usd":
+            consulta = dict(consulta, serie=nombre_serie(ARCHIVO_USD))
+            ruta = "/historico"
+        serie = self._serie(consulta)
+        if ruta == "/historico":
+            filas = serie.rango(consulta.get("desde", ""), consulta.get("hasta", ""))
+            return [serie.nombre], {"serie": serie.nombre, "filas": filas}
+        if ruta == "/ultimo":
+            return [serie.nombre], {"serie": serie.nombre, **(serie.ultimo() or {})}
+        if ruta == "/mensual":
+            return [serie.nombre], {"serie": serie.nombre, "actual": serie.ultimo(),
+                                    "comparativa": serie.rodante.delta(DIAS_MENSUAL)}
+        if ruta == "/estadisticas":
+            return [serie.nombre], serie.rodante.resumen()
+        raise LookupError(f"ruta desconocida: {ruta}")
+
+
+class Manejador(BaseHTTPRequestHandler):
+    datos: Datos = None
+    server_version = "SubioLaNafta/1"
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        self.datos.refrescar()
+        estado, etag, modificado, cuerpo = self.datos.respuesta(partes.path.rstrip("/") or "/series",
+                                                                 parse_qs(partes.query))
+        etiquetas = [e.strip() for e in self.headers.get("If-None-Match", "").split(",") if e.strip()]
+        if estado == 200 and (etag in etiquetas or "*" in etiquetas):
+            self.send_response(304)
+            self._cabeceras_cache(etag, modificado)
+            self.end_headers()
+            return
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if estado == 200:
+            self._cabeceras_cache(etag, modificado)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _cabeceras_cache(self, etag: str, modificado: float) -> None:
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", f"public, max-age={MAX_AGE}")
+        if modificado:
+            self.send_header("Last-Modified", formatdate(modificado, usegmt=True))
+
+    def log_message(self, formato, *args):
+        # Un log por pedido es demasiado a tasas altas; los errores igual se informan
+        pass
+
+
+def servir(host: str = "127.0.0.1", puerto: int = 8000) -> None:
+    usar_archivo(ARCHIVO_METRICAS_API)
+    datos = Datos()
+    datos.refrescar(forzar=True)
+    Manejador.datos = datos
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    print(f"🌐 API en http://{host}:{puerto}/ ({len(datos.series)} series en memoria)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 API detenida")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP de solo lectura sobre los históricos.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    args = parser.parse_args()
+    servir(args.host, args.puerto)
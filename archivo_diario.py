@@ -0,0 +1,306 @@
+"""
+archivo_diario.py
+=================
+Archivo de todos los datasets nacionales, para volver a ver (o auditar) la
+tabla completa de cualquier día sin guardar el CSV entero cada vez.
+
+La tabla archivada es la del changefeed: el registro vigente de cada
+(idempresa, idproducto, idtipohorario), con todas sus columnas. Se guarda
+una base completa y, por cada dataset siguiente, solo un delta:
+  - alta    la clave no estaba (fila completa)
+  - cambio  cambió cualquier columna de la fila (fila completa)
+  - baja    la clave ya no está (solo la clave)
+
+Para detectar qué cambió no se relee el archivo: data/cache/archivo.npz
+guarda el hash de cada clave y de cada fila del último dataset archivado (si
+falta, se rearma reconstruyendo la última entrada). Lo que se escribe por
+día es proporcional a los cambios, no a estaciones × días.
+
+Reconstruir un día lee la base más cercana hacia atrás y los deltas que la
+siguen, se queda con la última operación de cada clave y la aplica de una
+vez. Para que esa cadena no crezca sin límite se guarda una base nueva
+(re-base) cada REBASE_ENTRADAS entradas o cuando los deltas acumulados desde
+la última superan REBASE_FRACCION de las filas de la tabla.
+
+Todo vive en data/archivo/ (CSV comprimidos + indice.json) y se commitea con
+los históricos.
+
+Uso:
+  python archivo_diario.py                                 entradas del archivo
+  python archivo_diario.py --fecha 2026-03-01 --salida tabla.csv
+  python archivo_diario.py --verificar                     la última reconstrucción contra el estado
+  python archivo_diario.py --rebase                        fuerza una base con la última tabla
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cambios import COLUMNAS_CLAVE, vigentes
+from snapshot import COLUMNAS_FECHA, COLUMNAS_FLOAT, DIR_SNAPSHOT, cargar_snapshot, leer_meta_snapshot
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA       = "data"
+DIR_ARCHIVO    = os.path.join(DIR_DATA, "archivo")
+ARCHIVO_INDICE = os.path.join(DIR_ARCHIVO, "indice.json")
+ARCHIVO_ESTADO = os.path.join(DIR_DATA, "cache", "archivo.npz")
+
+REBASE_ENTRADAS = 30
+REBASE_FRACCION = 0.25
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+
+# ── TABLA ─────────────────────────────────────────────────────────────────────
+def normalizar_tabla(df: pd.DataFrame, columnas: list) -> pd.DataFrame:
+    """Texto como str ('' en lugar de NaN), en el orden de `columnas`: así se escribe y se hashea."""
+    salida = {}
+    for col in columnas:
+        serie = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        if col in COLUMNAS_FLOAT:
+            salida[col] = pd.to_numeric(serie, errors='coerce').astype(np.float64)
+        elif col in COLUMNAS_FECHA:
+            salida[col] = pd.to_datetime(serie, errors='coerce')
+        else:
+            salida[col] = serie.astype(object).where(serie.notna(), '').astype(str)
+    return pd.DataFrame(salida, index=df.index)
+
+
+def huellas(tabla: pd.DataFrame) -> tuple:
+    """(hash de la clave, hash de la fila completa) de cada fila de una tabla normalizada."""
+    claves = pd.util.hash_pandas_object(tabla[COLUMNAS_CLAVE], index=False).to_numpy()
+    return claves, pd.util.hash_pandas_object(tabla, index=False).to_numpy()
+
+
+def tabla_vigente(df: pd.DataFrame) -> pd.DataFrame:
+    """Registro vigente por clave de un dataset ya tipado, normalizado y ordenado por clave."""
+    columnas = list(df.columns)
+    tabla = normalizar_tabla(vigentes(df).reset_index(drop=True), columnas)
+    return tabla.sort_values(COLUMNAS_CLAVE, kind='stable').reset_index(drop=True)
+
+
+# ── ÍNDICE Y ESTADO ───────────────────────────────────────────────────────────
+def leer_indice() -> dict:
+    """{"columnas": [...], "entradas": [...]} o un índice vacío."""
+    try:
+        with open(ARCHIVO_INDICE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"columnas": [], "entradas": []}
+
+
+def _guardar_json(ruta: str, datos: dict) -> None:
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def _leer_estado(sha256: str) -> dict | None:
+    """Huellas (ordenadas por clave) del último dataset archivado, si el estado corresponde a `sha256`."""
+    try:
+        with np.load(ARCHIVO_ESTADO) as datos:
+            if str(datos['sha256']) != sha256:
+                return None
+            return {c: datos[c] for c in ('claves', 'filas', *COLUMNAS_CLAVE)}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _armar_estado(tabla: pd.DataFrame) -> dict:
+    """Huellas de la tabla ordenadas por clave, con el texto de la clave para poder escribir las bajas."""
+    claves, filas = huellas(tabla)
+    orden = np.argsort(claves, kind='stable')
+    estado = {'claves': claves[orden], 'filas': filas[orden]}
+    for col in COLUMNAS_CLAVE:
+        estado[col] = tabla[col].to_numpy(dtype=str)[orden]
+    return estado
+
+
+def _guardar_estado(sha256: str, estado: dict) -> None:
+    os.makedirs(os.path.dirname(ARCHIVO_ESTADO), exist_ok=True)
+    tmp = ARCHIVO_ESTADO + ".tmp.npz"
+    np.savez(tmp, sha256=np.array(sha256), **estado)
+    os.replace(tmp, ARCHIVO_ESTADO)
+
+
+def _escribir_csv(df: pd.DataFrame, nombre: str) -> str:
+    ruta = os.path.join(DIR_ARCHIVO, nombre)
+    tmp = ruta + ".tmp"
+    df.to_csv(tmp, index=False, date_format=FORMATO_FECHA, compression='gzip')
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def _leer_csv(ruta: str, columnas: list) -> pd.DataFrame:
+    fechas = [c for c in columnas if c in COLUMNAS_FECHA]
+    texto = [c for c in columnas if c not in COLUMNAS_FLOAT and c not in COLUMNAS_FECHA]
+    df = pd.read_csv(ruta, dtype={c: str for c in texto + ['operacion']}, keep_default_na=False,
+                     na_values={c: [''] for c in COLUMNAS_FLOAT + fechas}, compression='gzip')
+    for col in fechas:
+        df[col] = pd.to_datetime(df[col], format=FORMATO_FECHA, errors='coerce')
+    return df
+
+
+# ── ARCHIVAR ──────────────────────────────────────────────────────────────────
+def _desde_base(entradas: list, hasta: int) -> list:
+    """Las entradas que hay que leer para reconstruir `entradas[hasta]`: su base y los deltas siguientes."""
+    inicio = max(i for i in range(hasta + 1) if entradas[i]['tipo'] == 'base')
+    return entradas[inicio:hasta + 1]
+
+
+def _toca_rebase(entradas: list, filas_delta: int, filas_tabla: int) -> bool:
+    if not entradas:
+        return True
+    cadena = _desde_base(entradas, len(entradas) - 1)
+    acumulado = sum(e['filas_delta'] for e in cadena[1:]) + filas_delta
+    return len(cadena) >= REBASE_ENTRADAS or acumulado > REBASE_FRACCION * filas_tabla
+
+
+def archivar_tabla(tabla: pd.DataFrame, sha256: str, fecha: str | None = None, base: bool = False) -> dict:
+    """
+    Agrega al archivo la tabla vigente (normalizada) del dataset `sha256`:
+    un delta contra la última entrada, o una base si toca re-basar. Devuelve la entrada.
+    """
+    indice = leer_indice()
+    entradas = indice['entradas']
+    if entradas and entradas[-1]['sha256'] == sha256 and not base:
+        return entradas[-1]
+    fecha = fecha or f"{datetime.now():%Y-%m-%d}"
+    columnas = list(tabla.columns)
+    if entradas and columnas != indice['columnas']:
+        # El dataset cambió de columnas: los deltas no se pueden aplicar sobre la base vieja
+        base = True
+
+    estado = _armar_estado(tabla)
+    previo = None
+    if entradas and not base:
+        previo = _leer_estado(entradas[-1]['sha256'])
+        if previo is None:
+            previo = _armar_estado(reconstruir(sha256=entradas[-1]['sha256']))
+
+    conteo = {"altas": 0, "cambios": 0, "bajas": 0}
+    delta = None
+    if previo is not None and len(previo['claves']):
+        claves, filas = huellas(tabla)
+        pos = np.searchsorted(previo['claves'], claves).clip(max=len(previo['claves']) - 1)
+        existe = previo['claves'][pos] == claves
+        alta = ~existe
+        cambio = existe & (previo['filas'][pos] != filas)
+        baja = ~np.isin(previo['claves'], claves)
+        conteo = {"altas": int(alta.sum()), "cambios": int(cambio.sum()), "bajas": int(baja.sum())}
+        modificadas = tabla[alta | cambio].assign(operacion=np.where(alta, 'alta', 'cambio')[alta | cambio])
+        bajas = pd.DataFrame({col: previo[col][baja] for col in COLUMNAS_CLAVE}).assign(operacion='baja')
+        delta = pd.concat([modificadas, bajas], ignore_index=True)[['operacion'] + columnas]
+        base = base or _toca_rebase(entradas, len(delta), len(tabla))
+
+    os.makedirs(DIR_ARCHIVO, exist_ok=True)
+    tipo = 'base' if base or delta is None else 'delta'
+    nombre = f"{tipo}_{fecha}_{sha256[:12]}.csv.gz"
+    ruta = _escribir_csv(tabla if tipo == 'base' else delta, nombre)
+    entrada = {"fecha": fecha, "sha256": sha256, "tipo": tipo, "archivo": nombre,
+               "filas": len(tabla), "filas_delta": 0 if delta is None else len(delta), **conteo,
+               "bytes": os.path.getsize(ruta), "creado": datetime.now().isoformat(timespec="seconds")}
+    indice = {"columnas": columnas, "entradas": entradas + [entrada]}
+    _guardar_json(ARCHIVO_INDICE, indice)
+    _guardar_estado(sha256, estado)
+    return entrada
+
+
+def archivar(sha256: str) -> dict | None:
+    """
+    Archiva el dataset `sha256` desde el snapshot vigente, una sola vez por
+    dataset. None si el snapshot vigente no es ese dataset.
+    """
+    entradas = leer_indice()['entradas']
+    if entradas and entradas[-1]['sha256'] == sha256:
+        return entradas[-1]
+    if leer_meta_snapshot(DIR_SNAPSHOT).get('sha256') != sha256:
+        return None
+    return archivar_tabla(tabla_vigente(cargar_snapshot()), sha256)
+
+
+# ── RECONSTRUIR ───────────────────────────────────────────────────────────────
+def _aplicar(cadena: list, columnas: list) -> pd.DataFrame:
+    """Aplica sobre la base (cadena[0]) la última operación de cada clave en los deltas siguientes."""
+    tabla = _leer_csv(os.path.join(DIR_ARCHIVO, cadena[0]['archivo']), columnas)
+    if len(cadena) == 1:
+        return tabla
+    deltas = pd.concat([_leer_csv(os.path.join(DIR_ARCHIVO, e['archivo']), columnas) for e in cadena[1:]],
+                       ignore_index=True)
+    deltas = deltas.assign(_clave=pd.util.hash_pandas_object(deltas[COLUMNAS_CLAVE], index=False).to_numpy())
+    deltas = deltas.drop_duplicates('_clave', keep='last')
+    claves = pd.util.hash_pandas_object(tabla[COLUMNAS_CLAVE], index=False).to_numpy()
+    tabla = tabla[~np.isin(claves, deltas['_clave'].to_numpy())]
+    nuevas = deltas.loc[deltas['operacion'] != 'baja', columnas]
+    tabla = pd.concat([tabla, nuevas], ignore_index=True)
+    return tabla.sort_values(COLUMNAS_CLAVE, kind='stable').reset_index(drop=True)
+
+
+def _posicion(entradas: list, fecha: str | None, sha256: str | None) -> int:
+    if sha256:
+        posiciones = [i for i, e in enumerate(entradas) if e['sha256'] == sha256]
+    else:
+        posiciones = [i for i, e in enumerate(entradas) if fecha is None or e['fecha'] <= fecha]
+    if not posiciones:
+        raise LookupError(f"No hay entradas archivadas para {sha256 or fecha}")
+    return posiciones[-1]
+
+
+def reconstruir(fecha: str | None = None, sha256: str | None = None) -> pd.DataFrame:
+    """
+    Tabla completa archivada del último dataset con fecha <= `fecha` (AAAA-MM-DD),
+    o del dataset `sha256`; sin argumentos, la última. LookupError si no hay.
+    """
+    indice = leer_indice()
+    entradas = indice['entradas']
+    hasta = _posicion(entradas, fecha, sha256)
+    return _aplicar(_desde_base(entradas, hasta), indice['columnas'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivo de datasets nacionales: base + deltas diarios.")
+    parser.add_argument("--fecha", help="reconstruir la tabla de ese día (AAAA-MM-DD)")
+    parser.add_argument("--salida", help="CSV donde escribir la tabla reconstruida")
+    parser.add_argument("--verificar", action="store_true",
+                        help="reconstruir la última entrada y compararla con el estado guardado")
+    parser.add_argument("--rebase", action="store_true", help="guardar una base nueva con la última tabla")
+    args = parser.parse_args()
+
+    indice = leer_indice()
+    entradas = indice['entradas']
+    if not entradas:
+        print(f"ℹ️ No hay nada archivado en {DIR_ARCHIVO}. Corré nafta_tracker.py.")
+        raise SystemExit(0)
+
+    if args.fecha or args.salida:
+        tabla = reconstruir(fecha=args.fecha)
+        print(f"🗄️ Tabla al {args.fecha or entradas[-1]['fecha']}: {len(tabla)} filas")
+        if args.salida:
+            tabla.to_csv(args.salida, index=False, date_format=FORMATO_FECHA)
+            print(f"💾 {args.salida}")
+    elif args.verificar:
+        ultima = entradas[-1]
+        estado = _leer_estado(ultima['sha256'])
+        if estado is None:
+            print("ℹ️ El estado no corresponde a la última entrada; se rearma en el próximo archivo.")
+            raise SystemExit(0)
+        reconstruido = _armar_estado(reconstruir())
+        iguales = all(np.array_equal(reconstruido[c], estado[c]) for c in ('claves', 'filas'))
+        print(f"{'✅' if iguales else '❌'} Reconstrucción de {ultima['fecha']} ({ultima['sha256'][:12]}) "
+              f"{'coincide' if iguales else 'NO coincide'} con el estado")
+        raise SystemExit(0 if iguales else 1)
+    elif args.rebase:
+        entrada = archivar_tabla(reconstruir(), entradas[-1]['sha256'], entradas[-1]['fecha'], base=True)
+        print(f"🗄️ Base nueva: {entrada['archivo']} ({entrada['filas']} filas)")
+    else:
+        total = sum(e['bytes'] for e in entradas)
+        print(f"🗄️ Archivo {DIR_ARCHIVO}: {len(entradas)} entradas, "
+              f"{sum(e['tipo'] == 'base' for e in entradas)} bases, {total / 1e6:.1f} MB")
+        for e in entradas[-30:]:
+            print(f"   {e['fecha']} {e['tipo']:<5} {e['sha256'][:12]}  {e['filas']:>8} filas  "
+                  f"+{e['altas']} ~{e['cambios']} -{e['bajas']}  {e['bytes'] / 1e3:>9.1f} kB")
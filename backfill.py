@@ -0,0 +1,189 @@
+"""
+backfill.py
+===========
+Reconstruye históricos a partir de un directorio de datasets archivados
+(un CSV de precios en surtidor por día), sin repetir main() día por día.
+
+  1. Cada archivo se procesa en un pool de procesos: lectura por bloques y
+     filtro de todos los objetivos a la vez (la misma pasada que nafta_tracker).
+  2. De cada archivo queda el registro vigente de cada objetivo (fecha_vigencia
+     más reciente); la fecha del chequeo es la del nombre del archivo
+     (AAAA-MM-DD o AAAAMMDD en cualquier parte del nombre; si no tiene, la
+     fecha de modificación).
+  3. Los resultados se unen en orden de fecha y nombre de archivo, así que la
+     salida no depende del orden en que terminan los procesos. Si hay dos
+     archivos del mismo día vale el primero, como en las corridas diarias.
+  4. %_variacion se recalcula de una vez sobre la serie completa y el CSV en
+     USD se regenera con usd_sync (conversión as-of vectorizada).
+
+Por defecto las fechas que ya están en el histórico se conservan y solo se
+agregan las que faltan; con --reemplazar el histórico queda solo con lo
+reconstruido.
+
+Uso:
+  python backfill.py archivo/ [--procesos 8] [--desde 2025-01-01] [--hasta 2025-12-31]
+                              [--idempresa 1519 ...] [--reemplazar] [--sin-usd]
+"""
+
+import argparse
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import partial
+
+import pandas as pd
+
+from analitica import actualizar_serie
+from configuracion import ARCHIVO_HISTORICO, OBJETIVO_PRINCIPAL
+from historico import Historico
+from metricas import etapa
+from nafta_tracker import COLUMNAS_DATASET, leer_dataset_por_chunks, tipar_filas
+from objetivos import cargar_objetivos, claves_normalizadas, filtrar_objetivos
+
+PATRON_FECHA = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})')
+COLUMNAS_HISTORICO = COLUMNAS_DATASET + ['%_variacion', 'fecha_chequeo']
+
+
+def fecha_del_archivo(ruta: str) -> date:
+    """Fecha del chequeo que representa un dataset archivado."""
+    coincidencia = PATRON_FECHA.search(os.path.basename(ruta))
+    if coincidencia:
+        try:
+            return date(*(int(g) for g in coincidencia.groups()))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(os.path.getmtime(ruta)).date()
+
+
+def listar_archivos(directorio: str, desde: date | None = None, hasta: date | None = None) -> list:
+    """[(fecha, ruta)] de los datasets del directorio, ordenados por fecha y nombre."""
+    rutas = [r for r in glob.glob(os.path.join(directorio, "*.csv*")) if not r.endswith(".meta.json")]
+    archivos = sorted((fecha_del_archivo(r), os.path.basename(r), r) for r in rutas)
+    return [(f, r) for f, _, r in archivos
+            if (desde is None or f >= desde) and (hasta is None or f <= hasta)]
+
+
+def extraer_objetivos(ruta: str, objetivos: list) -> pd.DataFrame:
+    """Filas de los objetivos en un dataset archivado (como texto). Corre en un proceso del pool."""
+    partes = [filtrar_objetivos(chunk, objetivos) for chunk in leer_dataset_por_chunks(ruta)]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_DATASET)
+
+
+def registros_por_dia(archivos: list, objetivos: list, procesos: int | None = None) -> pd.DataFrame:
+    """
+    Registro vigente de cada objetivo en cada día archivado, con columnas
+    `_clave` y fecha_chequeo, ordenado por (fecha_chequeo, archivo).
+    """
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        # map() devuelve en el orden de `archivos`, sin importar cuál termina primero
+        partes = list(pool.map(partial(extraer_objetivos, objetivos=objetivos),
+                               [r for _, r in archivos], chunksize=1))
+    marcadas = [p.assign(fecha_chequeo=str(f), _orden=i)
+                for i, ((f, _), p) in enumerate(zip(archivos, partes)) if not p.empty]
+    if not marcadas:
+        return pd.DataFrame(columns=COLUMNAS_HISTORICO + ['_clave'])
+    filas = tipar_filas(pd.concat(marcadas, ignore_index=True))
+    filas['fecha_vigencia'] = pd.to_datetime(filas['fecha_vigencia'], errors='coerce')
+    filas['_clave'] = list(claves_normalizadas(filas))
+    # Primer archivo del día y, dentro de él, la fecha_vigencia más reciente
+    filas = filas.sort_values(['_orden', 'fecha_vigencia'], ascending=[True, False],
+                              na_position='last', kind='stable')
+    filas = filas.drop_duplicates(['fecha_chequeo', '_clave'])
+    return filas.drop(columns='_orden').reset_index(drop=True)
+
+
+def combinar_historico(ruta: str, nuevas: pd.DataFrame, reemplazar: bool = False) -> tuple:
+    """
+    Une el histórico existente con las filas reconstruidas y recalcula %_variacion.
+    Devuelve (DataFrame final, filas agregadas).
+    """
+    nuevas = nuevas.drop(columns='_clave', errors='ignore')
+    if os.path.exists(ruta) and not reemplazar:
+        existente = pd.read_csv(ruta, dtype=str, keep_default_na=False)
+        columnas = list(existente.columns)
+        fechas_previas = set(existente.get('fecha_chequeo', pd.Series(dtype=str)).str[:10])
+        nuevas = nuevas[~nuevas['fecha_chequeo'].isin(fechas_previas)]
+        # Las filas viejas sin fecha_chequeo se ordenan por fecha_vigencia, como en historico.py
+        combinado = pd.concat([existente, nuevas.astype(object)], ignore_index=True)
+    else:
+        columnas = COLUMNAS_HISTORICO
+        combinado = nuevas.astype(object)
+    for col in COLUMNAS_HISTORICO:
+        if col not in columnas:
+            columnas = columnas + [col]
+
+    chequeo = combinado['fecha_chequeo'].fillna('').astype(str)
+    comparacion = chequeo.where(chequeo != '', combinado['fecha_vigencia'].astype(str))
+    combinado = combinado.assign(_fecha=comparacion.str[:10]).sort_values('_fecha', kind='stable')
+
+    precios = pd.to_numeric(combinado['precio'], errors='coerce')
+    anterior = precios.shift(1)
+    variacion = ((precios - anterior) / anterior * 100).where(anterior != 0, 0.0).round(2)
+    combinado['%_variacion'] = variacion.fillna(0.0)
+    return combinado.reindex(columns=columnas), len(nuevas)
+
+
+def escribir_historico(ruta: str, df: pd.DataFrame) -> Historico:
+    """Reescribe el histórico de forma atómica y deja al día su índice y sus estadísticas."""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = ruta + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, ruta)
+    hist = Historico(ruta)
+    hist.reconstruir_indice()
+    actualizar_serie(ruta, 'precio', hist.fechas, hist.precios)
+    return hist
+
+
+def backfill(directorio: str, objetivos: list, procesos: int | None = None, desde: date | None = None,
+             hasta: date | None = None, reemplazar: bool = False, usd: bool = True) -> dict:
+    """Reconstruye los históricos de `objetivos`. Devuelve {Objetivo: filas agregadas}."""
+    archivos = listar_archivos(directorio, desde, hasta)
+    if not archivos:
+        print(f"❌ No hay datasets archivados en {directorio}")
+        return {}
+    print(f"📦 {len(archivos)} dataset(s) del {archivos[0][0]} al {archivos[-1][0]}, "
+          f"{procesos or os.cpu_count()} proceso(s)")
+
+    with etapa("backfill_lectura", archivos=len(archivos), procesos=procesos or os.cpu_count()) as m:
+        filas = registros_por_dia(archivos, objetivos, procesos)
+        m.anotar(filas=len(filas))
+
+    agregadas = {}
+    with etapa("backfill_escritura", objetivos=len(objetivos)):
+        for objetivo in objetivos:
+            propias = filas[[clave == objetivo.clave for clave in filas['_clave']]]
+            if propias.empty:
+                print(f"❌ {objetivo.etiqueta}: sin datos en los archivos")
+                continue
+            df, n = combinar_historico(objetivo.archivo_historico, propias, reemplazar)
+            escribir_historico(objetivo.archivo_historico, df)
+            agregadas[objetivo] = n
+            print(f"✅ {objetivo.etiqueta}: {n} fila(s) reconstruida(s), {len(df)} en {objetivo.archivo_historico}")
+
+    if usd and any(o.archivo_historico == ARCHIVO_HISTORICO for o in agregadas):
+        from usd_sync import sincronizar_usd
+        sincronizar_usd(backfill=True)
+    return agregadas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye históricos desde datasets archivados.")
+    parser.add_argument("directorio", help="directorio con un CSV del dataset por día")
+    parser.add_argument("--procesos", type=int, help="procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument("--desde", type=date.fromisoformat, help="primera fecha a procesar (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="última fecha a procesar (AAAA-MM-DD)")
+    parser.add_argument("--idempresa", nargs="+", help="solo los objetivos de estas estaciones")
+    parser.add_argument("--reemplazar", action="store_true",
+                        help="descartar el histórico existente en lugar de completar las fechas que faltan")
+    parser.add_argument("--sin-usd", action="store_true", help="no regenerar el CSV en USD")
+    args = parser.parse_args()
+
+    objetivos = cargar_objetivos(OBJETIVO_PRINCIPAL)
+    if args.idempresa:
+        objetivos = [o for o in objetivos if o.idempresa in args.idempresa]
+    with etapa("backfill_total"):
+        backfill(args.directorio, objetivos, args.procesos, args.desde, args.hasta,
+                 args.reemplazar, usd=not args.sin_usd)
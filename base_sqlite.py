@@ -0,0 +1,325 @@
+"""
+base_sqlite.py
+==============
+Backend SQLite opcional (data/nafta.sqlite) con los históricos, el CSV en USD
+y la tabla A3500 indexados, para no volver a recorrer los CSV en cada consulta.
+
+Se activa con la variable de entorno NAFTA_SQLITE (1 para la ruta por
+defecto, u otra ruta). Los CSV anchos siguen siendo el formato de trabajo
+(vistas de data/normalizado/, que es lo que se commitea): en cada corrida
+nafta_tracker.py y usd_sync.py suben a la base solo lo agregado a cada CSV (LectorIncremental, como normalizado.py), en una
+transacción por archivo con inserts en lote. Si un CSV se reescribió
+(backfill, migración) esa serie se vuelve a cargar completa.
+
+Tablas:
+  series   un CSV ancho por fila (ruta, cabecera, hasta dónde se leyó)
+  precios  una fila por cada fila de los CSV, en el mismo orden (un día puede
+           tener dos si el precio cambió en el día), con precio, %_variacion y
+           price_usd tipados, más el texto original de cada celda
+           índice (idempresa, idproducto, fecha_chequeo) para consultas por estación
+  tc       A3500 por fecha (clave primaria: búsqueda as-of por índice)
+
+`exportar` vuelve a escribir los CSV con las mismas filas, columnas y celdas,
+pero no es una copia byte a byte: los finales de línea quedan en LF, las
+líneas vacías se saltean y el A3500 se escribe con repr() de cada float. Por
+eso solo exporta a otro directorio (--destino), nunca sobre los originales.
+Si cambia VERSION_ESQUEMA, las tablas de los CSV se descartan y la próxima
+sincronización las recarga completas (la base se regenera desde los CSV).
+
+La base está en modo WAL: la API o un análisis pueden leer mientras la
+corrida escribe. La conversión a USD es un único join as-of en SQL
+(usd_por_join) y sirve para verificar el CSV en USD.
+
+Uso:
+  NAFTA_SQLITE=1 python nafta_tracker.py
+  python base_sqlite.py sincronizar                 carga (o actualiza) desde los CSV
+  python base_sqlite.py exportar --destino DIR      regenera los CSV desde la base en DIR
+  python base_sqlite.py precio 1519 --fecha 2026-03-01 [--producto 2 --horario 2]
+  python base_sqlite.py usd                         price_usd por join contra el CSV en USD
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from configuracion import ARCHIVO_HISTORICO
+from normalizado import ARCHIVO_USD, LectorIncremental, escribir_csv, historicos_existentes, leer_csv
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA         = "data"
+RUTA_POR_DEFECTO = os.path.join(DIR_DATA, "nafta.sqlite")
+ARCHIVO_TC       = os.path.join(DIR_DATA, "dolar_a3500.csv")
+
+VARIABLE_ENTORNO = "NAFTA_SQLITE"
+TAMANO_LOTE      = 5000
+VERSION_ESQUEMA  = 2
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id        INTEGER PRIMARY KEY,
+    archivo   TEXT NOT NULL UNIQUE,
+    cabecera  TEXT NOT NULL DEFAULT '[]',
+    estado    TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS precios (
+    id              INTEGER PRIMARY KEY,
+    serie           INTEGER NOT NULL REFERENCES series(id),
+    idempresa       TEXT NOT NULL,
+    idproducto      TEXT NOT NULL,
+    idtipohorario   TEXT NOT NULL,
+    fecha_chequeo   TEXT NOT NULL,
+    fecha_vigencia  TEXT,
+    precio          REAL,
+    variacion_pct   REAL,
+    price_usd       REAL,
+    celdas          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS precios_estacion ON precios (idempresa, idproducto, fecha_chequeo);
+CREATE TABLE IF NOT EXISTS tc (
+    fecha        TEXT PRIMARY KEY,
+    tc_vendedor  REAL,
+    fuente       TEXT
+);
+"""
+
+# Sin clave única: cada fila del CSV es una fila de la base (LectorIncremental no relee lo ya subido)
+INSERT_PRECIO = """
+INSERT INTO precios (serie, idempresa, idproducto, idtipohorario, fecha_chequeo,
+                     fecha_vigencia, precio, variacion_pct, price_usd, celdas)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_TC = """
+INSERT INTO tc (fecha, tc_vendedor, fuente) VALUES (?, ?, ?)
+ON CONFLICT (fecha) DO UPDATE SET tc_vendedor = excluded.tc_vendedor, fuente = excluded.fuente
+"""
+
+# As-of hacia atrás: cada fecha_chequeo toma el último TC con fecha <= a ella (como convertir_a_usd)
+JOIN_USD = """
+SELECT p.fecha_chequeo, p.precio, t.tc_vendedor,
+       CASE WHEN t.tc_vendedor > 0 THEN ROUND(p.precio / t.tc_vendedor, 4) END AS price_usd
+FROM precios p
+JOIN series s ON s.id = p.serie AND s.archivo = ?
+LEFT JOIN tc t ON t.fecha = (SELECT MAX(fecha) FROM tc WHERE fecha <= substr(p.fecha_chequeo, 1, 10))
+ORDER BY p.id
+"""
+
+
+def habilitada() -> str | None:
+    """Ruta de la base si NAFTA_SQLITE la activa; None si no."""
+    valor = os.environ.get(VARIABLE_ENTORNO, "").strip()
+    if not valor or valor.lower() in ("0", "no"):
+        return None
+    return RUTA_POR_DEFECTO if valor.lower() in ("1", "si", "sí") else valor
+
+
+def conectar(ruta: str | None = None) -> sqlite3.Connection:
+    """Abre (y crea si hace falta) la base en modo WAL."""
+    ruta = ruta or habilitada() or RUTA_POR_DEFECTO
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    con = sqlite3.connect(ruta, timeout=30)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    # En WAL, NORMAL no pierde consistencia ante un corte; a lo sumo la última transacción
+    con.execute("PRAGMA synchronous=NORMAL")
+    if con.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA:
+        # Esquema viejo: las series se recargan completas desde los CSV en la próxima sincronización
+        con.executescript("DROP TABLE IF EXISTS precios; DROP TABLE IF EXISTS series;")
+        con.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    con.executescript(ESQUEMA)
+    return con
+
+
+def _a_float(valor) -> float | None:
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if valor != valor else valor
+
+
+def _parametros(serie: int, fila: dict) -> tuple:
+    chequeo = fila.get("fecha_chequeo") or fila.get("fecha_vigencia", "")[:10]
+    return (serie, fila.get("idempresa", ""), fila.get("idproducto", ""), fila.get("idtipohorario", ""),
+            chequeo, fila.get("fecha_vigencia"), _a_float(fila.get("precio")),
+            _a_float(fila.get("%_variacion")), _a_float(fila.get("price_usd")),
+            json.dumps(fila, ensure_ascii=False))
+
+
+def _id_serie(con: sqlite3.Connection, archivo: str) -> sqlite3.Row:
+    con.execute("INSERT OR IGNORE INTO series (archivo) VALUES (?)", (archivo,))
+    return con.execute("SELECT * FROM series WHERE archivo = ?", (archivo,)).fetchone()
+
+
+# ── ESCRITURA ─────────────────────────────────────────────────────────────────
+def guardar_filas(con: sqlite3.Connection, serie: int, filas: list) -> None:
+    """Inserta en lotes de TAMANO_LOTE (dentro de la transacción de quien llama)."""
+    for i in range(0, len(filas), TAMANO_LOTE):
+        con.executemany(INSERT_PRECIO, [_parametros(serie, f) for f in filas[i:i + TAMANO_LOTE]])
+
+
+def sincronizar_serie(con: sqlite3.Connection, archivo: str) -> int:
+    """Sube lo agregado a un CSV ancho desde la última vez, en una transacción. Devuelve las filas leídas."""
+    with con:
+        serie = _id_serie(con, archivo)
+        estado = json.loads(serie["estado"])
+        completo, filas = LectorIncremental(archivo, estado).leer()
+        if completo:
+            con.execute("DELETE FROM precios WHERE serie = ?", (serie["id"],))
+        guardar_filas(con, serie["id"], filas)
+        con.execute("UPDATE series SET cabecera = ?, estado = ? WHERE id = ?",
+                    (json.dumps(estado["cabecera"], ensure_ascii=False),
+                     json.dumps(estado, ensure_ascii=False), serie["id"]))
+    return len(filas)
+
+
+def sincronizar_tc(con: sqlite3.Connection, ruta: str = ARCHIVO_TC) -> int:
+    """Upsert de la tabla A3500 (unas cientos de filas: se sube completa)."""
+    if not os.path.exists(ruta):
+        return 0
+    _, filas = leer_csv(ruta)
+    with con:
+        con.executemany(UPSERT_TC, [(f[0], _a_float(f[1]), f[2] if len(f) > 2 else None) for f in filas])
+    return len(filas)
+
+
+def sincronizar(archivos: list | None = None, tc: bool = True, ruta: str | None = None) -> dict:
+    """Sube a la base los históricos (y el CSV en USD, y el A3500). Devuelve las filas leídas por archivo."""
+    if archivos is None:
+        archivos = historicos_existentes() + ([ARCHIVO_USD] if os.path.exists(ARCHIVO_USD) else [])
+    con = conectar(ruta)
+    try:
+        leidas = {a: sincronizar_serie(con, a) for a in archivos if os.path.exists(a)}
+        if tc:
+            leidas[ARCHIVO_TC] = sincronizar_tc(con)
+    finally:
+        con.close()
+    return leidas
+
+
+# ── CONSULTAS ─────────────────────────────────────────────────────────────────
+def precio_en(con: sqlite3.Connection, idempresa: str, fecha: str, idproducto: str | None = None,
+              idtipohorario: str | None = None, archivo: str | None = None) -> sqlite3.Row | None:
+    """
+    Último registro de la estación con fecha_chequeo <= `fecha` (búsqueda por
+    índice), en cualquier histórico en ARS salvo que se indique `archivo`.
+    """
+    consulta = ("SELECT p.*, s.archivo FROM precios p JOIN series s ON s.id = p.serie "
+                "WHERE p.idempresa = ? AND p.fecha_chequeo < date(?, '+1 day')")
+    parametros = [str(idempresa), fecha]
+    if archivo is None:
+        consulta += " AND s.archivo != ?"
+        parametros.append(ARCHIVO_USD)
+    for columna, valor in (("p.idproducto", idproducto), ("p.idtipohorario", idtipohorario), ("s.archivo", archivo)):
+        if valor is not None:
+            consulta += f" AND {columna} = ?"
+            parametros.append(str(valor))
+    consulta += " ORDER BY p.fecha_chequeo DESC, p.id DESC LIMIT 1"
+    return con.execute(consulta, parametros).fetchone()
+
+
+def rango(con: sqlite3.Connection, idempresa: str, idproducto: str, desde: str, hasta: str,
+          archivo: str = ARCHIVO_HISTORICO) -> list:
+    """Registros de la estación y producto entre dos fechas (inclusive)."""
+    return con.execute(
+        "SELECT p.* FROM precios p JOIN series s ON s.id = p.serie "
+        "WHERE s.archivo = ? AND p.idempresa = ? AND p.idproducto = ? "
+        "AND p.fecha_chequeo >= ? AND p.fecha_chequeo < date(?, '+1 day') ORDER BY p.fecha_chequeo, p.id",
+        (archivo, str(idempresa), str(idproducto), desde, hasta)).fetchall()
+
+
+def tc_en(con: sqlite3.Connection, fecha: str) -> float | None:
+    """A3500 del día o del último día hábil anterior."""
+    fila = con.execute("SELECT tc_vendedor FROM tc WHERE fecha <= ? ORDER BY fecha DESC LIMIT 1",
+                       (fecha,)).fetchone()
+    return None if fila is None else fila["tc_vendedor"]
+
+
+def usd_por_join(con: sqlite3.Connection, archivo: str = ARCHIVO_HISTORICO) -> list:
+    """(fecha_chequeo, precio, tc_vendedor, price_usd) de toda la serie, en un solo join as-of."""
+    return con.execute(JOIN_USD, (archivo,)).fetchall()
+
+
+# ── EXPORTACIÓN ───────────────────────────────────────────────────────────────
+def exportar(destino: str, ruta: str | None = None) -> list:
+    """
+    Regenera los CSV (históricos, USD y A3500) desde la base bajo `destino`,
+    que no puede ser el directorio de los originales. Devuelve las rutas escritas.
+    """
+    if not destino or os.path.abspath(destino) == os.path.abspath("."):
+        raise ValueError("exportar necesita un --destino distinto del directorio de los CSV originales")
+    con = conectar(ruta)
+    escritas = []
+    try:
+        for serie in con.execute("SELECT * FROM series ORDER BY id").fetchall():
+            cabecera = json.loads(serie["cabecera"])
+            salida = os.path.join(destino, serie["archivo"])
+            filas = (json.loads(c) for (c,) in con.execute(
+                "SELECT celdas FROM precios WHERE serie = ? ORDER BY id", (serie["id"],)))
+            escribir_csv(salida, cabecera, ([f.get(c, "") for c in cabecera] for f in filas))
+            escritas.append(salida)
+        tc = con.execute("SELECT fecha, tc_vendedor, fuente FROM tc ORDER BY fecha").fetchall()
+        if tc:
+            salida = os.path.join(destino, ARCHIVO_TC)
+            escribir_csv(salida, ["fecha", "tc_vendedor", "fuente"],
+                         ([f["fecha"], "" if f["tc_vendedor"] is None else repr(f["tc_vendedor"]), f["fuente"] or ""]
+                          for f in tc))
+            escritas.append(salida)
+    finally:
+        con.close()
+    return escritas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend SQLite de los históricos y del A3500.")
+    parser.add_argument("--base", help=f"ruta de la base (por defecto ${VARIABLE_ENTORNO} o {RUTA_POR_DEFECTO})")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("sincronizar", help="carga o actualiza la base desde los CSV")
+    p = sub.add_parser("exportar", help="regenera los CSV desde la base")
+    p.add_argument("--destino", required=True, help="directorio donde escribirlos (no sobre los originales)")
+    p = sub.add_parser("precio", help="precio de una estación en una fecha")
+    p.add_argument("idempresa")
+    p.add_argument("--fecha", default=f"{datetime.now():%Y-%m-%d}")
+    p.add_argument("--producto", help="idproducto")
+    p.add_argument("--horario", help="idtipohorario")
+    p = sub.add_parser("usd", help="price_usd por join SQL, contra el CSV en USD")
+    p.add_argument("--serie", default=ARCHIVO_HISTORICO)
+    args = parser.parse_args()
+
+    if args.comando == "sincronizar":
+        inicio = datetime.now()
+        leidas = sincronizar(ruta=args.base)
+        for archivo, n in leidas.items():
+            print(f"   {archivo:<60} {n:>7} fila(s)")
+        print(f"✅ Base {args.base or habilitada() or RUTA_POR_DEFECTO} al día "
+              f"({(datetime.now() - inicio).total_seconds():.2f} s)")
+    elif args.comando == "exportar":
+        for salida in exportar(args.destino, args.base):
+            print(f"💾 {salida}")
+    elif args.comando == "precio":
+        con = conectar(args.base)
+        fila = precio_en(con, args.idempresa, args.fecha, args.producto, args.horario)
+        if fila is None:
+            print(f"ℹ️ Sin registros de {args.idempresa} hasta {args.fecha}")
+        else:
+            print(f"⛽ {args.idempresa} al {args.fecha}: ${fila['precio']:,.2f} "
+                  f"(chequeo {fila['fecha_chequeo']}, vigencia {fila['fecha_vigencia']}, {fila['archivo']})")
+            tc = tc_en(con, args.fecha)
+            if tc:
+                print(f"💵 A3500 {tc:,.2f} → USD {fila['precio'] / tc:.4f}")
+    else:
+        con = conectar(args.base)
+        por_join = usd_por_join(con, args.serie)
+        en_csv = {f["fecha_chequeo"]: f["price_usd"] for f in con.execute(
+            "SELECT p.fecha_chequeo, p.price_usd FROM precios p JOIN series s ON s.id = p.serie "
+            "WHERE s.archivo = ?", (ARCHIVO_USD,))}
+        distintas = [f for f in por_join if f["fecha_chequeo"] in en_csv and f["price_usd"] is not None
+                     and en_csv[f["fecha_chequeo"]] is not None
+                     and abs(f["price_usd"] - en_csv[f["fecha_chequeo"]]) > 1e-4]
+        sin_tc = sum(f["price_usd"] is None for f in por_join)
+        print(f"💵 {len(por_join)} fila(s) convertidas por join ({sin_tc} sin TC); "
+              f"{len(distintas)} distinta(s) del CSV en USD")
+        for f in distintas[:20]:
+            print(f"   {f['fecha_chequeo']}  join {f['price_usd']:.4f}  csv {en_csv[f['fecha_chequeo']]:.4f}")
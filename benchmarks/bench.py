@@ -0,0 +1,184 @@
+"""
+bench.py
+========
+Benchmarks reproducibles y sin red del tracker y de usd_sync.
+
+Para cada tamaño de dataset sintético mide tiempo y pico de memoria (tracemalloc) de:
+  descarga            GET del dataset al servidor local (caché vacía)
+  parseo_filtro       lectura por bloques + filtro de objetivos + snapshot columnar
+  descarga_304        GET condicional con el dataset sin cambios
+  filtro_cacheado     reutilización de las filas filtradas (dataset sin cambios)
+  historico_indice    carga del índice del histórico (reconstrucción en frío)
+  historico_update    procesar_objetivo: chequeo del día, append y comparativa mensual
+  usd_sync            sincronizar_usd sobre todo el histórico (Matba Rofex local)
+  usd_sync_incr       sincronizar_usd con una fila nueva (A3500 desde caché)
+  changefeed          cambios de precio de todo el país contra el snapshot anterior
+                      (segundo dataset con otra semilla: mismas estaciones, otros precios)
+  indice_espacial     grilla de estaciones armada de cero desde el snapshot
+  agregados           mediana/percentiles por provincia × bandera × producto × horario
+  calidad             estaciones vencidas y precios atípicos (z robusto) de todo el país
+  main                nafta_tracker.main() completo en un directorio limpio
+
+y, una sola vez, los parsers de Matba Rofex sobre benchmarks/fixtures/ (ver bench_matbarofex.py).
+
+Uso:
+  python benchmarks/bench.py --filas 10000 100000 1000000 --dias 1825 --salida bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd  # noqa: E402
+
+import nafta_tracker  # noqa: E402
+import usd_sync  # noqa: E402
+from agregados import COLUMNAS_LECTURA, calcular_agregados  # noqa: E402
+from calidad import evaluar_calidad  # noqa: E402
+from cambios import actualizar_changefeed  # noqa: E402
+from descargas import Descarga, descargar_con_cache  # noqa: E402
+from espacial import IndiceEspacial, estaciones_del_snapshot  # noqa: E402
+from bench_matbarofex import medir_parsers  # noqa: E402
+from generar_datos import generar_dataset, generar_historico, html_matbarofex, serie_a3500  # noqa: E402
+from historico import Historico  # noqa: E402
+from snapshot import cargar_snapshot  # noqa: E402
+from objetivos import cargar_objetivos, resolver_objetivos  # noqa: E402
+from servidor_local import ServidorLocal, apuntar_modulos  # noqa: E402
+
+
+def medir(resultados: list, filas: int, etapa: str, fn, memoria: bool = True, verbose: bool = False):
+    """Ejecuta `fn`, registra segundos y pico de memoria, y devuelve su resultado."""
+    salida = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    with salida:
+        valor = fn()
+    segundos = time.perf_counter() - inicio
+    pico = 0
+    if memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    resultados.append({"filas": filas, "etapa": etapa, "segundos": round(segundos, 4),
+                       "pico_mb": round(pico / 1e6, 2) if memoria else None})
+    print(f"  {etapa:<18} {segundos:>9.3f} s" + (f"  {pico / 1e6:>9.1f} MB" if memoria else ""))
+    return valor
+
+
+def _preparar_trabajo(base: str, historico: str) -> str:
+    trabajo = tempfile.mkdtemp(prefix="trabajo_", dir=base)
+    os.makedirs(os.path.join(trabajo, "data"))
+    shutil.copy(historico, os.path.join(trabajo, "data", "historico_precios.csv"))
+    return trabajo
+
+
+def correr(tamanos: list, dias: int, memoria: bool, verbose: bool) -> list:
+    resultados = []
+    hoy = date.today()
+    base = tempfile.mkdtemp(prefix="bench_nafta_")
+    origen = os.getcwd()
+    try:
+        ruta_hist = os.path.join(base, "historico_base.csv")
+        generar_historico(ruta_hist, dias, hasta=hoy)
+        html = html_matbarofex(serie_a3500(hoy - timedelta(days=dias + 30), hoy))
+
+        for filas in tamanos:
+            ruta_ds = os.path.join(base, f"dataset_{filas}.csv")
+            n = generar_dataset(ruta_ds, filas, fecha=hoy)
+            print(f"\n▶ dataset {n} filas ({os.path.getsize(ruta_ds) / 1e6:.1f} MB), histórico {dias} días")
+
+            with ServidorLocal(ruta_ds, html) as srv:
+                apuntar_modulos(srv)
+                trabajo = _preparar_trabajo(base, ruta_hist)
+                os.chdir(trabajo)
+                objetivos = cargar_objetivos(nafta_tracker.OBJETIVO_PRINCIPAL)
+
+                descarga = medir(resultados, n, "descarga", lambda: descargar_con_cache(
+                    nafta_tracker.URL, nafta_tracker.ARCHIVO_DATASET_CACHE), memoria, verbose)
+                filas_obj = medir(resultados, n, "parseo_filtro",
+                                  lambda: nafta_tracker.filtrar_descarga(descarga, objetivos), memoria, verbose)
+                descarga = medir(resultados, n, "descarga_304", lambda: descargar_con_cache(
+                    nafta_tracker.URL, nafta_tracker.ARCHIVO_DATASET_CACHE), memoria, verbose)
+                medir(resultados, n, "filtro_cacheado",
+                      lambda: nafta_tracker.filtrar_descarga(descarga, objetivos), memoria, verbose)
+
+                medir(resultados, n, "historico_indice",
+                      lambda: Historico(nafta_tracker.ARCHIVO_HISTORICO), memoria, verbose)
+                registros = resolver_objetivos(filas_obj, objetivos)
+                principal = nafta_tracker.OBJETIVO_PRINCIPAL
+                medir(resultados, n, "historico_update",
+                      lambda: nafta_tracker.procesar_objetivo(principal, registros[principal]), memoria, verbose)
+
+                medir(resultados, n, "usd_sync", usd_sync.sincronizar_usd, memoria, verbose)
+                # Una fila nueva: se duplica la última con fecha de mañana
+                with open(nafta_tracker.ARCHIVO_HISTORICO, encoding="utf-8") as f:
+                    ultima = f.read().rstrip("\n").rsplit("\n", 1)[-1]
+                with open(nafta_tracker.ARCHIVO_HISTORICO, "a", encoding="utf-8") as f:
+                    f.write(ultima.rsplit(",", 1)[0] + f",{hoy + timedelta(days=1)}\n")
+                medir(resultados, n, "usd_sync_incr", usd_sync.sincronizar_usd, memoria, verbose)
+
+                # Dataset siguiente: rota el snapshot y compara los dos
+                ruta_sig = os.path.join(base, f"dataset_{filas}_siguiente.csv")
+                generar_dataset(ruta_sig, filas, semilla=1, fecha=hoy)
+                siguiente = Descarga(ruta_sig, True, os.path.getsize(ruta_sig), f"siguiente-{filas}")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    nafta_tracker.filtrar_descarga(siguiente, objetivos)
+                medir(resultados, n, "changefeed",
+                      lambda: actualizar_changefeed(siguiente.sha256), memoria, verbose)
+                columnas_geo = ['idempresa', 'latitud', 'longitud']
+                medir(resultados, n, "indice_espacial", lambda: IndiceEspacial.desde_estaciones(
+                    estaciones_del_snapshot(cargar_snapshot(columnas_geo))), memoria, verbose)
+                medir(resultados, n, "agregados",
+                      lambda: calcular_agregados(cargar_snapshot(COLUMNAS_LECTURA)), memoria, verbose)
+                medir(resultados, n, "calidad", lambda: evaluar_calidad(cargar_snapshot()), memoria, verbose)
+
+                os.chdir(origen)
+                trabajo = _preparar_trabajo(base, ruta_hist)
+                os.chdir(trabajo)
+                medir(resultados, n, "main", nafta_tracker.main, memoria, verbose)
+                print(f"  (servidor: {srv.contadores})")
+                os.chdir(origen)
+    finally:
+        os.chdir(origen)
+        shutil.rmtree(base, ignore_errors=True)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks offline del monitor de precios.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000],
+                        help="tamaños del dataset sintético")
+    parser.add_argument("--dias", type=int, default=365 * 3, help="días del histórico sintético")
+    parser.add_argument("--sin-memoria", action="store_true",
+                        help="no usar tracemalloc (tiempos sin su sobrecosto)")
+    parser.add_argument("--verbose", action="store_true", help="mostrar la salida de cada etapa")
+    parser.add_argument("--salida", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    resultados = correr(args.filas, args.dias, not args.sin_memoria, args.verbose)
+    print("\n▶ Parsers de Matba Rofex")
+    resultados += medir_parsers()
+    if args.salida:
+        informe = {
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "maquina": platform.machine(),
+            "resultados": resultados,
+        }
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Resultados en {args.salida}")
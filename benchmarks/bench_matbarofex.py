@@ -0,0 +1,79 @@
+"""
+bench_matbarofex.py
+===================
+Compara el extractor rápido (lxml) de la página de Matba Rofex contra el
+parser con BeautifulSoup, sobre las páginas guardadas en benchmarks/fixtures/:
+
+  matbarofex.html                 formato actual (~3 años de cotizaciones)
+  matbarofex_fila_promedio.html   tabla con una fila que no es cotización:
+                                  el extractor rápido la rechaza y cae a BeautifulSoup
+
+Verifica además que ambos caminos devuelvan exactamente la misma tabla.
+
+Uso:
+  python benchmarks/bench_matbarofex.py [--repeticiones 20] [--salida matba.json]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pandas as pd  # noqa: E402
+
+import usd_sync  # noqa: E402
+
+DIR_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _mejor_tiempo(fn, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def medir_parsers(repeticiones: int = 20) -> list:
+    """Mejor tiempo de cada parser por fixture, en el formato de resultados de bench.py."""
+    resultados = []
+    for ruta in sorted(glob.glob(os.path.join(DIR_FIXTURES, "matbarofex*.html"))):
+        with open(ruta, encoding="utf-8") as f:
+            html = f.read()
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            df_rapido, parser = usd_sync.parsear_matbarofex(html)
+        df_bs4 = usd_sync._parsear_matbarofex_bs4(html)
+        pd.testing.assert_frame_equal(df_rapido, df_bs4)
+
+        t_bs4 = _mejor_tiempo(lambda: usd_sync._parsear_matbarofex_bs4(html), repeticiones)
+        t_rapido = _mejor_tiempo(lambda: usd_sync.parsear_matbarofex(html), repeticiones)
+        print(f"  {nombre:<30} {len(df_bs4):>5} filas  bs4 {t_bs4 * 1000:8.2f} ms  "
+              f"parsear_matbarofex[{parser}] {t_rapido * 1000:8.2f} ms  ×{t_bs4 / t_rapido:.1f}")
+        resultados.append({"filas": len(df_bs4), "etapa": f"{nombre}_bs4", "segundos": round(t_bs4, 5)})
+        resultados.append({"filas": len(df_bs4), "etapa": f"{nombre}_{parser}", "segundos": round(t_rapido, 5)})
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de los parsers de Matba Rofex.")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--salida", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("▶ Parsers de Matba Rofex (mejor de N)")
+    resultados = medir_parsers(args.repeticiones)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Resultados en {args.salida}")
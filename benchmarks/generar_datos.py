@@ -0,0 +1,190 @@
+"""
+generar_datos.py
+================
+Datos sintéticos para los benchmarks, con el mismo esquema que las fuentes reales:
+
+  - dataset nacional de precios en surtidor (10k a millones de filas),
+    con la estación GAS IMPULSO (idempresa 1519) siempre presente;
+  - históricos diarios (data/historico_precios.csv) de varios años;
+  - tabla A3500 y la página HTML de Matba Rofex que la publica.
+
+Uso:
+  python benchmarks/generar_datos.py dataset salida.csv --filas 1000000
+  python benchmarks/generar_datos.py historico salida.csv --dias 1825
+"""
+
+import argparse
+import csv
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_DATASET = [
+    'indice_tiempo', 'idempresa', 'cuit', 'empresa', 'direccion', 'localidad',
+    'provincia', 'region', 'idproducto', 'producto', 'idtipohorario',
+    'tipohorario', 'precio', 'fecha_vigencia', 'idempresabandera',
+    'empresabandera', 'latitud', 'longitud', 'geojson',
+]
+
+PRODUCTOS = [
+    (2, 'Nafta (súper) entre 92 y 95 Ron'),
+    (3, 'Nafta (premium) de más de 95 Ron'),
+    (19, 'Gas Oil Grado 2'),
+    (21, 'Gas Oil Grado 3'),
+    (6, 'GNC'),
+]
+HORARIOS = [(2, 'Diurno'), (3, 'Nocturno')]
+BANDERAS = [(2, 'YPF'), (3, 'SHELL C.A.P.S.A.'), (4, 'AXION'), (5, 'PUMA'), (28, 'BLANCA')]
+PROVINCIAS = [
+    ('BUENOS AIRES', 'PAMPEANA', -34.6, -58.9), ('CORDOBA', 'PAMPEANA', -31.4, -64.2),
+    ('SANTA FE', 'PAMPEANA', -31.6, -60.7), ('MENDOZA', 'CUYO', -32.9, -68.8),
+    ('TUCUMAN', 'NOA', -26.8, -65.2), ('NEUQUEN', 'PATAGONIA', -38.9, -68.1),
+    ('CAPITAL FEDERAL', 'PAMPEANA', -34.6, -58.4), ('SALTA', 'NOA', -24.8, -65.4),
+]
+ESTACION_PRINCIPAL = {
+    'idempresa': '1519', 'cuit': '30-61874484-8', 'empresa': 'GAS IMPULSO  S.A.',
+    'direccion': 'RUTA 25 NRO. 619', 'localidad': 'PILAR', 'provincia': 'BUENOS AIRES',
+    'region': 'PAMPEANA', 'latitud': -34.44688, 'longitud': -58.90315, 'bandera': (2, 'YPF'),
+}
+FILAS_POR_ESTACION = len(PRODUCTOS) * len(HORARIOS)
+
+
+def _estaciones(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    prov = rng.integers(0, len(PROVINCIAS), n)
+    band = rng.integers(0, len(BANDERAS), n)
+    ids = np.arange(1000, 1000 + n)
+    ids[ids == 1519] = 1000 + n  # 1519 se reserva para la estación principal
+    est = pd.DataFrame({
+        'idempresa': ids.astype(str),
+        'cuit': [f"30-{7000000 + i}-{i % 10}" for i in range(n)],
+        'empresa': [f"ESTACION {i} S.A." for i in ids],
+        'direccion': [f"RUTA {i % 300} KM {i % 97}" for i in range(n)],
+        'localidad': [f"LOCALIDAD {i % 500}" for i in range(n)],
+        'provincia': [PROVINCIAS[p][0] for p in prov],
+        'region': [PROVINCIAS[p][1] for p in prov],
+        'latitud': np.round([PROVINCIAS[p][2] for p in prov] + rng.normal(0, 0.5, n), 5),
+        'longitud': np.round([PROVINCIAS[p][3] for p in prov] + rng.normal(0, 0.5, n), 5),
+        'idempresabandera': [BANDERAS[b][0] for b in band],
+        'empresabandera': [BANDERAS[b][1] for b in band],
+    })
+    principal = ESTACION_PRINCIPAL
+    est.loc[0, ['idempresa', 'cuit', 'empresa', 'direccion', 'localidad', 'provincia',
+                'region', 'latitud', 'longitud']] = [
+        principal['idempresa'], principal['cuit'], principal['empresa'], principal['direccion'],
+        principal['localidad'], principal['provincia'], principal['region'],
+        principal['latitud'], principal['longitud']]
+    est.loc[0, ['idempresabandera', 'empresabandera']] = list(principal['bandera'])
+    return est
+
+
+def generar_dataset(ruta: str, filas: int, semilla: int = 0, fecha: date | None = None,
+                    precio_base: float = 2000.0) -> int:
+    """Escribe un CSV nacional sintético de ~`filas` filas. Devuelve las filas escritas."""
+    rng = np.random.default_rng(semilla)
+    fecha = fecha or date.today()
+    n_est = max(1, filas // FILAS_POR_ESTACION)
+    est = _estaciones(n_est, np.random.default_rng(12345))  # estaciones estables entre snapshots
+    df = est.loc[est.index.repeat(FILAS_POR_ESTACION)].reset_index(drop=True)
+    combos = [(p, h) for p in PRODUCTOS for h in HORARIOS]
+    df['idproducto'] = [combos[i % len(combos)][0][0] for i in range(len(df))]
+    df['producto'] = [combos[i % len(combos)][0][1] for i in range(len(df))]
+    df['idtipohorario'] = [combos[i % len(combos)][1][0] for i in range(len(df))]
+    df['tipohorario'] = [combos[i % len(combos)][1][1] for i in range(len(df))]
+    precios = precio_base + rng.normal(0, 120, len(df)) + df['idproducto'].to_numpy() * 15
+    df['precio'] = [f"{p:.0f}" if i % 3 else f"{p:.2f}".replace('.', ',') for i, p in enumerate(precios)]
+    dias = rng.integers(0, 60, len(df))
+    vigencias = pd.Timestamp(fecha) - pd.to_timedelta(dias, unit='D') + pd.Timedelta(hours=6)
+    df['fecha_vigencia'] = vigencias.strftime('%Y-%m-%d %H:%M:%S')
+    df['indice_tiempo'] = pd.Timestamp(fecha).strftime('%Y-%m')
+    df['geojson'] = ['{"type":"Point","coordinates":[%s,%s]}' % (lo, la)
+                     for lo, la in zip(df['longitud'], df['latitud'])]
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    df[COLUMNAS_DATASET].to_csv(ruta, index=False, quoting=csv.QUOTE_MINIMAL)
+    return len(df)
+
+
+def generar_historico(ruta: str, dias: int, hasta: date | None = None, semilla: int = 0) -> int:
+    """Escribe un histórico diario de la estación principal con `dias` filas hasta `hasta` (excluido)."""
+    rng = np.random.default_rng(semilla)
+    hasta = hasta or date.today()
+    p = ESTACION_PRINCIPAL
+    filas = []
+    precio = 800.0
+    previo = precio
+    for i in range(dias):
+        dia = hasta - timedelta(days=dias - i)
+        if rng.random() < 0.15:
+            precio = round(precio * (1 + rng.normal(0.01, 0.01)))
+        var = round((precio - previo) / previo * 100, 2) if previo else 0.0
+        previo = precio
+        filas.append({
+            'indice_tiempo': dia.strftime('%Y-%m'), 'idempresa': p['idempresa'], 'cuit': p['cuit'],
+            'empresa': p['empresa'], 'direccion': p['direccion'], 'localidad': p['localidad'],
+            'provincia': p['provincia'], 'region': p['region'], 'idproducto': 2,
+            'producto': PRODUCTOS[0][1], 'idtipohorario': 2, 'tipohorario': 'Diurno',
+            'precio': int(precio), 'fecha_vigencia': str(dia), 'idempresabandera': p['bandera'][0],
+            'empresabandera': p['bandera'][1], 'latitud': p['latitud'], 'longitud': p['longitud'],
+            'geojson': '{"type":"Point","coordinates":[%s,%s]}' % (p['longitud'], p['latitud']),
+            '%_variacion': var, 'fecha_chequeo': str(dia),
+        })
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    pd.DataFrame(filas).to_csv(ruta, index=False)
+    return len(filas)
+
+
+def serie_a3500(desde: date, hasta: date) -> pd.DataFrame:
+    """Tipo de cambio sintético en días hábiles."""
+    fechas = pd.bdate_range(desde, hasta)
+    tc = 350.0 * np.exp(np.linspace(0, np.log(1500 / 350), len(fechas)))
+    return pd.DataFrame({'fecha': fechas, 'tc_vendedor': np.round(tc, 4)})
+
+
+def html_matbarofex(df_tc: pd.DataFrame, fila_extra: str = "") -> str:
+    """
+    Página con la tabla de cotizaciones tal como la publica Matba Rofex
+    (con menú, scripts y pie, para que el parser recorra una página realista).
+    `fila_extra` se agrega al final de la tabla (p. ej. una fila de promedio).
+    """
+    filas = "\n".join(
+        f"<tr><td>{f.strftime('%d/%m/%Y')}</td><td>{f'{tc:,.4f}'.replace(',', 'X').replace('.', ',').replace('X', '.')}</td></tr>"
+        for f, tc in zip(df_tc['fecha'][::-1], df_tc['tc_vendedor'][::-1]))
+    menu = "".join(f"<li><a href='/seccion/{i}'>Sección {i}</a></li>" for i in range(40))
+    return ("<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'><title>Dólar A3500</title>"
+            "<script>window.dataLayer = window.dataLayer || [];</script>"
+            "<link rel='stylesheet' href='/css/site.css'></head><body>"
+            f"<nav><ul>{menu}</ul></nav>"
+            "<div class='container'><h1>Dólar A3500</h1><table class='table'>\n"
+            "<thead><tr><th>Fecha</th><th>Tipo de cambio</th></tr></thead>\n<tbody>\n"
+            f"{filas}\n{fila_extra}</tbody></table></div>"
+            "<footer><p>Matba Rofex S.A.</p><script src='/js/site.js'></script></footer></body></html>")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para benchmarks.")
+    sub = parser.add_subparsers(dest="tipo", required=True)
+    p_ds = sub.add_parser("dataset", help="CSV nacional de precios en surtidor")
+    p_ds.add_argument("salida")
+    p_ds.add_argument("--filas", type=int, default=10_000)
+    p_ds.add_argument("--semilla", type=int, default=0)
+    p_hi = sub.add_parser("historico", help="histórico diario de la estación principal")
+    p_hi.add_argument("salida")
+    p_hi.add_argument("--dias", type=int, default=365 * 3)
+    p_tc = sub.add_parser("matbarofex", help="página HTML de Matba Rofex")
+    p_tc.add_argument("salida")
+    p_tc.add_argument("--dias", type=int, default=365 * 3)
+    p_tc.add_argument("--fila-extra", default="", help="fila HTML agregada al final de la tabla")
+    args = parser.parse_args()
+
+    if args.tipo == "dataset":
+        n = generar_dataset(args.salida, args.filas, args.semilla)
+        print(f"✅ {n} filas en {args.salida}")
+    elif args.tipo == "historico":
+        n = generar_historico(args.salida, args.dias)
+        print(f"✅ {n} filas en {args.salida}")
+    else:
+        hoy = date.today()
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(html_matbarofex(serie_a3500(hoy - timedelta(days=args.dias), hoy), args.fila_extra))
+        print(f"✅ {args.salida}")
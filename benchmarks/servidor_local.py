@@ -0,0 +1,145 @@
+"""
+servidor_local.py
+=================
+Servidor HTTP local que reemplaza a todas las fuentes remotas durante los
+benchmarks, para medir sin red y de forma reproducible:
+
+  GET  /dataset.csv                    datos.energia.gob.ar (ETag, Last-Modified, 304)
+  GET  /DolarA3500/BuscarCotizacion    página de Matba Rofex
+  GET  /com3500.xls                    XLS BCRA (responde 503: fuerza el camino de Matba)
+  POST /bot<token>/sendMessage         API de Telegram
+  POST /2/tweets                       API v2 de X
+
+apuntar_modulos() redirige las URLs de nafta_tracker, usd_sync y
+notificaciones (y el cliente de tweepy) a este servidor.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, codigo: int, cuerpo: bytes = b"", tipo: str = "application/json", extra: dict | None = None):
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if cuerpo and self.command != "HEAD":
+            self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        srv = self.server
+        if self.path.startswith("/dataset.csv"):
+            srv.contadores["dataset"] += 1
+            etag, modificado = srv.etag_dataset()
+            if self.headers.get("If-None-Match") == etag:
+                return self._responder(304, extra={"ETag": etag})
+            with open(srv.ruta_dataset, "rb") as f:
+                cuerpo = f.read()
+            srv.bytes_servidos += len(cuerpo)
+            return self._responder(200, cuerpo, "text/csv", {"ETag": etag, "Last-Modified": modificado})
+        if self.path.startswith("/DolarA3500/BuscarCotizacion"):
+            srv.contadores["matbarofex"] += 1
+            return self._responder(200, srv.html_matba.encode("utf-8"), "text/html; charset=utf-8")
+        if self.path.startswith("/com3500.xls"):
+            srv.contadores["bcra_xls"] += 1
+            return self._responder(503, b"")
+        self._responder(404, b"{}")
+
+    def do_POST(self):
+        srv = self.server
+        largo = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(largo)
+        if self.path.endswith("/sendMessage"):
+            srv.contadores["telegram"] += 1
+            return self._responder(200, b'{"ok":true,"result":{}}')
+        if self.path.startswith("/2/tweets"):
+            srv.contadores["x"] += 1
+            id_tuit = str(next(srv.ids_tuits))
+            return self._responder(201, json.dumps({"data": {"id": id_tuit, "text": ""}}).encode())
+        self._responder(404, b"{}")
+
+
+class ServidorLocal(ThreadingHTTPServer):
+    """Stand-in de todas las fuentes remotas; usar como context manager."""
+
+    daemon_threads = True
+
+    def __init__(self, ruta_dataset: str, html_matba: str = "<html></html>"):
+        super().__init__(("127.0.0.1", 0), _Manejador)
+        self.ruta_dataset = ruta_dataset
+        self.html_matba = html_matba
+        self.contadores = {k: 0 for k in ("dataset", "matbarofex", "bcra_xls", "telegram", "x")}
+        self.bytes_servidos = 0
+        self.ids_tuits = itertools.count(1)
+        self._hilo = None
+        self._etag = (None, None, None)
+
+    def etag_dataset(self) -> tuple:
+        est = os.stat(self.ruta_dataset)
+        if self._etag[0] != (est.st_mtime_ns, est.st_size):
+            sha = hashlib.sha256()
+            with open(self.ruta_dataset, "rb") as f:
+                for bloque in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(bloque)
+            self._etag = ((est.st_mtime_ns, est.st_size), f'"{sha.hexdigest()[:16]}"',
+                          formatdate(est.st_mtime, usegmt=True))
+        return self._etag[1], self._etag[2]
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class _Redireccion(HTTPAdapter):
+    """Adaptador de requests que reescribe el host de la API de X hacia el servidor local."""
+
+    def __init__(self, origen: str, destino: str):
+        super().__init__()
+        self.origen, self.destino = origen, destino
+
+    def send(self, request, **kwargs):
+        request.url = request.url.replace(self.origen, self.destino, 1)
+        return super().send(request, **kwargs)
+
+
+def apuntar_modulos(servidor: ServidorLocal) -> None:
+    """Redirige todas las URLs remotas del tracker al servidor local."""
+    import nafta_tracker
+    import notificaciones
+    import usd_sync
+
+    nafta_tracker.URL = f"{servidor.base}/dataset.csv"
+    usd_sync.URL_MATBA_ROFEX = f"{servidor.base}/DolarA3500/BuscarCotizacion"
+    usd_sync.URL_XLS_BCRA = f"{servidor.base}/com3500.xls"
+    notificaciones.TELEGRAM_API = servidor.base
+    notificaciones.TELEGRAM_BOT_TOKEN = "bench"
+    notificaciones.TELEGRAM_CHAT_ID = "bench"
+    for var in ("X_API_KEY", "X_API_SECRET", "X_ACCESS_TOKEN", "X_ACCESS_SECRET", "X_BEARER_TOKEN"):
+        setattr(notificaciones, var, "bench")
+    notificaciones._cliente_x = None
+    cliente = notificaciones._cliente_twitter()
+    cliente.session.mount("https://api.twitter.com", _Redireccion("https://api.twitter.com", servidor.base))
@@ -0,0 +1,224 @@
+"""
+calidad.py
+==========
+Calidad de datos del dataset nacional, en una pasada vectorizada sobre el
+snapshot (registro vigente de cada idempresa × idproducto × idtipohorario):
+
+  - estación vencida: el precio más reciente de la estación (de cualquier
+    producto) tiene más de UMBRAL_DIAS_VENCIDA días respecto de la fecha del
+    dataset; es lo que pasó con UNITECPROCOM cuando dejó de informar y hubo
+    que cambiarla a mano
+  - precio atípico: z-score robusto contra las estaciones de la misma
+    provincia, producto y horario, 0.6745 · (precio − mediana) / MAD, con
+    |z| > UMBRAL_Z (grupos de al menos MIN_PARES estaciones); un precio <= 0
+    también es atípico
+
+Se guardan solo las filas marcadas, una tabla por día en data/cache/calidad/
+(ultimo.json apunta a la vigente). nafta_tracker.py no publica un objetivo
+marcado y manda un aviso por Telegram la primera vez que aparece cada
+problema (avisados.json recuerda los ya avisados hasta que se resuelven).
+
+Uso:
+  python calidad.py                  resumen de la última evaluación
+  python calidad.py --vencidas 20    además, las 20 estaciones vencidas hace más tiempo
+  python calidad.py --atipicos 20    y los 20 precios más atípicos
+"""
+
+import argparse
+import glob
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from cambios import vigentes
+from objetivos import claves_normalizadas
+from snapshot import DIR_SNAPSHOT, cargar_snapshot, leer_meta_snapshot
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA         = "data"
+DIR_CALIDAD      = os.path.join(DIR_DATA, "cache", "calidad")
+ARCHIVO_ULTIMO   = os.path.join(DIR_CALIDAD, "ultimo.json")
+ARCHIVO_AVISADOS = os.path.join(DIR_CALIDAD, "avisados.json")
+
+CONSERVAR = 30
+
+UMBRAL_DIAS_VENCIDA = 30
+UMBRAL_Z            = 3.5
+MIN_PARES           = 5
+
+COLUMNAS_PARES = ['provincia', 'producto', 'tipohorario']
+COLUMNAS_LECTURA = ['idempresa', 'empresa', 'empresabandera', 'provincia', 'localidad', 'idproducto',
+                    'producto', 'idtipohorario', 'tipohorario', 'precio', 'fecha_vigencia']
+COLUMNAS_CALIDAD = (['idempresa', 'empresa', 'empresabandera', 'provincia', 'localidad', 'producto',
+                     'tipohorario', 'precio', 'fecha_vigencia']
+                    + ['dias_sin_actualizar', 'mediana_pares', 'z_robusto', 'vencida', 'atipico'])
+
+
+def evaluar_calidad(df: pd.DataFrame, referencia: pd.Timestamp | None = None) -> pd.DataFrame:
+    """Filas con problemas (estación vencida o precio atípico) de un dataset ya tipado."""
+    df = vigentes(df).reset_index(drop=True)
+    if referencia is None:
+        # La fecha del dataset, no la de hoy: si toda la fuente se atrasa no es culpa de cada estación.
+        # Percentil 99 y no el máximo, por las fechas de vigencia mal cargadas a futuro
+        referencia = df['fecha_vigencia'].quantile(0.99)
+
+    ultima = df.groupby('idempresa', observed=True)['fecha_vigencia'].transform('max')
+    dias = (referencia - ultima).dt.days
+
+    precios = df['precio'].where(df['precio'] > 0)
+    pares = df[COLUMNAS_PARES].assign(_precio=precios)
+    grupos = pares.groupby(COLUMNAS_PARES, observed=True)['_precio']
+    mediana = grupos.transform('median')
+    cantidad = grupos.transform('count')
+    desvio = pares.assign(_precio=(precios - mediana).abs()).groupby(
+        COLUMNAS_PARES, observed=True)['_precio'].transform('median')
+    z = 0.6745 * (precios - mediana) / desvio.where(desvio > 0)
+    z = z.where(cantidad >= MIN_PARES)
+
+    vencida = (dias > UMBRAL_DIAS_VENCIDA).to_numpy()
+    atipico = ((z.abs() > UMBRAL_Z) | (df['precio'] <= 0)).to_numpy()
+    marcadas = vencida | atipico
+    columnas = [c for c in COLUMNAS_CALIDAD[:9] if c in df.columns]
+    tabla = df.loc[marcadas, columnas].astype({c: str for c in columnas if c not in ('precio', 'fecha_vigencia')})
+    tabla['dias_sin_actualizar'] = dias[marcadas].to_numpy()
+    tabla['mediana_pares'] = mediana[marcadas].round(2).to_numpy()
+    tabla['z_robusto'] = z[marcadas].round(2).to_numpy()
+    tabla['vencida'] = vencida[marcadas]
+    tabla['atipico'] = atipico[marcadas]
+    return tabla.reindex(columns=COLUMNAS_CALIDAD).reset_index(drop=True)
+
+
+def leer_ultimo() -> dict:
+    """Metadatos de la última evaluación (sha256, archivo, conteos) o {}."""
+    try:
+        with open(ARCHIVO_ULTIMO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def actualizar_calidad(sha256: str) -> pd.DataFrame | None:
+    """
+    Evaluación del dataset `sha256`, una sola vez por dataset (las corridas
+    siguientes leen la guardada). None si el snapshot vigente no es ese dataset.
+    """
+    meta = leer_ultimo()
+    if meta.get('sha256') == sha256 and os.path.exists(meta.get('archivo', '')):
+        return cargar_calidad(meta['archivo'])
+    meta_snapshot = leer_meta_snapshot(DIR_SNAPSHOT)
+    if meta_snapshot.get('sha256') != sha256:
+        return None
+
+    columnas = [c for c in COLUMNAS_LECTURA if c in meta_snapshot.get('columnas', {})]
+    tabla = evaluar_calidad(cargar_snapshot(columnas))
+    os.makedirs(DIR_CALIDAD, exist_ok=True)
+    archivo = os.path.join(DIR_CALIDAD, f"{datetime.now():%Y-%m-%d}.csv")
+    tmp = archivo + ".tmp"
+    tabla.to_csv(tmp, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    os.replace(tmp, archivo)
+    meta = {"sha256": sha256, "archivo": archivo, "filas": len(tabla),
+            "estaciones_vencidas": int(tabla.loc[tabla['vencida'], 'idempresa'].nunique()),
+            "precios_atipicos": int(tabla['atipico'].sum()),
+            "creado": datetime.now().isoformat(timespec="seconds")}
+    tmp = ARCHIVO_ULTIMO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ARCHIVO_ULTIMO)
+
+    for viejo in sorted(glob.glob(os.path.join(DIR_CALIDAD, "????-??-??.csv")))[:-CONSERVAR]:
+        os.remove(viejo)
+    return tabla
+
+
+def cargar_calidad(ruta: str | None = None) -> pd.DataFrame:
+    """Lee una evaluación guardada (por defecto, la última)."""
+    ruta = ruta or leer_ultimo()['archivo']
+    texto = [c for c in COLUMNAS_CALIDAD[:9] if c not in ('precio', 'fecha_vigencia')]
+    numericas = ['precio', 'dias_sin_actualizar', 'mediana_pares', 'z_robusto']
+    return pd.read_csv(ruta, dtype={c: str for c in texto}, keep_default_na=False,
+                       na_values={c: [''] for c in numericas + ['fecha_vigencia']},
+                       parse_dates=['fecha_vigencia'], date_format='%Y-%m-%d %H:%M:%S')
+
+
+def motivos(fila) -> list:
+    """Descripción legible de los problemas de una fila de la evaluación."""
+    salida = []
+    if fila['vencida']:
+        salida.append(f"sin actualizar hace {int(fila['dias_sin_actualizar'])} días")
+    if fila['atipico']:
+        z = fila['z_robusto']
+        detalle = f"z {z:+.1f}, " if not pd.isna(z) else ""
+        salida.append(f"precio atípico ${float(fila['precio']):,.2f} "
+                      f"({detalle}mediana ${float(fila['mediana_pares']):,.2f} en {fila['provincia']})")
+    return salida
+
+
+def problemas_de_objetivos(tabla: pd.DataFrame | None, objetivos: list) -> dict:
+    """{Objetivo: [motivos]} para los objetivos marcados en la evaluación."""
+    if tabla is None or tabla.empty:
+        return {}
+    claves = claves_normalizadas(tabla)
+    propias = tabla[claves.isin([o.clave for o in objetivos])]
+    por_clave = {clave: motivos(fila) for clave, (_, fila) in zip(claves_normalizadas(propias), propias.iterrows())}
+    return {o: por_clave[o.clave] for o in objetivos if por_clave.get(o.clave)}
+
+
+def avisos_nuevos(problemas: dict) -> dict:
+    """
+    Los problemas que todavía no se avisaron. Los que ya no aparecen se olvidan,
+    así que si vuelven se avisan de nuevo.
+    """
+    try:
+        with open(ARCHIVO_AVISADOS, encoding="utf-8") as f:
+            avisados = set(json.load(f))
+    except (OSError, ValueError):
+        avisados = set()
+    # La clave es el tipo de problema ('sin actualizar...', 'precio atípico...'), no el detalle que cambia a diario
+    actuales = {"|".join(o.clave) + "|" + m.split(" ")[0]: (o, m) for o, ms in problemas.items() for m in ms}
+    nuevos = {}
+    for clave, (objetivo, motivo) in actuales.items():
+        if clave not in avisados:
+            nuevos.setdefault(objetivo, []).append(motivo)
+    if set(actuales) != avisados:
+        os.makedirs(DIR_CALIDAD, exist_ok=True)
+        tmp = ARCHIVO_AVISADOS + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sorted(actuales), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, ARCHIVO_AVISADOS)
+    return nuevos
+
+
+def texto_aviso(nuevos: dict) -> str:
+    lineas = ["🚩 CALIDAD DE DATOS", "--------------------------"]
+    for objetivo, ms in nuevos.items():
+        lineas.append(f"⛽ {objetivo.etiqueta} (idempresa {objetivo.idempresa}): {'; '.join(ms)}")
+    lineas.append("\nNo se publica hasta que la fuente se normalice.")
+    return "\n".join(lineas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estaciones vencidas y precios atípicos del dataset nacional.")
+    parser.add_argument("--vencidas", type=int, default=0, help="listar las N estaciones vencidas hace más tiempo")
+    parser.add_argument("--atipicos", type=int, default=0, help="listar los N precios más atípicos")
+    args = parser.parse_args()
+
+    meta = leer_ultimo()
+    if not os.path.exists(meta.get('archivo', '')):
+        print(f"ℹ️ No hay evaluaciones en {DIR_CALIDAD}. Corré nafta_tracker.py.")
+        raise SystemExit(0)
+    tabla = cargar_calidad(meta['archivo'])
+    print(f"🚩 Calidad {meta['sha256'][:12]}: {meta['estaciones_vencidas']} estaciones vencidas "
+          f"(> {UMBRAL_DIAS_VENCIDA} días), {meta['precios_atipicos']} precios atípicos (|z| > {UMBRAL_Z})")
+    if args.vencidas:
+        vencidas = (tabla[tabla['vencida']].sort_values('dias_sin_actualizar', ascending=False)
+                    .drop_duplicates('idempresa'))
+        for _, f in vencidas.head(args.vencidas).iterrows():
+            print(f"   💤 {f['empresa'][:30]:<30} {f['localidad'][:20]:<20} idempresa {f['idempresa']:>6}  "
+                  f"{int(f['dias_sin_actualizar'])} días")
+    if args.atipicos:
+        atipicos = tabla[tabla['atipico']]
+        atipicos = atipicos.reindex(atipicos['z_robusto'].abs().sort_values(ascending=False).index)
+        for _, f in atipicos.head(args.atipicos).iterrows():
+            print(f"   ❗ {f['empresa'][:30]:<30} {f['producto'][:32]:<32} {'; '.join(motivos(f))}")
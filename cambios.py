@@ -0,0 +1,199 @@
+"""
+cambios.py
+==========
+Changefeed nacional: todos los cambios de precio entre dos datasets
+consecutivos, en una sola pasada.
+
+Compara el snapshot vigente con el anterior (snapshot.py los rota al guardar).
+Cada fila se identifica por (idempresa, idproducto, idtipohorario); de cada
+clave se toma el registro de fecha_vigencia más reciente. Las claves se
+reducen a un hash de 64 bits y los dos lados se cruzan con un merge
+vectorizado, sin recorrer estaciones ni objetivos uno por uno.
+
+Cada cambio es una fila con `tipo`:
+  - alta    la clave no estaba en el dataset anterior
+  - baja    la clave ya no está en el dataset actual
+  - cambio  el precio es distinto
+
+El changefeed de cada dataset se guarda en data/cache/cambios/ (uno por
+dataset, se conservan los últimos CONSERVAR; ultimo.json apunta al vigente)
+y es lo que consultan las alertas de todos los objetivos:
+cambios_de_objetivos() los busca por clave. Las alertas de un dataset salen
+una sola vez (ultimo.json guarda `alertado`): un 304 o el mismo hash no las
+repiten. El histórico diario no sale de acá: registra una fila por día aunque
+el precio no cambie, y eso no está en un changefeed hecho solo de cambios.
+
+Uso:
+  python cambios.py              resumen del último changefeed
+  python cambios.py --top 20     además, las 20 mayores variaciones
+"""
+
+import argparse
+import glob
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from objetivos import claves_normalizadas
+from snapshot import DIR_SNAPSHOT, DIR_SNAPSHOT_ANTERIOR, cargar_snapshot, leer_meta_snapshot
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA          = "data"
+DIR_CAMBIOS       = os.path.join(DIR_DATA, "cache", "cambios")
+ARCHIVO_ULTIMO    = os.path.join(DIR_CAMBIOS, "ultimo.json")
+
+CONSERVAR = 30
+
+COLUMNAS_CLAVE = ['idempresa', 'idproducto', 'idtipohorario']
+COLUMNAS_DESCRIPCION = ['empresa', 'empresabandera', 'provincia', 'localidad', 'producto', 'tipohorario']
+COLUMNAS_CAMBIOS = (['tipo'] + COLUMNAS_CLAVE + COLUMNAS_DESCRIPCION
+                    + ['precio_anterior', 'precio', 'diferencia', 'variacion_pct',
+                       'fecha_vigencia_anterior', 'fecha_vigencia'])
+
+
+def vigentes(df: pd.DataFrame) -> pd.DataFrame:
+    """Registro de fecha_vigencia más reciente por clave, indexado por el hash de la clave."""
+    claves = pd.util.hash_pandas_object(df[COLUMNAS_CLAVE], index=False).to_numpy()
+    df = df.assign(_clave=claves)
+    df = df.sort_values('fecha_vigencia', ascending=False, na_position='last', kind='stable')
+    return df.drop_duplicates('_clave').set_index('_clave')
+
+
+def calcular_cambios(anterior: pd.DataFrame, actual: pd.DataFrame) -> pd.DataFrame:
+    """Altas, bajas y cambios de precio entre dos datasets (columnas de COLUMNAS_CAMBIOS)."""
+    ant, act = vigentes(anterior), vigentes(actual)
+    unidos = act.join(ant[['precio', 'fecha_vigencia']], how='outer', rsuffix='_anterior')
+
+    en_actual = unidos.index.isin(act.index)
+    en_anterior = unidos.index.isin(ant.index)
+    distinto = (unidos['precio'] != unidos['precio_anterior']) & ~(
+        unidos['precio'].isna() & unidos['precio_anterior'].isna())
+
+    tipo = pd.Series('', index=unidos.index)
+    tipo[en_actual & ~en_anterior] = 'alta'
+    tipo[~en_actual & en_anterior] = 'baja'
+    tipo[en_actual & en_anterior & distinto.to_numpy()] = 'cambio'
+    unidos['tipo'] = tipo
+    unidos = unidos[unidos['tipo'] != '']
+
+    # Las bajas toman la descripción del dataset anterior
+    bajas = unidos.index[unidos['tipo'] == 'baja']
+    if len(bajas):
+        descripcion = ant.loc[bajas, COLUMNAS_CLAVE + COLUMNAS_DESCRIPCION].astype(object)
+        unidos = unidos.astype({c: object for c in COLUMNAS_CLAVE + COLUMNAS_DESCRIPCION})
+        unidos.loc[bajas, COLUMNAS_CLAVE + COLUMNAS_DESCRIPCION] = descripcion
+
+    unidos['diferencia'] = unidos['precio'] - unidos['precio_anterior']
+    unidos['variacion_pct'] = (unidos['diferencia'] / unidos['precio_anterior'] * 100).round(2)
+    return unidos[COLUMNAS_CAMBIOS].reset_index(drop=True)
+
+
+def _columnas_snapshot(directorio: str) -> list:
+    disponibles = leer_meta_snapshot(directorio).get('columnas', {})
+    return [c for c in COLUMNAS_CLAVE + COLUMNAS_DESCRIPCION + ['precio', 'fecha_vigencia'] if c in disponibles]
+
+
+def leer_ultimo() -> dict:
+    """Metadatos del último changefeed (desde, hasta, archivo, conteos) o {}."""
+    try:
+        with open(ARCHIVO_ULTIMO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def actualizar_changefeed(sha256: str) -> pd.DataFrame | None:
+    """
+    Changefeed del dataset `sha256` contra el anterior. Se calcula una sola vez
+    por dataset; las corridas siguientes leen el ya guardado. Devuelve None si
+    todavía no hay snapshot anterior con el que comparar.
+    """
+    meta = leer_ultimo()
+    if meta.get('hasta') == sha256 and os.path.exists(meta.get('archivo', '')):
+        return cargar_changefeed(meta['archivo'])
+
+    desde = leer_meta_snapshot(DIR_SNAPSHOT_ANTERIOR).get('sha256')
+    if leer_meta_snapshot(DIR_SNAPSHOT).get('sha256') != sha256 or not desde:
+        return None
+
+    cambios = calcular_cambios(
+        cargar_snapshot(_columnas_snapshot(DIR_SNAPSHOT_ANTERIOR), DIR_SNAPSHOT_ANTERIOR),
+        cargar_snapshot(_columnas_snapshot(DIR_SNAPSHOT), DIR_SNAPSHOT),
+    )
+    os.makedirs(DIR_CAMBIOS, exist_ok=True)
+    archivo = os.path.join(DIR_CAMBIOS, f"{datetime.now():%Y-%m-%d}_{sha256[:12]}.csv")
+    cambios.to_csv(archivo, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    conteo = cambios['tipo'].value_counts()
+    meta = {"desde": desde, "hasta": sha256, "archivo": archivo, "filas": len(cambios),
+            "creado": datetime.now().isoformat(timespec="seconds"),
+            **{t: int(conteo.get(t, 0)) for t in ('alta', 'baja', 'cambio')}}
+    tmp = ARCHIVO_ULTIMO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ARCHIVO_ULTIMO)
+
+    for viejo in sorted(glob.glob(os.path.join(DIR_CAMBIOS, "????-??-??_*.csv")))[:-CONSERVAR]:
+        os.remove(viejo)
+    return cambios
+
+
+def ya_alertado(sha256: str) -> bool:
+    """True si las alertas del changefeed de `sha256` ya salieron en una corrida anterior."""
+    return leer_ultimo().get('alertado') == sha256
+
+
+def marcar_alertado(sha256: str) -> None:
+    """Registra que las alertas del changefeed de `sha256` ya salieron."""
+    meta = leer_ultimo()
+    if meta.get('hasta') != sha256:
+        return
+    meta['alertado'] = sha256
+    tmp = ARCHIVO_ULTIMO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ARCHIVO_ULTIMO)
+
+
+def cargar_changefeed(ruta: str | None = None) -> pd.DataFrame:
+    """Lee un changefeed guardado (por defecto, el último)."""
+    ruta = ruta or leer_ultimo()['archivo']
+    return pd.read_csv(ruta, dtype={c: str for c in COLUMNAS_CLAVE + COLUMNAS_DESCRIPCION},
+                       parse_dates=['fecha_vigencia_anterior', 'fecha_vigencia'], date_format='%Y-%m-%d %H:%M:%S')
+
+
+def cambios_de_objetivos(cambios: pd.DataFrame, objetivos: list) -> dict:
+    """{Objetivo: fila del changefeed} para los objetivos cuyo precio cambió (o apareció)."""
+    if cambios is None or cambios.empty:
+        return {}
+    presentes = cambios[cambios['tipo'] != 'baja']
+    claves = claves_normalizadas(presentes)
+    presentes = presentes[claves.isin([o.clave for o in objetivos])]
+    por_clave = {clave: fila for clave, (_, fila) in zip(claves_normalizadas(presentes), presentes.iterrows())}
+    return {o: por_clave[o.clave] for o in objetivos if o.clave in por_clave}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumen del último changefeed nacional.")
+    parser.add_argument("--top", type=int, default=0, help="mostrar las N mayores variaciones")
+    args = parser.parse_args()
+
+    meta = leer_ultimo()
+    if not os.path.exists(meta.get('archivo', '')):
+        print(f"ℹ️ No hay changefeed en {DIR_CAMBIOS}. Hacen falta dos datasets distintos.")
+        raise SystemExit(0)
+    cambios = cargar_changefeed(meta['archivo'])
+    print(f"🔔 Changefeed {meta.get('desde', '?')[:12]} → {meta.get('hasta', '?')[:12]}: "
+          f"{meta.get('cambio', 0)} cambios, {meta.get('alta', 0)} altas, {meta.get('baja', 0)} bajas")
+    precios = cambios[cambios['tipo'] == 'cambio']
+    if not precios.empty:
+        por_producto = precios.groupby('producto')['variacion_pct'].agg(['count', 'median'])
+        for producto, fila in por_producto.sort_values('count', ascending=False).iterrows():
+            print(f"   {producto:<40} {int(fila['count']):>6}  mediana {fila['median']:+.2f}%")
+    if args.top:
+        mayores = precios.reindex(precios['variacion_pct'].abs().sort_values(ascending=False).index)
+        for _, c in mayores.head(args.top).iterrows():
+            emoji = "🔺" if c['diferencia'] > 0 else "🔻"
+            print(f"   {emoji} {c['empresa']} ({c['localidad']}) {c['producto']} {c['tipohorario']}: "
+                  f"${c['precio_anterior']:,.2f} → ${c['precio']:,.2f} ({c['variacion_pct']:+.2f}%)")
@@ -0,0 +1,184 @@
+"""
+chequeo.py
+==========
+Modo liviano: responde "¿cambió el precio?" sin cargar pandas, requests,
+tweepy ni BeautifulSoup. Pensado para sondear seguido y correr la
+verificación completa (nafta_tracker.py) solo cuando hace falta.
+
+  1. GET condicional del dataset con urllib, sobre la misma caché que usa
+     nafta_tracker.py (un 304 no descarga nada).
+  2. Si el dataset no cambió y las filas filtradas cacheadas siguen vigentes,
+     se leen esas pocas filas; si no, se recorre el CSV con el módulo csv.
+  3. Se compara el precio vigente de cada objetivo con el último del histórico
+     (índice de historico.py, sin leer el CSV completo).
+
+No escribe históricos ni publica nada.
+
+Códigos de salida: 0 sin cambios, 2 algún precio cambió (o no hay histórico),
+3 ningún objetivo tiene datos, 1 error.
+
+Uso:
+  python chequeo.py                 reporte legible
+  python chequeo.py --json          una línea JSON por objetivo
+  python chequeo.py --presupuesto   mide el tiempo de import (mejor de REPETICIONES_IMPORT)
+                                    y falla si supera PRESUPUESTO_IMPORT_MS o si carga
+                                    módulos pesados; no usa la red
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+
+from configuracion import URL, ARCHIVO_DATASET_CACHE, ARCHIVO_FILAS_CACHE, OBJETIVO_PRINCIPAL
+from descargas import descargar_liviano, leer_meta
+from historico import Historico
+from objetivos import cargar_objetivos, huella_objetivos
+
+# ── PRESUPUESTO DE ARRANQUE ───────────────────────────────────────────────────
+# Medido con `python -X importtime -c "import chequeo"`: ~40 ms, contra ~560 ms
+# de nafta_tracker (pandas, requests). El margen cubre la variación entre runners.
+PRESUPUESTO_IMPORT_MS = 60
+REPETICIONES_IMPORT   = 5    # se toma el mejor: el ruido del runner solo suma tiempo
+MODULOS_PESADOS = ("pandas", "numpy", "requests", "tweepy", "bs4", "lxml", "xlrd")
+
+SALIDA_SIN_CAMBIOS = 0
+SALIDA_CAMBIO      = 2
+SALIDA_SIN_DATOS   = 3
+
+
+def _a_float(valor) -> float | None:
+    try:
+        return float(str(valor).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _clave_fila(fila: dict) -> tuple:
+    return ((fila.get('idempresa') or '').strip(),
+            (fila.get('producto') or '').strip().casefold(),
+            (fila.get('tipohorario') or '').strip().casefold())
+
+
+def precios_vigentes(filas, objetivos: list) -> dict:
+    """
+    {clave: (fecha_vigencia, precio)} con el registro de fecha_vigencia más
+    reciente de cada objetivo. Las fechas del dataset son ISO, así que se
+    comparan como texto; una fecha vacía solo gana si no hay otra.
+    """
+    claves = {o.clave for o in objetivos}
+    vigentes = {}
+    for fila in filas:
+        clave = _clave_fila(fila)
+        if clave not in claves:
+            continue
+        fecha = (fila.get('fecha_vigencia') or '').strip()
+        actual = vigentes.get(clave)
+        if actual is None or fecha > actual[0]:
+            vigentes[clave] = (fecha, _a_float(fila.get('precio')))
+    return vigentes
+
+
+def _leer_filas(ruta: str):
+    with open(ruta, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def chequear(url: str = URL) -> list:
+    """Compara el precio vigente de cada objetivo con el último guardado en su histórico."""
+    objetivos = cargar_objetivos(OBJETIVO_PRINCIPAL)
+    descarga = descargar_liviano(url, ARCHIVO_DATASET_CACHE)
+
+    meta_filas = leer_meta(ARCHIVO_FILAS_CACHE)
+    filas_vigentes = (os.path.exists(ARCHIVO_FILAS_CACHE)
+                      and meta_filas.get('sha256') == descarga.sha256
+                      and meta_filas.get('objetivos') == huella_objetivos(objetivos))
+    fuente = ARCHIVO_FILAS_CACHE if filas_vigentes else descarga.ruta
+    vigentes = precios_vigentes(_leer_filas(fuente), objetivos)
+
+    resultados = []
+    for objetivo in objetivos:
+        fecha, precio = vigentes.get(objetivo.clave, (None, None))
+        anterior = Historico(objetivo.archivo_historico).ultimo_precio()
+        resultados.append({
+            "etiqueta": objetivo.etiqueta,
+            "idempresa": objetivo.idempresa,
+            "precio": precio,
+            "anterior": anterior,
+            "fecha_vigencia": fecha,
+            "cambio": precio is not None and (anterior is None or precio != anterior),
+            "dataset_cambio": descarga.cambio,
+        })
+    return resultados
+
+
+def codigo_salida(resultados: list) -> int:
+    if all(r["precio"] is None for r in resultados):
+        return SALIDA_SIN_DATOS
+    return SALIDA_CAMBIO if any(r["cambio"] for r in resultados) else SALIDA_SIN_CAMBIOS
+
+
+def _importar_chequeo() -> tuple:
+    """(ms acumulados del import de chequeo, módulos pesados cargados) en un intérprete nuevo."""
+    import subprocess
+
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    codigo = ("import sys, chequeo; "
+              f"print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                          cwd=aqui, capture_output=True, text=True, check=True)
+    acumulado_us = 0
+    for linea in proc.stderr.splitlines():
+        partes = [p.strip() for p in linea.split("|")]
+        if len(partes) == 3 and partes[2] == "chequeo":
+            acumulado_us = int(partes[1])
+    return acumulado_us / 1000, [m for m in proc.stdout.strip().split(",") if m]
+
+
+def medir_import(repeticiones: int = REPETICIONES_IMPORT) -> int:
+    """Verifica el presupuesto de arranque con el mejor de `repeticiones` imports en frío."""
+    medidas = [_importar_chequeo() for _ in range(repeticiones)]
+    ms = min(m for m, _ in medidas)
+    pesados = sorted({p for _, cargados in medidas for p in cargados})
+    print(f"⏱️ import chequeo: {ms:.1f} ms, mejor de {repeticiones} "
+          f"(presupuesto {PRESUPUESTO_IMPORT_MS} ms)")
+    if pesados:
+        print(f"❌ Se cargaron módulos pesados: {', '.join(pesados)}")
+    if ms > PRESUPUESTO_IMPORT_MS:
+        print("❌ Presupuesto de import excedido")
+    return 1 if pesados or ms > PRESUPUESTO_IMPORT_MS else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chequeo liviano: ¿cambió el precio?")
+    parser.add_argument("--json", action="store_true", help="una línea JSON por objetivo")
+    parser.add_argument("--presupuesto", action="store_true",
+                        help="verifica el presupuesto de tiempo de import y termina")
+    args = parser.parse_args()
+
+    if args.presupuesto:
+        sys.exit(medir_import())
+
+    try:
+        # Con --json, stdout queda solo para los resultados
+        with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+            resultados = chequear()
+    except Exception as e:
+        print(f"❌ Error en el chequeo: {e}")
+        sys.exit(1)
+
+    for r in resultados:
+        if args.json:
+            print(json.dumps(r, ensure_ascii=False))
+        elif r["precio"] is None:
+            print(f"❌ {r['etiqueta']}: sin datos (idempresa {r['idempresa']})")
+        elif r["anterior"] is None:
+            print(f"🆕 {r['etiqueta']}: ${r['precio']:,.2f} (sin histórico)")
+        elif r["cambio"]:
+            emoji = "🔺" if r["precio"] > r["anterior"] else "🔻"
+            print(f"{emoji} {r['etiqueta']}: ${r['anterior']:,.2f} → ${r['precio']:,.2f}")
+        else:
+            print(f"✅ {r['etiqueta']}: sin cambios (${r['precio']:,.2f})")
+    sys.exit(codigo_salida(resultados))
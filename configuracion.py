@@ -0,0 +1,42 @@
+"""
+configuracion.py
+================
+Fuente de datos y estación seguida. Solo usa la biblioteca estándar: la
+comparten nafta_tracker.py (corrida completa) y chequeo.py (modo liviano).
+"""
+
+import os
+
+from descargas import DIR_CACHE
+from objetivos import Objetivo
+
+# --- Configuración de Datos ---
+URL = "http://datos.energia.gob.ar/dataset/1c181390-5045-475e-94dc-410429be4b17/resource/80ac25de-a44a-4445-9215-090cf55cfda5/download/precios-en-surtidor-resolucin-3142016.csv"
+ARCHIVO_HISTORICO = "data/historico_precios.csv"
+
+# Caché de la descarga (GET condicional) y de las filas ya filtradas de esa descarga
+ARCHIVO_DATASET_CACHE = os.path.join(DIR_CACHE, "precios-en-surtidor.csv")
+ARCHIVO_FILAS_CACHE = os.path.join(DIR_CACHE, "filas_objetivos.csv")
+
+# --- CONFIGURACIÓN DE BÚSQUEDA ---
+BUSCAR_PRODUCTO = 'Nafta (súper) entre 92 y 95 Ron'
+
+# UNITEC suspendida temporalmente — no está actualizando datos en la fuente oficial
+# BUSCAR_RAZON_SOCIAL = 'UNITECPROCOM SA'
+
+# Nueva estación activa: GAS IMPULSO S.A. — Ruta 25 Nro. 619, Pilar, Buenos Aires
+# idempresa: 1519 | turno: Diurno
+BUSCAR_RAZON_SOCIAL = 'GAS IMPULSO'
+BUSCAR_IDEMPRESA = '1519'
+BUSCAR_TIPOHORARIO = 'Diurno'
+
+# Objetivo principal: conserva data/historico_precios.csv y se publica en X/Telegram.
+# Los objetivos adicionales se declaran en data/objetivos.csv (ver objetivos.py).
+OBJETIVO_PRINCIPAL = Objetivo(
+    idempresa=BUSCAR_IDEMPRESA,
+    producto=BUSCAR_PRODUCTO,
+    tipohorario=BUSCAR_TIPOHORARIO,
+    etiqueta='Nafta Súper en YPF',
+    archivo_historico=ARCHIVO_HISTORICO,
+    publicar=True,
+)
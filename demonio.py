@@ -0,0 +1,237 @@
+"""
+demonio.py
+==========
+Modo demonio: un proceso que queda corriendo y sondea el dataset nacional en
+lugar de arrancar de cero una vez por día.
+
+Entre sondeos quedan en memoria:
+  - la sesión HTTP (conexión reutilizada) y la última Descarga
+  - las filas ya filtradas y tipadas del dataset vigente
+  - la tabla A3500 del día
+  - los índices de los históricos (Historico.refrescar() solo mira la cola del CSV)
+  - los objetivos (se releen si cambia data/objetivos.csv)
+
+Del dataset nacional solo quedan residentes las filas de los objetivos, no la
+tabla completa. Los consumidores del dataset entero (changefeed, agregados,
+calidad, archivo diario, índice espacial) ya leen el snapshot columnar
+(snapshot.py) mapeado en memoria, una vez por hash, sin volver a parsear el
+CSV; tenerlo además como DataFrame en el proceso solo sumaría memoria. Si
+cambia data/objetivos.csv se vuelve a recorrer el CSV descargado: las filas
+del histórico se guardan con el texto original del dataset, y el snapshot
+guarda valores normalizados (texto recortado, números y fechas ya
+convertidos), así que filtrar desde él cambiaría lo que se escribe. Editar
+los objetivos es raro; sondear, no.
+
+Cada sondeo es un GET condicional: si el servidor responde 304 (o el hash no
+cambió) no se parsea nada. Un dataset nuevo se filtra una sola vez (con su
+snapshot, changefeed, agregados, control de calidad y archivo diario) y, si
+el día todavía no se procesó, corre la corrida completa de
+nafta_tracker.main() con todo lo residente. Si hasta HORA_CORTE no apareció
+un dataset nuevo, la corrida del día se hace igual con el vigente, como el
+cron. Con el día ya procesado, un dataset nuevo en el que cambió el precio de
+algún objetivo vuelve a correr main(): el cambio de la tarde también deja su
+fila en el histórico, su alerta y su reporte.
+
+El intervalo se adapta a la hora: cada INTERVALO_PICO minutos en las horas
+en que suele publicarse el dataset y cada INTERVALO_REPOSO fuera de ellas
+(despertando a tiempo para la próxima hora pico). Las horas pico se aprenden
+de los cambios observados (data/cache/demonio.json); hasta tener
+MIN_OBSERVACIONES se usan HORAS_PICO. Ante errores el intervalo crece de a
+dobles hasta INTERVALO_REPOSO.
+
+Uso:
+  python demonio.py                         sondea sin parar
+  python demonio.py --una-vez               un solo sondeo
+  python demonio.py --pico 5 --reposo 60 --corte 12
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from metricas import etapa, nueva_corrida
+from nafta_tracker import (_USD_SYNC_DISPONIBLE, descargar_dataset, filtrar_descarga,
+                           generar_agregados, generar_archivo, generar_calidad, generar_changefeed, main)
+from objetivos import ARCHIVO_OBJETIVOS, cargar_objetivos, firma_precios
+from configuracion import OBJETIVO_PRINCIPAL
+
+if _USD_SYNC_DISPONIBLE:
+    from usd_sync import obtener_dolar_a3500
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA       = "data"
+ARCHIVO_ESTADO = os.path.join(DIR_DATA, "cache", "demonio.json")
+
+# ── CALENDARIO ────────────────────────────────────────────────────────────────
+INTERVALO_PICO    = 5     # minutos
+INTERVALO_REPOSO  = 60    # minutos
+HORA_CORTE        = 12    # sin dataset nuevo, la corrida del día se hace igual a esta hora
+HORAS_PICO        = range(7, 12)
+MIN_OBSERVACIONES = 5
+MAX_OBSERVACIONES = 60
+
+
+def leer_estado() -> dict:
+    """Estado persistido: último día, dataset y precios procesados, horas en que se vieron cambios."""
+    try:
+        with open(ARCHIVO_ESTADO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_estado(estado: dict) -> None:
+    os.makedirs(os.path.dirname(ARCHIVO_ESTADO), exist_ok=True)
+    tmp = ARCHIVO_ESTADO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ARCHIVO_ESTADO)
+
+
+def horas_pico(observadas: list) -> set:
+    """Horas en que se publicaron datasets nuevos (y la siguiente a cada una)."""
+    if len(observadas) < MIN_OBSERVACIONES:
+        return set(HORAS_PICO)
+    # Una hora vista una sola vez entre muchas es ruido
+    minimo = 2 if len(observadas) >= 3 * MIN_OBSERVACIONES else 1
+    frecuentes = [h for h, n in Counter(observadas).items() if n >= minimo]
+    return {(h + d) % 24 for h in frecuentes for d in (0, 1)}
+
+
+def proximo_intervalo(ahora: datetime, pico: set, minutos_pico: float, minutos_reposo: float) -> float:
+    """Segundos hasta el próximo sondeo."""
+    if ahora.hour in pico:
+        return minutos_pico * 60
+    espera = minutos_reposo * 60
+    # No pasarse del comienzo de la próxima hora pico
+    for h in range(1, 25):
+        if (ahora.hour + h) % 24 in pico:
+            inicio = (ahora + timedelta(hours=h)).replace(minute=0, second=0, microsecond=0)
+            espera = min(espera, (inicio - ahora).total_seconds())
+            break
+    return max(espera, minutos_pico * 60 / 5)
+
+
+class Residente:
+    """Todo lo que el demonio conserva en memoria entre sondeos."""
+
+    def __init__(self, corte: int = HORA_CORTE):
+        self.corte = corte
+        self.estado = leer_estado()
+        self.objetivos = None
+        self._firma_objetivos = None
+        self.descarga = None
+        self.df_filtrado = None
+        self.firma = None
+        self.df_tc = None
+        self._dia_tc = None
+        self.historicos = {}
+
+    def _cargar_objetivos(self) -> None:
+        try:
+            st = os.stat(ARCHIVO_OBJETIVOS)
+            firma = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            firma = None
+        if self.objetivos is None or firma != self._firma_objetivos:
+            self.objetivos = cargar_objetivos(OBJETIVO_PRINCIPAL)
+            self._firma_objetivos = firma
+            self.df_filtrado = None
+
+    def _tabla_tc(self):
+        """Tabla A3500 del día: se resuelve una vez (caché local o red) y queda residente."""
+        hoy = datetime.now().date()
+        if _USD_SYNC_DISPONIBLE and self._dia_tc != hoy:
+            try:
+                self.df_tc = obtener_dolar_a3500([hoy])
+                self._dia_tc = hoy
+            except Exception as e:
+                print(f"⚠️ A3500 falló, se reintenta en la corrida: {e}")
+                self.df_tc = None
+        return self.df_tc
+
+    def _actualizar_dataset(self, descarga) -> bool:
+        """Filtra el dataset si es nuevo para el proceso. Devuelve True si cambió."""
+        anterior = self.descarga.sha256 if self.descarga is not None else None
+        self.descarga = descarga
+        if descarga.sha256 == anterior and self.df_filtrado is not None:
+            return False
+        self.df_filtrado = filtrar_descarga(descarga, self.objetivos)
+        self.firma = firma_precios(self.df_filtrado, self.objetivos)
+        for nombre, generar in (("Changefeed", generar_changefeed), ("Agregados", generar_agregados),
+                                ("Calidad", generar_calidad), ("Archivo diario", generar_archivo)):
+            try:
+                generar(descarga)
+            except Exception as e:
+                print(f"⚠️ {nombre} falló: {e}")
+        if anterior is not None and descarga.sha256 != anterior:
+            horas = self.estado.get("horas_cambio", []) + [datetime.now().hour]
+            self.estado["horas_cambio"] = horas[-MAX_OBSERVACIONES:]
+            guardar_estado(self.estado)
+            print(f"🔔 Dataset nuevo ({descarga.sha256[:12]})")
+        return descarga.sha256 != anterior
+
+    def sondear(self) -> bool:
+        """Un sondeo: GET condicional y, si corresponde, la corrida del día. Devuelve True si corrió."""
+        with etapa("sondeo") as m:
+            self._cargar_objetivos()
+            descarga = descargar_dataset()
+            nuevo = self._actualizar_dataset(descarga)
+            hoy = str(datetime.now().date())
+            pendiente = self.estado.get("dia") != hoy
+            novedad = descarga.sha256 != self.estado.get("sha256")
+            # Con el día ya procesado, solo un precio distinto de algún objetivo justifica otra corrida
+            precios = novedad and self.firma != self.estado.get("firma")
+            correr = (pendiente and (novedad or datetime.now().hour >= self.corte)) or precios
+            m.anotar(cambio=nuevo, corrida=correr, precios=precios)
+        if correr:
+            self._corrida(descarga, hoy)
+        return correr
+
+    def _corrida(self, descarga, hoy: str) -> None:
+        nueva_corrida()
+        main(descarga=descarga, objetivos=self.objetivos, df_filtrado=self.df_filtrado,
+             df_tc=self._tabla_tc(), historicos=self.historicos)
+        self.estado.update(dia=hoy, sha256=descarga.sha256, firma=self.firma)
+        guardar_estado(self.estado)
+
+
+def ejecutar(minutos_pico: float = INTERVALO_PICO, minutos_reposo: float = INTERVALO_REPOSO,
+             corte: int = HORA_CORTE, una_vez: bool = False) -> None:
+    """Bucle del demonio."""
+    residente = Residente(corte)
+    errores = 0
+    while True:
+        try:
+            residente.sondear()
+            errores = 0
+        except Exception as e:
+            errores += 1
+            print(f"⚠️ Sondeo falló ({errores} seguido(s)): {e}")
+        if una_vez:
+            return
+        if errores:
+            espera = min(minutos_reposo * 60, minutos_pico * 60 * 2 ** errores)
+        else:
+            pico = horas_pico(residente.estado.get("horas_cambio", []))
+            espera = proximo_intervalo(datetime.now(), pico, minutos_pico, minutos_reposo)
+        print(f"💤 Próximo sondeo: {datetime.now() + timedelta(seconds=espera):%H:%M}")
+        time.sleep(espera)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sondea el dataset nacional con estado residente.")
+    parser.add_argument("--pico", type=float, default=INTERVALO_PICO, help="minutos entre sondeos en horas pico")
+    parser.add_argument("--reposo", type=float, default=INTERVALO_REPOSO, help="minutos entre sondeos fuera de ellas")
+    parser.add_argument("--corte", type=int, default=HORA_CORTE,
+                        help="hora a la que se hace la corrida del día aunque no haya dataset nuevo")
+    parser.add_argument("--una-vez", action="store_true", help="un solo sondeo y salir")
+    args = parser.parse_args()
+
+    try:
+        ejecutar(args.pico, args.reposo, args.corte, args.una_vez)
+    except KeyboardInterrupt:
+        print("\n👋 Demonio detenido")
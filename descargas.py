@@ -0,0 +1,256 @@
+"""
+descargas.py
+============
+Descarga con caché local y GET condicional, más la capa de concurrencia
+compartida por todas las fuentes remotas.
+
+El cuerpo descargado se guarda en disco junto con su ETag, Last-Modified y
+hash SHA-256. En la siguiente descarga se envían If-None-Match /
+If-Modified-Since: si el servidor responde 304, o si el contenido nuevo tiene
+el mismo hash, la descarga se marca como "sin cambios" y el llamador puede
+saltear el parseo completo.
+
+Concurrencia:
+  - obtener_sesion(): requests.Session compartida con pool de conexiones.
+  - en_paralelo(): corre varias descargas a la vez (dataset + A3500).
+  - primera_valida(): "hedging" entre fuentes equivalentes; lanza la
+    siguiente fuente si la anterior falla o tarda más de `demora` segundos
+    y devuelve la primera respuesta válida.
+La latencia de una corrida queda acotada por la descarga más lenta, no por
+la suma de los timeouts.
+
+requests, urllib y concurrent.futures se importan recién cuando se usan: importar
+este módulo es casi gratis (lo necesita el modo liviano de chequeo.py, que
+descarga con urllib mediante descargar_liviano()).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA  = "data"
+DIR_CACHE = os.path.join(DIR_DATA, "cache")
+
+TAMANO_BLOQUE = 1024 * 1024
+DEMORA_HEDGE  = 3.0
+
+_sesion = None
+_lock_sesion = threading.Lock()
+
+
+@dataclass
+class Descarga:
+    ruta: str
+    cambio: bool
+    bytes_descargados: int
+    sha256: str
+
+
+def _leer_meta(ruta_meta: str) -> dict:
+    if not os.path.exists(ruta_meta):
+        return {}
+    try:
+        with open(ruta_meta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_meta(ruta_meta: str, meta: dict) -> None:
+    tmp = ruta_meta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ruta_meta)
+
+
+def leer_meta(ruta: str) -> dict:
+    """Metadatos (etag, last_modified, sha256, ...) guardados para un archivo cacheado."""
+    return _leer_meta(ruta + ".meta.json")
+
+
+def descargar_con_cache(url: str, ruta: str, timeout: int = 30, sesion=None) -> Descarga:
+    """
+    Descarga `url` en `ruta` (streaming, sin cargar el cuerpo en memoria).
+    Devuelve Descarga(cambio=False) si el servidor respondió 304 o si el
+    contenido es idéntico al ya cacheado.
+    """
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    meta = _leer_meta(ruta + ".meta.json") if os.path.exists(ruta) else {}
+
+    headers = _cabeceras_condicionales(meta)
+
+    cliente = sesion or obtener_sesion()
+    with cliente.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+        if resp.status_code == 304:
+            print(f"  ♻️ {os.path.basename(ruta)}: sin cambios (304 Not Modified)")
+            return Descarga(ruta, False, 0, meta.get("sha256", ""))
+        resp.raise_for_status()
+
+        sha = hashlib.sha256()
+        total = 0
+        tmp = ruta + ".part"
+        with open(tmp, "wb") as f:
+            for bloque in resp.iter_content(chunk_size=TAMANO_BLOQUE):
+                sha.update(bloque)
+                total += len(bloque)
+                f.write(bloque)
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+    return _finalizar_descarga(url, ruta, meta, sha.hexdigest(), total, etag, last_modified)
+
+
+def descargar_liviano(url: str, ruta: str, timeout: int = 30) -> Descarga:
+    """
+    Igual que descargar_con_cache() pero con urllib (sin importar requests).
+    Comparte la caché y sus metadatos: un 304 acá también es un 304 para la corrida completa.
+    """
+    import urllib.error
+    import urllib.request
+
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    meta = _leer_meta(ruta + ".meta.json") if os.path.exists(ruta) else {}
+    pedido = urllib.request.Request(url, headers=_cabeceras_condicionales(meta))
+    try:
+        resp = urllib.request.urlopen(pedido, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            print(f"  ♻️ {os.path.basename(ruta)}: sin cambios (304 Not Modified)")
+            return Descarga(ruta, False, 0, meta.get("sha256", ""))
+        raise
+    with resp:
+        sha = hashlib.sha256()
+        total = 0
+        with open(ruta + ".part", "wb") as f:
+            for bloque in iter(lambda: resp.read(TAMANO_BLOQUE), b""):
+                sha.update(bloque)
+                total += len(bloque)
+                f.write(bloque)
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+    return _finalizar_descarga(url, ruta, meta, sha.hexdigest(), total, etag, last_modified)
+
+
+def _cabeceras_condicionales(meta: dict) -> dict:
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _finalizar_descarga(url, ruta, meta, digest, total, etag, last_modified) -> Descarga:
+    """Reemplaza la caché si el contenido cambió y actualiza sus metadatos."""
+    tmp = ruta + ".part"
+    ruta_meta = ruta + ".meta.json"
+    cambio = digest != meta.get("sha256")
+    if cambio:
+        os.replace(tmp, ruta)
+    else:
+        os.remove(tmp)
+        print(f"  ♻️ {os.path.basename(ruta)}: contenido idéntico al cacheado")
+
+    meta_nueva = dict(meta) if not cambio else {}
+    meta_nueva.update({
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "sha256": digest,
+        "bytes": total,
+        "descargado": datetime.now().isoformat(timespec="seconds"),
+    })
+    _guardar_meta(ruta_meta, meta_nueva)
+    return Descarga(ruta, cambio, total, digest)
+
+
+def actualizar_meta(ruta: str, **valores) -> None:
+    """Agrega o reemplaza claves en los metadatos de un archivo cacheado."""
+    ruta_meta = ruta + ".meta.json"
+    meta = _leer_meta(ruta_meta)
+    meta.update(valores)
+    _guardar_meta(ruta_meta, meta)
+
+
+# ── Concurrencia ──────────────────────────────────────────────────────────────
+def obtener_sesion() -> "requests.Session":
+    """
+    Sesión HTTP del proceso, con pool de conexiones por host. Se comparte entre
+    hilos: el pool de urllib3 es thread-safe y no se usan cookies.
+    """
+    global _sesion
+    with _lock_sesion:
+        if _sesion is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _sesion = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+            _sesion.mount("http://", adaptador)
+            _sesion.mount("https://", adaptador)
+            _sesion.headers.update({"User-Agent": "Mozilla/5.0"})
+        return _sesion
+
+
+def en_paralelo(**tareas) -> dict:
+    """
+    Ejecuta cada tarea (callable sin argumentos) en su propio hilo.
+    Devuelve {nombre: resultado}; si una tarea falla, su valor es la excepción.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(tareas))) as pool:
+        futuros = {pool.submit(fn): nombre for nombre, fn in tareas.items()}
+        for futuro, nombre in futuros.items():
+            try:
+                resultados[nombre] = futuro.result()
+            except Exception as e:
+                resultados[nombre] = e
+    return resultados
+
+
+def primera_valida(fuentes: list, demora: float = DEMORA_HEDGE):
+    """
+    Hedging entre fuentes [(nombre, callable), ...] en orden de prioridad.
+    Arranca la primera; si falla o no respondió en `demora` segundos, arranca
+    también la siguiente. Devuelve (nombre, resultado) de la primera que termina
+    bien. Si todas fallan, lanza RuntimeError con el error de cada una.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    errores = {}
+    pool = ThreadPoolExecutor(max_workers=len(fuentes))
+    try:
+        pendientes = {}
+        restantes = list(fuentes)
+        while restantes or pendientes:
+            if restantes:
+                nombre, fn = restantes.pop(0)
+                pendientes[pool.submit(fn)] = nombre
+            inicio = time.monotonic()
+            while pendientes:
+                espera = demora - (time.monotonic() - inicio) if restantes else None
+                if espera is not None and espera <= 0:
+                    break
+                listos, _ = wait(pendientes, timeout=espera, return_when=FIRST_COMPLETED)
+                if not listos:
+                    break
+                for futuro in listos:
+                    nombre_listo = pendientes.pop(futuro)
+                    try:
+                        return nombre_listo, futuro.result()
+                    except Exception as e:
+                        errores[nombre_listo] = e
+                        print(f"  {nombre_listo} falló ({e})")
+                if restantes:
+                    break
+        detalle = "\n".join(f"  Error {n}: {e}" for n, e in errores.items())
+        raise RuntimeError(f"Ninguna fuente respondió correctamente.\n{detalle}")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
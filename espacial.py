@@ -0,0 +1,316 @@
+"""
+espacial.py
+===========
+Índice espacial de estaciones para consultas de competencia:
+"la Nafta súper más barata a 10 km de GAS IMPULSO" o "las 5 YPF más cercanas".
+
+Las coordenadas (latitud/longitud) salen del snapshot columnar. El índice es una
+grilla uniforme en grados (celdas de CELDA_KM de lado en latitud): las
+estaciones se ordenan por id de celda y cada fila de celdas que toca una
+consulta es un rango contiguo, que se ubica con searchsorted. Solo los
+candidatos de esas celdas pasan por la distancia haversine (vectorizada):
+una consulta de 10 km toca unas pocas decenas de estaciones, no todo el país.
+
+El índice se guarda en data/cache/espacial/. Cuando cambia el snapshot solo se
+recalcula la celda de las estaciones nuevas o que se movieron (y se quitan las
+que ya no están); si ninguna coordenada cambió, se reutiliza tal cual.
+
+Uso:
+  python espacial.py --cerca 1519 --radio 10 --producto "Nafta (súper) entre 92 y 95 Ron"
+  python espacial.py --cerca 1519 --k 5 --bandera YPF
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from snapshot import DIR_SNAPSHOT, cargar_snapshot, leer_meta_snapshot
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA     = "data"
+DIR_ESPACIAL = os.path.join(DIR_DATA, "cache", "espacial")
+
+CELDA_KM         = 5.0
+KM_POR_GRADO     = 111.32
+RADIO_TIERRA_KM  = 6371.0088
+RADIO_MAXIMO_KM  = 5000.0
+RADIO_COMPETENCIA_KM = 10.0
+
+GRADOS_CELDA = CELDA_KM / KM_POR_GRADO
+COLUMNAS_GRILLA = int(math.ceil(360 / GRADOS_CELDA)) + 1
+
+COLUMNAS_ESTACION = ['idempresa', 'empresa', 'empresabandera', 'localidad', 'direccion']
+
+
+def _celda(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    fila = np.floor((lat + 90) / GRADOS_CELDA).astype(np.int64)
+    col = np.floor((lon + 180) / GRADOS_CELDA).astype(np.int64)
+    return fila * COLUMNAS_GRILLA + col
+
+
+def distancia_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distancia haversine (km) de un punto a un arreglo de puntos."""
+    la1, lo1 = math.radians(lat), math.radians(lon)
+    la2, lo2 = np.radians(lats), np.radians(lons)
+    a = np.sin((la2 - la1) / 2) ** 2 + math.cos(la1) * np.cos(la2) * np.sin((lo2 - lo1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def estaciones_del_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por idempresa con coordenadas válidas (la primera que aparece)."""
+    lat, lon = np.asarray(df['latitud'], dtype=np.float64), np.asarray(df['longitud'], dtype=np.float64)
+    validas = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon) & (lat != 0) & (lon != 0))
+    ids = df['idempresa'].astype('category')
+    # Se deduplica sobre los códigos de la categoría, sin materializar el texto de cada fila
+    codigos, primeras = np.unique(ids.cat.codes.to_numpy()[validas], return_index=True)
+    filas = validas[primeras]
+    return pd.DataFrame({
+        'idempresa': ids.cat.categories.astype(str).to_numpy(dtype=object)[codigos],
+        'latitud': lat[filas],
+        'longitud': lon[filas],
+    })
+
+
+class IndiceEspacial:
+    """Estaciones ordenadas por celda de la grilla; consultas por radio y k vecinos."""
+
+    def __init__(self, ids: np.ndarray, lat: np.ndarray, lon: np.ndarray, celdas: np.ndarray | None = None):
+        celdas = _celda(lat, lon) if celdas is None else celdas
+        orden = np.argsort(celdas, kind='stable')
+        self.ids = np.asarray(ids, dtype=object)[orden]
+        self.lat = np.asarray(lat, dtype=np.float64)[orden]
+        self.lon = np.asarray(lon, dtype=np.float64)[orden]
+        self.celdas = np.asarray(celdas, dtype=np.int64)[orden]
+        self._posiciones = pd.Index(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def desde_estaciones(cls, estaciones: pd.DataFrame) -> "IndiceEspacial":
+        return cls(estaciones['idempresa'].to_numpy(dtype=object),
+                   estaciones['latitud'].to_numpy(dtype=np.float64),
+                   estaciones['longitud'].to_numpy(dtype=np.float64))
+
+    def posiciones(self, ids) -> np.ndarray:
+        """Posición en el índice de cada idempresa (-1 si no está)."""
+        return self._posiciones.get_indexer(pd.Index(ids).astype(str))
+
+    def coordenadas(self, idempresa: str) -> tuple | None:
+        pos = self.posiciones([str(idempresa)])[0]
+        return None if pos < 0 else (float(self.lat[pos]), float(self.lon[pos]))
+
+    def alinear(self, serie: pd.Series) -> np.ndarray:
+        """Valores de `serie` (indexada por idempresa) en el orden del índice; NaN si falta."""
+        return pd.Series(serie.to_numpy(dtype=np.float64), index=serie.index.astype(str)).reindex(self.ids).to_numpy()
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+    def _candidatos(self, lat: float, lon: float, radio_km: float) -> np.ndarray:
+        """Posiciones de las estaciones de las celdas que cubren el círculo."""
+        filas = int(math.ceil(radio_km / KM_POR_GRADO / GRADOS_CELDA))
+        lat_extrema = min(89.0, abs(lat) + radio_km / KM_POR_GRADO)
+        cols = int(math.ceil(radio_km / (KM_POR_GRADO * math.cos(math.radians(lat_extrema))) / GRADOS_CELDA))
+        cols = min(cols, COLUMNAS_GRILLA // 2)
+        centro = int(_celda(np.array([lat]), np.array([lon]))[0])
+        fila_c, col_c = divmod(centro, COLUMNAS_GRILLA)
+        # Cada fila de celdas es un rango contiguo de ids: dos searchsorted por fila
+        base = (np.arange(fila_c - filas, fila_c + filas + 1, dtype=np.int64) * COLUMNAS_GRILLA)
+        inicios = np.searchsorted(self.celdas, base + max(0, col_c - cols), side='left')
+        fines = np.searchsorted(self.celdas, base + min(COLUMNAS_GRILLA - 1, col_c + cols), side='right')
+        largos = fines - inicios
+        total = int(largos.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        desplazamientos = np.repeat(inicios - np.concatenate(([0], np.cumsum(largos)[:-1])), largos)
+        return np.arange(total, dtype=np.int64) + desplazamientos
+
+    def cercanas(self, lat: float, lon: float, radio_km: float, mascara: np.ndarray | None = None) -> tuple:
+        """(posiciones, distancias) de las estaciones a `radio_km` o menos, de la más cercana a la más lejana."""
+        pos = self._candidatos(lat, lon, radio_km)
+        if mascara is not None:
+            pos = pos[mascara[pos]]
+        dist = distancia_km(lat, lon, self.lat[pos], self.lon[pos])
+        dentro = dist <= radio_km
+        pos, dist = pos[dentro], dist[dentro]
+        orden = np.argsort(dist, kind='stable')
+        return pos[orden], dist[orden]
+
+    def k_cercanas(self, lat: float, lon: float, k: int, mascara: np.ndarray | None = None) -> tuple:
+        """Las `k` estaciones más cercanas (que cumplen `mascara`), ampliando el radio hasta encontrarlas."""
+        radio = CELDA_KM
+        while True:
+            pos, dist = self.cercanas(lat, lon, radio, mascara)
+            if len(pos) >= k or radio >= RADIO_MAXIMO_KM:
+                return pos[:k], dist[:k]
+            radio *= 2
+
+    def mas_baratas(self, lat: float, lon: float, radio_km: float, precios: np.ndarray, n: int = 1) -> tuple:
+        """Las `n` estaciones de menor precio a `radio_km` o menos (`precios` alineados con alinear())."""
+        pos, dist = self.cercanas(lat, lon, radio_km, mascara=~np.isnan(precios))
+        orden = np.lexsort((dist, precios[pos]))[:n]
+        return pos[orden], dist[orden]
+
+    # ── Persistencia ─────────────────────────────────────────────────────────
+    def guardar(self, sha256: str, directorio: str = DIR_ESPACIAL) -> None:
+        tmp = directorio + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "lat.npy"), self.lat)
+        np.save(os.path.join(tmp, "lon.npy"), self.lon)
+        np.save(os.path.join(tmp, "celdas.npy"), self.celdas)
+        with open(os.path.join(tmp, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump([str(i) for i in self.ids], f)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"sha256": sha256, "estaciones": len(self), "celda_km": CELDA_KM,
+                       "creado": datetime.now().isoformat(timespec="seconds")}, f)
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.replace(tmp, directorio)
+
+    @classmethod
+    def cargar(cls, directorio: str = DIR_ESPACIAL) -> tuple:
+        """(índice, meta) guardados, o (None, {}) si no hay o es de otra grilla."""
+        try:
+            with open(os.path.join(directorio, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("celda_km") != CELDA_KM:
+                return None, {}
+            with open(os.path.join(directorio, "ids.json"), encoding="utf-8") as f:
+                ids = np.array(json.load(f), dtype=object)
+            indice = cls(ids, np.load(os.path.join(directorio, "lat.npy")),
+                         np.load(os.path.join(directorio, "lon.npy")),
+                         np.load(os.path.join(directorio, "celdas.npy")))
+            return indice, meta
+        except (OSError, ValueError, KeyError):
+            return None, {}
+
+
+def actualizar_indice(df: pd.DataFrame | None = None, sha256: str | None = None) -> tuple:
+    """
+    Índice del snapshot vigente. Devuelve (índice, estaciones_recalculadas):
+    0 si se reutilizó el guardado, todas si se armó de cero.
+    """
+    sha256 = sha256 or leer_meta_snapshot(DIR_SNAPSHOT).get('sha256')
+    guardado, meta = IndiceEspacial.cargar()
+    if guardado is not None and meta.get('sha256') == sha256:
+        return guardado, 0
+
+    if df is None:
+        df = cargar_snapshot(['idempresa', 'latitud', 'longitud'])
+    estaciones = estaciones_del_snapshot(df)
+    if guardado is None:
+        indice = IndiceEspacial.desde_estaciones(estaciones)
+        indice.guardar(sha256)
+        return indice, len(indice)
+
+    # Solo se recalcula la celda de las estaciones nuevas o movidas
+    previas = pd.DataFrame({'idempresa': guardado.ids, 'lat_previa': guardado.lat,
+                            'lon_previa': guardado.lon, 'celda': guardado.celdas})
+    unidas = estaciones.merge(previas, on='idempresa', how='left')
+    movidas = ((unidas['latitud'] != unidas['lat_previa']) | (unidas['longitud'] != unidas['lon_previa'])).to_numpy()
+    if movidas.any():
+        unidas.loc[movidas, 'celda'] = _celda(unidas.loc[movidas, 'latitud'].to_numpy(),
+                                              unidas.loc[movidas, 'longitud'].to_numpy())
+    if movidas.any() or len(unidas) != len(guardado):
+        indice = IndiceEspacial(unidas['idempresa'].to_numpy(dtype=object), unidas['latitud'].to_numpy(),
+                                unidas['longitud'].to_numpy(), unidas['celda'].to_numpy(dtype=np.int64))
+    else:
+        indice = guardado
+    indice.guardar(sha256)
+    return indice, int(movidas.sum())
+
+
+def _normalizar(texto) -> str:
+    return str(texto).strip().casefold()
+
+
+def precios_por_estacion(df: pd.DataFrame, producto: str, tipohorario: str) -> pd.DataFrame:
+    """
+    Precio vigente de `producto`/`tipohorario` en cada estación del snapshot, con
+    sus datos descriptivos; indexado por idempresa. El filtro compara las
+    categorías (unas pocas) y no las filas.
+    """
+    mascara = np.ones(len(df), dtype=bool)
+    for col, valor in (('producto', producto), ('tipohorario', tipohorario)):
+        categorias = df[col].cat.categories
+        codigos = [i for i, c in enumerate(categorias) if _normalizar(c) == _normalizar(valor)]
+        mascara &= np.isin(df[col].cat.codes.to_numpy(), codigos)
+    columnas = [c for c in COLUMNAS_ESTACION if c in df.columns] + ['precio', 'fecha_vigencia']
+    filas = df.loc[mascara, columnas]
+    filas = filas[filas['precio'].notna()].astype({c: str for c in COLUMNAS_ESTACION if c in filas.columns})
+    filas = filas.sort_values('fecha_vigencia', ascending=False, kind='stable').drop_duplicates('idempresa')
+    return filas.set_index('idempresa')
+
+
+def contexto_competencia(indice: IndiceEspacial, precios: pd.DataFrame, idempresa: str,
+                         radio_km: float = RADIO_COMPETENCIA_KM) -> str:
+    """
+    Dos líneas para el reporte: puesto por precio entre las estaciones del radio
+    y la más barata. Corto a propósito: se suma a la respuesta mensual en X.
+    """
+    centro = indice.coordenadas(idempresa)
+    if centro is None or str(idempresa) not in precios.index:
+        return ""
+    alineados = indice.alinear(precios['precio'])
+    pos, _ = indice.cercanas(*centro, radio_km, mascara=~np.isnan(alineados))
+    otras = pos[indice.ids[pos] != str(idempresa)]
+    if len(otras) == 0:
+        return ""
+    propio = float(precios.at[str(idempresa), 'precio'])
+    valores = alineados[otras]
+    barata = precios.loc[indice.ids[otras[np.argmin(valores)]]]
+    puesto = int((valores < propio).sum()) + 1
+    return (f"🏁 Competencia a {radio_km:g} km: puesto {puesto} de {len(otras) + 1}\n"
+            f"Más barata: {str(barata['empresa'])[:24]} ${float(barata['precio']):,.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consultas espaciales sobre el snapshot del dataset.")
+    parser.add_argument("--cerca", required=True, help="idempresa de referencia")
+    parser.add_argument("--radio", type=float, default=RADIO_COMPETENCIA_KM, help="radio en km")
+    parser.add_argument("--k", type=int, help="las k estaciones más cercanas (en lugar de un radio)")
+    parser.add_argument("--bandera", help="solo estaciones de esta bandera (YPF, SHELL C.A.P.S.A., ...)")
+    parser.add_argument("--producto", help="ordenar por precio de este producto")
+    parser.add_argument("--horario", default="Diurno")
+    parser.add_argument("--limite", type=int, default=10)
+    args = parser.parse_args()
+
+    df = cargar_snapshot()
+    indice, recalculadas = actualizar_indice(df)
+    centro = indice.coordenadas(args.cerca)
+    if centro is None:
+        print(f"❌ La estación {args.cerca} no tiene coordenadas en el snapshot.")
+        raise SystemExit(1)
+
+    estaciones = df[COLUMNAS_ESTACION].drop_duplicates('idempresa').astype(str).set_index('idempresa')
+    mascara = None
+    if args.bandera:
+        banderas = estaciones['empresabandera'].str.casefold().reindex(indice.ids)
+        mascara = (banderas == args.bandera.casefold()).to_numpy()
+
+    if args.producto:
+        alineados = indice.alinear(precios_por_estacion(df, args.producto, args.horario)['precio'])
+        if mascara is not None:
+            alineados[~mascara] = np.nan
+    inicio = time.perf_counter()
+    if args.producto:
+        pos, dist = indice.mas_baratas(*centro, args.radio, alineados, n=args.limite)
+    elif args.k:
+        pos, dist = indice.k_cercanas(*centro, args.k, mascara)
+    else:
+        pos, dist = indice.cercanas(*centro, args.radio, mascara)
+        pos, dist = pos[:args.limite], dist[:args.limite]
+    ms = (time.perf_counter() - inicio) * 1000
+
+    print(f"📍 {len(indice)} estaciones en el índice ({recalculadas} recalculadas); consulta en {ms:.3f} ms")
+    for p, d in zip(pos, dist):
+        e = estaciones.loc[indice.ids[p]]
+        precio = f"  ${alineados[p]:,.2f}" if args.producto else ""
+        print(f"   {d:6.2f} km  {indice.ids[p]:>6}  {e['empresa'][:32]:<32} {e['empresabandera'][:16]:<16} "
+              f"{e['localidad']}{precio}")
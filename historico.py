@@ -0,0 +1,218 @@
+"""
+historico.py
+============
+Acceso indexado a los históricos de precios (data/historico_precios.csv y
+data/historicos/*.csv) sin releer el archivo completo en cada corrida.
+
+Junto a cada histórico se mantiene un índice en data/cache/indices/ con una
+línea por fila:  fecha_comparacion, fecha_chequeo, precio, fin (tamaño del CSV
+en bytes después de escribir la fila). Con eso:
+  - último precio / última fecha de chequeo → última entrada del índice
+  - "precio hace N días" → búsqueda binaria sobre las fechas ordenadas
+  - agregar una fila → append al CSV y al índice, O(1)
+
+El índice se valida contra el tamaño del CSV y contra su última fila (leída
+desde el final del archivo); si no coincide se reconstruye con una sola
+pasada. Solo usa la biblioteca estándar.
+"""
+
+import bisect
+import csv
+import io
+import os
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA    = "data"
+DIR_INDICES = os.path.join(DIR_DATA, "cache", "indices")
+
+TAMANO_COLA = 8192
+
+
+def _ruta_indice(ruta_csv: str) -> str:
+    nombre = os.path.normpath(ruta_csv).replace(os.sep, "__")
+    return os.path.join(DIR_INDICES, nombre + ".idx")
+
+
+def _a_float(valor: str) -> float:
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class Historico:
+    """Vista indexada de un CSV histórico (una fila por chequeo diario)."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.ruta_indice = _ruta_indice(ruta)
+        self.columnas = []
+        self.fechas = []          # fecha_comparacion (ISO, ordenada)
+        self.fechas_chequeo = []  # fecha_chequeo tal cual ('' si falta)
+        self.precios = []
+        self._fin_cabecera = 0
+        self._fin = 0
+        if os.path.exists(ruta):
+            self._cargar()
+
+    # ── Construcción / validación del índice ─────────────────────────────────
+    def _leer_cabecera(self) -> None:
+        with open(self.ruta, "rb") as f:
+            linea = f.readline()
+        self._fin_cabecera = len(linea)
+        self.columnas = next(csv.reader([linea.decode("utf-8").strip()]), [])
+
+    def _cargar(self) -> None:
+        self._leer_cabecera()
+        if not (self._leer_indice() and self._indice_vigente()):
+            self.reconstruir_indice()
+
+    def _leer_indice(self) -> bool:
+        if not os.path.exists(self.ruta_indice):
+            return False
+        fechas, chequeos, precios, fin = [], [], [], 0
+        with open(self.ruta_indice, newline="", encoding="utf-8") as f:
+            for fila in csv.reader(f):
+                if fila[0] == "cabecera":
+                    fin = max(fin, int(fila[1]))
+                    continue
+                fechas.append(fila[0])
+                chequeos.append(fila[1])
+                precios.append(_a_float(fila[2]))
+                fin = max(fin, int(fila[3]))
+        self.fechas, self.fechas_chequeo, self.precios, self._fin = fechas, chequeos, precios, fin
+        return True
+
+    def _indice_vigente(self) -> bool:
+        if self._fin != os.path.getsize(self.ruta):
+            return False
+        if not self.fechas:
+            return True
+        ultima = self._leer_ultima_fila()
+        return ultima is not None and self._entrada(ultima) == (
+            self.fechas[-1], self.fechas_chequeo[-1], self.precios[-1])
+
+    def _leer_ultima_fila(self) -> dict | None:
+        """Lee solo la cola del archivo para obtener la última fila."""
+        tamano = os.path.getsize(self.ruta)
+        with open(self.ruta, "rb") as f:
+            f.seek(max(self._fin_cabecera, tamano - TAMANO_COLA))
+            cola = f.read().decode("utf-8", errors="replace")
+        lineas = [l for l in cola.splitlines() if l.strip()]
+        if not lineas:
+            return None
+        valores = next(csv.reader([lineas[-1]]))
+        return dict(zip(self.columnas, valores))
+
+    def _entrada(self, fila: dict) -> tuple:
+        chequeo = fila.get("fecha_chequeo") or ""
+        return (chequeo or fila.get("fecha_vigencia", ""), chequeo, _a_float(fila.get("precio")))
+
+    def reconstruir_indice(self) -> None:
+        """Recorre el CSV una vez y reescribe el índice completo."""
+        self._leer_cabecera()
+        entradas = []
+        with open(self.ruta, "rb") as f:
+            f.seek(self._fin_cabecera)
+            pos = self._fin_cabecera
+            pendiente = b""
+            for linea in f:
+                pos += len(linea)
+                pendiente += linea
+                texto = pendiente.decode("utf-8")
+                # Un campo entre comillas puede contener saltos de línea
+                if texto.count('"') % 2:
+                    continue
+                pendiente = b""
+                if not texto.strip():
+                    continue
+                valores = next(csv.reader([texto]))
+                entradas.append(self._entrada(dict(zip(self.columnas, valores))) + (pos,))
+        # Orden estable por fecha: los históricos se escriben cronológicamente
+        entradas.sort(key=lambda e: e[0])
+        self.fechas = [e[0] for e in entradas]
+        self.fechas_chequeo = [e[1] for e in entradas]
+        self.precios = [e[2] for e in entradas]
+        # 'cabecera' guarda el tamaño del CSV al reconstruir; cada append registra el nuevo tamaño
+        self._fin = pos
+        os.makedirs(os.path.dirname(self.ruta_indice), exist_ok=True)
+        tmp = self.ruta_indice + ".tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["cabecera", self._fin])
+            for fecha, chequeo, precio, fin in entradas:
+                w.writerow([fecha, chequeo, repr(precio), fin])
+        os.replace(tmp, self.ruta_indice)
+
+    def refrescar(self) -> "Historico":
+        """
+        Revalida una instancia que quedó en memoria (modo demonio): si el CSV no
+        cambió desde la última lectura o escritura propia no lee nada más que
+        su cola; si cambió por fuera, vuelve a cargar el índice.
+        """
+        if not os.path.exists(self.ruta):
+            self.__init__(self.ruta)
+        elif not (self.columnas and self._indice_vigente()):
+            self._cargar()
+        return self
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+    def __len__(self) -> int:
+        return len(self.fechas)
+
+    @property
+    def existe(self) -> bool:
+        return bool(self.columnas)
+
+    def ultimo_precio(self) -> float | None:
+        return self.precios[-1] if self.precios else None
+
+    def ultima_fecha(self) -> str:
+        return self.fechas[-1] if self.fechas else ""
+
+    def chequeado_en(self, fecha_iso: str) -> bool:
+        """¿Hay un chequeo registrado en esa fecha (YYYY-MM-DD)? Búsqueda binaria."""
+        i = bisect.bisect_left(self.fechas, fecha_iso)
+        while i < len(self.fechas) and self.fechas[i][:10] == fecha_iso:
+            if self.fechas_chequeo[i]:
+                return True
+            i += 1
+        return False
+
+    def ultimo_hasta(self, fecha_iso: str) -> tuple | None:
+        """Último (fecha, precio) con fecha_comparacion <= fecha_iso, por búsqueda binaria."""
+        i = bisect.bisect_right(self.fechas, fecha_iso)
+        if i == 0:
+            return None
+        return self.fechas[i - 1], self.precios[i - 1]
+
+    def primero(self) -> tuple | None:
+        if not self.fechas:
+            return None
+        return self.fechas[0], self.precios[0]
+
+    # ── Escritura ────────────────────────────────────────────────────────────
+    def agregar(self, texto_csv: str, fila: dict) -> None:
+        """
+        Agrega al final del CSV una fila ya serializada (`texto_csv`, sin cabecera)
+        y su entrada de índice calculada desde `fila`. O(1).
+        """
+        if not texto_csv.endswith("\n"):
+            texto_csv += "\n"
+        with open(self.ruta, "rb+") as f:
+            f.seek(0, io.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, io.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write(texto_csv.encode("utf-8"))
+            fin = f.tell()
+        fecha, chequeo, precio = self._entrada({k: ("" if v is None else str(v)) for k, v in fila.items()})
+        os.makedirs(os.path.dirname(self.ruta_indice), exist_ok=True)
+        with open(self.ruta_indice, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow([fecha, chequeo, repr(precio), fin])
+        pos = bisect.bisect_right(self.fechas, fecha)
+        self.fechas.insert(pos, fecha)
+        self.fechas_chequeo.insert(pos, chequeo)
+        self.precios.insert(pos, precio)
+        self._fin = fin
@@ -0,0 +1,241 @@
+"""
+metricas.py
+===========
+Métricas por etapa de cada corrida, en JSON lines (data/metricas.jsonl).
+
+Cada etapa (descarga, parseo, filtro, histórico, reporte, envío, A3500,
+escritura USD...) agrega una línea con:
+  corrida, script, etapa, inicio, segundos, rss_pico_mb, ok
+más los datos propios de la etapa (bytes descargados, filas leídas/filtradas...).
+
+rss_pico_mb es el pico de memoria residente del proceso hasta el final de la
+etapa (getrusage): al ser acumulado, la etapa donde salta es la que lo causa.
+
+Uso:
+  with etapa("descarga") as m:
+      ...
+      m.anotar(bytes=n)
+
+  parseo = Acumulado("parseo")         # etapas intercaladas en un mismo bucle
+  for chunk in parseo.iterar(lector):
+      ...
+  parseo.registrar(filas=total)
+
+  python metricas.py [--ultimas N]     resumen por etapa de las últimas corridas
+  python metricas.py --recortar [N]    deja solo las últimas N corridas (CONSERVAR_CORRIDAS)
+  python metricas.py --archivo RUTA    otro archivo (p. ej. el de la API)
+
+El archivo se versiona junto con los datos: en Actions se recorta antes de
+cada commit para que no crezca sin límite. Un proceso que no es una corrida
+(la API) escribe en otro archivo, sin versionar: usar_archivo(ruta).
+
+Escribir métricas nunca interrumpe una corrida: los errores de E/S se ignoran.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA         = "data"
+ARCHIVO_METRICAS = os.path.join(DIR_DATA, "metricas.jsonl")
+
+CONSERVAR_CORRIDAS = 120   # ~4 meses de corridas diarias
+
+# Identificador común a todas las etapas de este proceso
+ID_CORRIDA = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+_lock = threading.Lock()
+
+
+def usar_archivo(ruta: str) -> None:
+    """Manda las métricas de este proceso a `ruta` en lugar de ARCHIVO_METRICAS."""
+    global ARCHIVO_METRICAS
+    ARCHIVO_METRICAS = ruta
+
+
+def nueva_corrida() -> str:
+    """Empieza otro identificador de corrida en el mismo proceso (cada ciclo del demonio)."""
+    global ID_CORRIDA
+    ID_CORRIDA = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    return ID_CORRIDA
+
+
+def rss_pico_mb() -> float | None:
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+
+def registrar(nombre: str, segundos: float, ok: bool = True, inicio: datetime | None = None, **datos) -> dict:
+    """Agrega una línea de métricas al archivo y la devuelve."""
+    registro = {
+        "corrida": ID_CORRIDA,
+        "script": os.path.basename(sys.argv[0]) or "python",
+        "etapa": nombre,
+        "inicio": (inicio or datetime.now()).isoformat(timespec="seconds"),
+        "segundos": round(segundos, 4),
+        "rss_pico_mb": rss_pico_mb(),
+        "ok": ok,
+    }
+    registro.update({k: v for k, v in datos.items() if v is not None})
+    try:
+        with _lock:
+            os.makedirs(os.path.dirname(ARCHIVO_METRICAS) or ".", exist_ok=True)
+            with open(ARCHIVO_METRICAS, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+    except OSError:
+        pass
+    return registro
+
+
+class Etapa:
+    """Context manager que mide una etapa y la registra al salir (también si falla)."""
+
+    def __init__(self, nombre: str, **datos):
+        self.nombre = nombre
+        self.datos = datos
+        self.segundos = 0.0
+
+    def anotar(self, **datos) -> None:
+        self.datos.update(datos)
+
+    def __enter__(self):
+        self._inicio = datetime.now()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        self.segundos = time.perf_counter() - self._t0
+        if exc is not None:
+            self.datos["error"] = f"{tipo.__name__}: {exc}"
+        registrar(self.nombre, self.segundos, ok=exc is None, inicio=self._inicio, **self.datos)
+        return False
+
+
+def etapa(nombre: str, **datos) -> Etapa:
+    return Etapa(nombre, **datos)
+
+
+class Acumulado:
+    """Tiempo acumulado de una etapa que ocurre en tramos (p. ej. dentro de un bucle por bloques)."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.segundos = 0.0
+        self._inicio = datetime.now()
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.segundos += time.perf_counter() - self._t0
+        return False
+
+    def iterar(self, iterable):
+        """Itera `iterable` sumando solo el tiempo que tarda cada next()."""
+        iterador = iter(iterable)
+        while True:
+            with self:
+                try:
+                    valor = next(iterador)
+                except StopIteration:
+                    return
+            yield valor
+
+    def registrar(self, **datos) -> dict:
+        return registrar(self.nombre, self.segundos, inicio=self._inicio, **datos)
+
+
+# ── Resumen ───────────────────────────────────────────────────────────────────
+def leer_metricas(ruta: str | None = None) -> list:
+    ruta = ruta or ARCHIVO_METRICAS
+    if not os.path.exists(ruta):
+        return []
+    registros = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registros.append(json.loads(linea))
+            except ValueError:
+                continue
+    return registros
+
+
+def recortar(conservar: int = CONSERVAR_CORRIDAS, ruta: str | None = None) -> int:
+    """Reescribe el archivo con las líneas de las últimas `conservar` corridas. Devuelve cuántas quitó."""
+    ruta = ruta or ARCHIVO_METRICAS
+    if not os.path.exists(ruta):
+        return 0
+    with _lock:
+        with open(ruta, encoding="utf-8") as f:
+            lineas = f.readlines()
+        registros = leer_metricas(ruta)
+        corridas = list(dict.fromkeys(r.get("corrida") for r in registros))
+        vigentes = set(corridas[-conservar:]) if conservar > 0 else set()
+        quedan = [r for r in registros if r.get("corrida") in vigentes]
+        if len(quedan) == len(lineas):
+            return 0
+        tmp = ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for r in quedan:
+                f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp, ruta)
+    return len(lineas) - len(quedan)
+
+
+def resumen(ultimas: int = 7) -> None:
+    """Imprime segundos por etapa en las últimas `ultimas` corridas."""
+    registros = leer_metricas()
+    corridas = list(dict.fromkeys(r["corrida"] for r in registros))[-ultimas:]
+    if not corridas:
+        print(f"ℹ️ No hay métricas en {ARCHIVO_METRICAS}")
+        return
+    etapas = list(dict.fromkeys(r["etapa"] for r in registros if r["corrida"] in corridas))
+    # Una etapa puede repetirse en la corrida (varios objetivos, precarga del A3500): se suma
+    tabla = {}
+    for r in registros:
+        if r["corrida"] in corridas:
+            segundos, ok = tabla.get((r["corrida"], r["etapa"]), (0.0, True))
+            tabla[(r["corrida"], r["etapa"])] = (segundos + r["segundos"], ok and r.get("ok", True))
+    print(f"{'etapa':<20}" + "".join(f"{c[:15]:>16} " for c in corridas))
+    for nombre in etapas:
+        celdas = []
+        for c in corridas:
+            if (c, nombre) in tabla:
+                segundos, ok = tabla[(c, nombre)]
+                celdas.append(f"{segundos:>16.3f}{' ' if ok else '!'}")
+            else:
+                celdas.append(f"{'-':>16} ")
+        print(f"{nombre:<20}" + "".join(celdas))
+    picos = [max((r.get("rss_pico_mb") or 0) for r in registros if r["corrida"] == c) for c in corridas]
+    print(f"{'rss_pico_mb':<20}" + "".join(f"{p:>16.1f} " for p in picos))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumen de métricas por etapa.")
+    parser.add_argument("--ultimas", type=int, default=7, help="cantidad de corridas a mostrar")
+    parser.add_argument("--recortar", type=int, nargs="?", const=CONSERVAR_CORRIDAS, metavar="N",
+                        help=f"dejar solo las últimas N corridas (por defecto {CONSERVAR_CORRIDAS})")
+    parser.add_argument("--archivo", help=f"archivo de métricas (por defecto {ARCHIVO_METRICAS})")
+    args = parser.parse_args()
+    if args.archivo:
+        usar_archivo(args.archivo)
+    resumen(args.ultimas)
+    if args.recortar is not None:
+        quitadas = recortar(args.recortar)
+        print(f"\n✂️ {ARCHIVO_METRICAS}: {quitadas} línea(s) de corridas viejas quitadas "
+              f"(quedan las últimas {args.recortar} corridas)")
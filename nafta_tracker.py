@@ -1,109 +1,131 @@
 import pandas as pd
-import requests
-import io
 import os
-import tweepy
-from datetime import datetime, timedelta
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from descargas import descargar_con_cache, en_paralelo, leer_meta, actualizar_meta, obtener_sesion
+from snapshot import ConstructorSnapshot, cargar_snapshot, leer_meta_snapshot
+from historico import Historico
+from analitica import actualizar_serie
+from archivo_diario import archivar
+from base_sqlite import habilitada as sqlite_habilitada, sincronizar as sincronizar_sqlite
+from calidad import actualizar_calidad, avisos_nuevos, problemas_de_objetivos, texto_aviso
+from agregados import actualizar_agregados, contexto_provincial
+from cambios import actualizar_changefeed, cambios_de_objetivos, marcar_alertado, ya_alertado
+from espacial import COLUMNAS_ESTACION, actualizar_indice, contexto_competencia, precios_por_estacion
+from metricas import Acumulado, etapa
+from normalizado import regenerar_vistas, sincronizar as sincronizar_normalizado
+from notificaciones import armar_respuesta, drenar_outbox, encolar_reporte
+from objetivos import cargar_objetivos, filtrar_objetivos, huella_objetivos, resolver_objetivos
+from perfilado import anotar as anotar_perfil, perfilar
+from configuracion import (URL, ARCHIVO_HISTORICO, ARCHIVO_DATASET_CACHE, ARCHIVO_FILAS_CACHE,
+                           BUSCAR_PRODUCTO, BUSCAR_RAZON_SOCIAL, BUSCAR_IDEMPRESA, BUSCAR_TIPOHORARIO,
+                           OBJETIVO_PRINCIPAL)
 
 # Sincronización automática del CSV en USD
 try:
-    from usd_sync import sincronizar_usd
+    from usd_sync import obtener_dolar_a3500, sincronizar_usd
     _USD_SYNC_DISPONIBLE = True
 except ImportError:
     _USD_SYNC_DISPONIBLE = False
 
-# --- CONFIGURACIÓN DE CRÉDITOS X (TWITTER) ---
-X_API_KEY = os.getenv("X_API_KEY")
-X_API_SECRET = os.getenv("X_API_SECRET")
-X_ACCESS_TOKEN = os.getenv("X_ACCESS_TOKEN")
-X_ACCESS_SECRET = os.getenv("X_ACCESS_SECRET")
-X_BEARER_TOKEN = os.getenv("X_BEARER_TOKEN")
-
-# --- Configuración de Datos ---
-URL = "http://datos.energia.gob.ar/dataset/1c181390-5045-475e-94dc-410429be4b17/resource/80ac25de-a44a-4445-9215-090cf55cfda5/download/precios-en-surtidor-resolucin-3142016.csv"
-ARCHIVO_HISTORICO = "data/historico_precios.csv"
-
-# --- CONFIGURACIÓN DE BÚSQUEDA ---
-BUSCAR_PRODUCTO = 'Nafta (súper) entre 92 y 95 Ron'
+# --- Lectura por bloques del dataset nacional ---
+# Solo se leen las columnas que se guardan en el histórico, todas como texto:
+# se evita la inferencia de tipos sobre el dataset completo y los numéricos
+# se convierten recién sobre las filas que pasan el filtro.
+COLUMNAS_DATASET = [
+    'indice_tiempo', 'idempresa', 'cuit', 'empresa', 'direccion', 'localidad',
+    'provincia', 'region', 'idproducto', 'producto', 'idtipohorario',
+    'tipohorario', 'precio', 'fecha_vigencia', 'idempresabandera',
+    'empresabandera', 'latitud', 'longitud', 'geojson',
+]
+COLUMNAS_NUMERICAS = ['precio', 'latitud', 'longitud']
+CHUNK_FILAS = 100_000
 
-# UNITEC suspendida temporalmente — no está actualizando datos en la fuente oficial
-# BUSCAR_RAZON_SOCIAL = 'UNITECPROCOM SA'
+def leer_dataset_por_chunks(fuente, chunksize=CHUNK_FILAS):
+    """Itera el CSV nacional por bloques, solo con las columnas necesarias y como texto."""
+    return pd.read_csv(
+        fuente,
+        encoding='utf-8',
+        usecols=lambda c: c in COLUMNAS_DATASET,
+        dtype=str,
+        chunksize=chunksize,
+    )
 
-# Nueva estación activa: GAS IMPULSO S.A. — Ruta 25 Nro. 619, Pilar, Buenos Aires
-# idempresa: 1519 | turno: Diurno
-BUSCAR_RAZON_SOCIAL = 'GAS IMPULSO'
-BUSCAR_IDEMPRESA = '1519'
+def tipar_filas(df):
+    """Normaliza texto y convierte a número (decimal con coma) las columnas numéricas."""
+    df = df.copy()
+    df['producto'] = df['producto'].str.strip()
+    df['empresa'] = df['empresa'].str.strip()
+    for col in COLUMNAS_NUMERICAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col].str.replace(',', '.', regex=False), errors='coerce')
+    return df
 
-# --- Claves de Telegram ---
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-
-def publicar_en_x(texto_principal, texto_mensual=None):
-    """Publica el reporte en X (Twitter)."""
-    try:
-        client = tweepy.Client(
-            bearer_token=X_BEARER_TOKEN,
-            consumer_key=X_API_KEY,
-            consumer_secret=X_API_SECRET,
-            access_token=X_ACCESS_TOKEN,
-            access_token_secret=X_ACCESS_SECRET
-        )
-        res1 = client.create_tweet(text=texto_principal)
-        print(f"✅ Tuit diario enviado.")
-        if texto_mensual:
-            client.create_tweet(text=texto_mensual, in_reply_to_tweet_id=res1.data['id'])
-            print(f"✅ Hilo mensual enviado.")
-    except Exception as e:
-        print(f"❌ Error en X: {e}")
+def filtrar_descarga(descarga, objetivos):
+    """
+    Devuelve las filas de los objetivos dentro del dataset descargado.
+    Si el dataset no cambió (304 o mismo hash) y los objetivos son los mismos,
+    reutiliza las filas filtradas en la corrida anterior sin parsear nada.
+    En la misma pasada por bloques se arma el snapshot columnar del dataset.
+    """
+    huella = huella_objetivos(objetivos)
+    meta = leer_meta(ARCHIVO_FILAS_CACHE)
+    filas_vigentes = (os.path.exists(ARCHIVO_FILAS_CACHE)
+                      and meta.get('sha256') == descarga.sha256 and meta.get('objetivos') == huella)
+    snapshot_vigente = leer_meta_snapshot().get('sha256') == descarga.sha256
+    if not descarga.cambio and filas_vigentes and snapshot_vigente:
+        print("ℹ️ El dataset no cambió desde la última descarga. Se reutilizan las filas filtradas.")
+        with etapa("filtro", cacheado=True) as m:
+            filas = tipar_filas(pd.read_csv(ARCHIVO_FILAS_CACHE, dtype=str))
+            m.anotar(filas_filtradas=len(filas))
+        return filas
 
-def enviar_telegram(mensaje):
-    """Envía notificación por Telegram."""
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        return
-    url_tg = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": mensaje}
-    try:
-        requests.post(url_tg, json=payload, timeout=10)
-    except:
-        pass
-
-def main():
-    """Función principal del script."""
-    print(f"--- Iniciando Verificación: {datetime.now()} ---")
-    
-    # Crear directorio data si no existe
-    os.makedirs("data", exist_ok=True)
-    
-    try:
-        response = requests.get(URL, timeout=30)
-        df = pd.read_csv(io.BytesIO(response.content), decimal=',', encoding='utf-8')
-    except Exception as e:
-        print(f"Error descarga/lectura: {e}")
-        return
+    # Parseo, filtro y snapshot se intercalan bloque a bloque: se mide cada uno por separado
+    parseo, filtro, snapshot = Acumulado("parseo"), Acumulado("filtro"), Acumulado("snapshot")
+    constructor = None if snapshot_vigente else ConstructorSnapshot()
+    partes = []
+    filas_leidas = 0
+    for chunk in parseo.iterar(leer_dataset_por_chunks(descarga.ruta)):
+        filas_leidas += len(chunk)
+        with filtro:
+            partes.append(filtrar_objetivos(chunk, objetivos))
+        if constructor is not None:
+            with snapshot:
+                constructor.agregar(chunk)
+    with filtro:
+        crudas = pd.concat(partes, ignore_index=True)
+        crudas.to_csv(ARCHIVO_FILAS_CACHE, index=False)
+        actualizar_meta(ARCHIVO_FILAS_CACHE, sha256=descarga.sha256, objetivos=huella)
+    parseo.registrar(bytes=os.path.getsize(descarga.ruta), filas_leidas=filas_leidas)
+    filtro.registrar(filas_leidas=filas_leidas, filas_filtradas=len(crudas), objetivos=len(objetivos))
+    if constructor is not None:
+        with snapshot:
+            filas = constructor.guardar(descarga.sha256)
+        snapshot.registrar(filas=filas)
+        print(f"✅ Snapshot columnar guardado ({filas} filas)")
+    return tipar_filas(crudas)
 
-    df['producto'] = df['producto'].astype(str).str.strip()
-    df['empresa'] = df['empresa'].astype(str).str.strip()
+def texto_comparativa(precio_hoy, precio_mes, dias):
+    """Respuesta mensual en X: precio de hace `dias` días y la variación desde entonces."""
+    diff_m = precio_hoy - precio_mes
+    pct_m = (diff_m / precio_mes) * 100
+    e_m = "🔺" if diff_m > 0 else "🔻"
+    return (f"📊 COMPARATIVA MENSUAL\n"
+            f"--------------------------\n"
+            f"⛽ Precio hace {dias} días: ${precio_mes:,.2f}\n"
+            f"Variación nominal: {e_m} ${diff_m:,.2f}\n"
+            f"Variación porcentual: {e_m} {pct_m:.2f}%")
 
-    # Filtro por idempresa (más robusto) + producto. Fallback a nombre si no existe la columna.
-    if 'idempresa' in df.columns:
-        df_filtrado = df[
-            (df['producto'].str.contains(BUSCAR_PRODUCTO, case=False, na=False, regex=False)) &
-            (df['idempresa'].astype(str).str.strip() == BUSCAR_IDEMPRESA)
-        ].copy()
-    else:
-        df_filtrado = df[
-            (df['producto'].str.contains(BUSCAR_PRODUCTO, case=False, na=False, regex=False)) &
-            (df['empresa'].str.contains(BUSCAR_RAZON_SOCIAL, case=False, na=False, regex=False))
-        ].copy()
-    
-    if df_filtrado.empty:
-        print(f"❌ No se encontraron datos para: {BUSCAR_RAZON_SOCIAL}")
-        return
+def procesar_objetivo(objetivo, reg_df, historicos=None):
+    """
+    Actualiza el histórico de un objetivo y arma sus reportes (diario, mensual).
+    `historicos` ({ruta: Historico}) conserva los índices entre corridas del demonio.
+    """
+    archivo_historico = objetivo.archivo_historico
+    os.makedirs(os.path.dirname(archivo_historico) or ".", exist_ok=True)
 
-    df_filtrado['fecha_vigencia'] = pd.to_datetime(df_filtrado['fecha_vigencia'], errors='coerce')
-    df_filtrado = df_filtrado.sort_values(by='fecha_vigencia', ascending=False)
-    
-    reg_actual = df_filtrado.iloc[0]
+    reg_actual = reg_df.iloc[0]
     precio_hoy = float(reg_actual['precio'])
     empresa_nombre = reg_actual['empresa']
     fecha_vigencia_precio = reg_actual['fecha_vigencia'].strftime('%d/%m/%Y %H:%M')
@@ -115,25 +137,32 @@ def main():
     informe_diario = ""
     informe_mensual = ""
 
-    if os.path.exists(ARCHIVO_HISTORICO):
-        df_hist = pd.read_csv(ARCHIVO_HISTORICO)
-        df_hist['fecha_vigencia'] = pd.to_datetime(df_hist['fecha_vigencia'], errors='coerce')
-        
-        # Asegurar columna fecha_chequeo
-        if 'fecha_chequeo' not in df_hist.columns:
-            df_hist['fecha_chequeo'] = df_hist['fecha_vigencia']
-            df_hist.to_csv(ARCHIVO_HISTORICO, index=False)
+    # Acceso indexado: solo se lee la cola del CSV y el índice de fechas
+    with etapa("historico_lectura", objetivo=objetivo.etiqueta) as m:
+        residente = historicos is not None and archivo_historico in historicos
+        hist = historicos[archivo_historico].refrescar() if residente else Historico(archivo_historico)
+        if historicos is not None:
+            historicos[archivo_historico] = hist
+        m.anotar(filas=len(hist), residente=residente)
+
+    if hist.existe and len(hist) > 0:
+        # Asegurar columna fecha_chequeo (migración única de históricos viejos)
+        if 'fecha_chequeo' not in hist.columnas:
+            df_hist = pd.read_csv(archivo_historico)
+            df_hist['fecha_chequeo'] = pd.to_datetime(df_hist['fecha_vigencia'], errors='coerce')
+            df_hist.to_csv(archivo_historico, index=False)
+            hist.reconstruir_indice()
             print("✅ Columna fecha_chequeo inicializada")
-        else:
-            df_hist['fecha_chequeo'] = pd.to_datetime(df_hist['fecha_chequeo'], errors='coerce')
         
-        # Verificar duplicados de hoy
-        ya_chequeado_hoy = (df_hist['fecha_chequeo'].dt.date == fecha_hoy).any()
+        # Verificar duplicados de hoy: un precio que cambió en el día sí se registra
+        ya_chequeado_hoy = hist.chequeado_en(str(fecha_hoy))
+        ultimo_precio = float(hist.ultimo_precio())
         
-        if ya_chequeado_hoy:
+        if ya_chequeado_hoy and precio_hoy == ultimo_precio:
             print(f"ℹ️ Ya se realizó un chequeo hoy ({fecha_hoy}). Saltando guardado.")
         else:
-            ultimo_precio = float(df_hist['precio'].iloc[-1])
+            if ya_chequeado_hoy:
+                print(f"🔔 El precio cambió desde el chequeo de hoy: se agrega otra fila.")
             
             # CALCULAR VARIACIÓN RESPECTO AL DÍA ANTERIOR
             diff = precio_hoy - ultimo_precio
@@ -144,7 +173,7 @@ def main():
                 emoji = "🔺" if diff > 0 else "🔻"
                 informe_diario = (f"{emoji} CAMBIO DE PRECIO DETECTADO\n"
                                   f"--------------------------\n"
-                                  f"⛽ Nafta Súper en YPF\n\n"
+                                  f"⛽ {objetivo.etiqueta}\n\n"
                                   f"Precio anterior: ${ultimo_precio:,.2f}\n"
                                   f"Precio nuevo: ${precio_hoy:,.2f}\n"
                                   f"Variación: {emoji} ${diff:,.2f}\n\n"
@@ -152,84 +181,279 @@ def main():
             else:
                 informe_diario = (f"✅ SIN CAMBIOS EN EL PRECIO\n"
                                   f"--------------------------\n"
-                                  f"⛽ Nafta Súper en YPF\n\n"
+                                  f"⛽ {objetivo.etiqueta}\n\n"
                                   f"Precio actual: ${precio_hoy:,.2f}\n"
                                   f"Estado: Estable\n"
                                   f"Vigencia del precio: {fecha_vigencia_precio}\n"
                                   f"Chequeo: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
             
             # Guardar nuevo registro con %_variacion calculada
-            nueva_fila = df_filtrado.iloc[[0]].copy()
+            nueva_fila = reg_df.copy()
             nueva_fila['%_variacion'] = round(variacion_pct, 2)
             nueva_fila['fecha_chequeo'] = str(fecha_hoy)
-            nueva_fila.to_csv(ARCHIVO_HISTORICO, mode='a', index=False, header=False)
+            with etapa("historico_append", objetivo=objetivo.etiqueta, filas=1):
+                hist.agregar(nueva_fila.to_csv(index=False, header=False), nueva_fila.iloc[0].to_dict())
             print(f"✅ Registro guardado: ${precio_hoy} (variación: {variacion_pct:.2f}%)")
 
         # --- 2. COMPARATIVA MENSUAL (Lógica Híbrida) ---
-        fecha_hace_30_dias = fecha_hoy_dt - timedelta(days=30)
-        
-        # Crear columna de comparación unificada
-        df_hist['fecha_comparacion'] = df_hist['fecha_chequeo'].fillna(df_hist['fecha_vigencia'])
-        df_hist['fecha_comparacion'] = pd.to_datetime(df_hist['fecha_comparacion'])
-
-        # Filtrar registros de hace 30 días o antes
-        df_mes = df_hist[df_hist['fecha_comparacion'] <= fecha_hace_30_dias]
+        # Estadísticas rodantes precalculadas: solo se procesan las filas nuevas del histórico
+        # (fecha_comparacion = fecha_chequeo o, si falta, fecha_vigencia, ya resuelto en el índice)
+        serie = actualizar_serie(archivo_historico, 'precio', hist.fechas, hist.precios)
+        delta_mes = serie.delta(30)
 
-        if not df_mes.empty:
-            reg_mes = df_mes.iloc[-1]
-            precio_mes = float(reg_mes['precio'])
-            fecha_mes = reg_mes['fecha_comparacion']
-            
-            diff_m = precio_hoy - precio_mes
-            pct_m = (diff_m / precio_mes) * 100
-            e_m = "🔺" if diff_m > 0 else "🔻"
-            
-            informe_mensual = (f"📊 COMPARATIVA MENSUAL\n"
-                               f"--------------------------\n"
-                               f"⛽ Precio hace 30 días: ${precio_mes:,.2f}\n"
-                               f"Variación nominal: {e_m} ${diff_m:,.2f}\n"
-                               f"Variación porcentual: {e_m} {pct_m:.2f}%")
+        if delta_mes is not None and delta_mes['completa']:
+            # Último registro de hace 30 días o antes
+            precio_mes = delta_mes['valor_desde']
+            informe_mensual = texto_comparativa(precio_hoy, precio_mes, 30)
             
             print(f"📊 Comparativa mensual calculada.")
-        else:
+        elif delta_mes is not None:
             # Usar registro más antiguo si tiene más de 0 días
-            if len(df_hist) > 0:
-                reg_mes = df_hist.iloc[0]
-                precio_mes = float(reg_mes['precio'])
-                fecha_mes = pd.to_datetime(reg_mes['fecha_comparacion'])
-                dias = (fecha_hoy_dt - fecha_mes).days
-                
-                if dias > 0:
-                    diff_m = precio_hoy - precio_mes
-                    pct_m = (diff_m / precio_mes) * 100
-                    e_m = "🔺" if diff_m > 0 else "🔻"
-                    informe_mensual = (f"📊 COMPARATIVA MENSUAL\n"
-                                       f"--------------------------\n"
-                                       f"⛽ Precio hace {dias} días: ${precio_mes:,.2f}\n"
-                                       f"Variación nominal: {e_m} ${diff_m:,.2f}\n"
-                                       f"Variación porcentual: {e_m} {pct_m:.2f}%")
+            fecha_mes, precio_mes = delta_mes['desde'], delta_mes['valor_desde']
+            dias = (fecha_hoy_dt - pd.to_datetime(fecha_mes)).days
+            
+            if dias > 0:
+                informe_mensual = texto_comparativa(precio_hoy, precio_mes, dias)
     else:
         # Primera ejecución
-        nueva_fila = df_filtrado.iloc[[0]].copy()
+        nueva_fila = reg_df.copy()
         nueva_fila['%_variacion'] = 0.0
         nueva_fila['fecha_chequeo'] = str(fecha_hoy)
-        nueva_fila.to_csv(ARCHIVO_HISTORICO, index=False)
-        informe_diario = f"🚀 INICIO DE SEGUIMIENTO\n⛽ Nafta Súper en {empresa_nombre}\nPrecio inicial: ${precio_hoy:,.2f}"
+        nueva_fila.to_csv(archivo_historico, index=False)
+        hist = Historico(archivo_historico)
+        if historicos is not None:
+            historicos[archivo_historico] = hist
+        actualizar_serie(archivo_historico, 'precio', hist.fechas, hist.precios)
+        informe_diario = f"🚀 INICIO DE SEGUIMIENTO\n⛽ {objetivo.etiqueta} — {empresa_nombre}\nPrecio inicial: ${precio_hoy:,.2f}"
         print(f"✅ Archivo histórico creado")
 
-    # Envío de reportes
-    if informe_diario:
-        enviar_telegram(informe_diario)
-        publicar_en_x(informe_diario, informe_mensual)
+    return informe_diario, informe_mensual
+
+def enviar_reportes():
+    """Drena el outbox, con su métrica de envío."""
+    with etapa("envio") as m:
+        quedan = drenar_outbox()
+        m.anotar(pendientes=quedan)
+    return quedan
+
+def descargar_dataset():
+    """GET condicional del dataset nacional, con su métrica de descarga."""
+    with etapa("descarga") as m:
+        descarga = descargar_con_cache(URL, ARCHIVO_DATASET_CACHE, sesion=obtener_sesion())
+        m.anotar(bytes=descarga.bytes_descargados, cambio=descarga.cambio)
+    return descarga
+
+def generar_changefeed(descarga):
+    """Changefeed nacional del dataset descargado contra el anterior, con su métrica."""
+    with etapa("changefeed") as m:
+        cambios = actualizar_changefeed(descarga.sha256)
+        if cambios is None:
+            print("ℹ️ Sin snapshot anterior: el changefeed nacional arranca con el próximo dataset.")
+            return None
+        conteo = cambios['tipo'].value_counts()
+        m.anotar(filas=len(cambios), **{t: int(conteo.get(t, 0)) for t in ('alta', 'baja', 'cambio')})
+    print(f"🔔 Changefeed nacional: {conteo.get('cambio', 0)} cambios de precio, "
+          f"{conteo.get('alta', 0)} altas, {conteo.get('baja', 0)} bajas")
+    return cambios
+
+def alertas_del_changefeed(descarga, objetivos):
+    """Alertas de los objetivos en el changefeed del dataset; {} si ya salieron en otra corrida."""
+    cambios = generar_changefeed(descarga)
+    if cambios is None or ya_alertado(descarga.sha256):
+        return {}
+    return cambios_de_objetivos(cambios, objetivos)
+
+def generar_calidad(descarga):
+    """Estaciones vencidas y precios atípicos del dataset descargado, con su métrica."""
+    with etapa("calidad") as m:
+        tabla = actualizar_calidad(descarga.sha256)
+        if tabla is not None:
+            m.anotar(vencidas=int(tabla.loc[tabla['vencida'], 'idempresa'].nunique()),
+                     atipicos=int(tabla['atipico'].sum()))
+    return tabla
+
+def generar_agregados(descarga):
+    """Agregados por provincia × bandera × producto × horario del dataset descargado, con su métrica."""
+    with etapa("agregados") as m:
+        tabla = actualizar_agregados(descarga.sha256)
+        m.anotar(grupos=None if tabla is None else len(tabla))
+    return tabla
+
+def generar_archivo(descarga):
+    """Agrega el dataset descargado al archivo diario (base o delta), con su métrica."""
+    with etapa("archivo") as m:
+        entrada = archivar(descarga.sha256)
+        if entrada is not None:
+            m.anotar(tipo=entrada['tipo'], filas=entrada['filas_delta'] or entrada['filas'], bytes=entrada['bytes'])
+    return entrada
+
+def contexto_espacial(objetivos):
+    """Actualiza el índice espacial y arma el contexto de competencia de los objetivos publicados."""
+    publicados = [o for o in objetivos if o.publicar]
+    if not publicados:
+        return {}
+    with etapa("indice_espacial") as m:
+        df = cargar_snapshot(COLUMNAS_ESTACION + ['producto', 'tipohorario', 'precio', 'fecha_vigencia',
+                                                  'latitud', 'longitud'])
+        indice, recalculadas = actualizar_indice(df)
+        m.anotar(estaciones=len(indice), recalculadas=recalculadas)
+    with etapa("competencia", objetivos=len(publicados)):
+        return {o: contexto_competencia(indice, precios_por_estacion(df, o.producto, o.tipohorario), o.idempresa)
+                for o in publicados}
+
+def main(perfil=None, **residente):
+    """
+    Función principal del script. El demonio (demonio.py) pasa en `residente`
+    lo que ya tiene en memoria: descarga, objetivos, df_filtrado, df_tc e historicos.
+    `perfil` ('cprofile' o 'muestreo', por defecto NAFTA_PERFIL) deja el perfil
+    de la corrida en data/perfiles/ (ver perfilado.py).
+    """
+    with perfilar("main", perfil), etapa("total", residente=bool(residente)):
+        _main(**residente)
+
+def _main(descarga=None, objetivos=None, df_filtrado=None, df_tc=None, historicos=None):
+    print(f"--- Iniciando Verificación: {datetime.now()} ---")
+    
+    # Crear directorio data si no existe
+    os.makedirs("data", exist_ok=True)
+
+    # Los CSV anchos no se versionan: si faltan (checkout nuevo) se regeneran desde
+    # data/normalizado/ antes de agregarles filas
+    try:
+        for ruta in regenerar_vistas(si_faltan=True):
+            print(f"📄 Histórico regenerado desde data/normalizado: {ruta}")
+    except Exception as e:
+        print(f"⚠️ No se pudieron regenerar los históricos: {e}")
+        return
+
+    if objetivos is None:
+        objetivos = cargar_objetivos(OBJETIVO_PRINCIPAL)
+    
+    # Dataset y A3500 se descargan en paralelo; la precarga del A3500 deja lista
+    # la caché local que después usa sincronizar_usd() (sin volver a la red).
+    tareas = {}
+    if descarga is None:
+        tareas["dataset"] = descargar_dataset
+    if _USD_SYNC_DISPONIBLE and df_tc is None:
+        tareas["a3500"] = lambda: obtener_dolar_a3500([datetime.now().date()])
+    resultados = en_paralelo(**tareas) if tareas else {}
+    if isinstance(resultados.get("a3500"), Exception):
+        print(f"⚠️ Precarga A3500 falló: {resultados['a3500']}")
+
+    try:
+        descarga = resultados.get("dataset", descarga)
+        if isinstance(descarga, Exception):
+            raise descarga
+        # El perfil se compara contra una base del mismo tipo: con dataset nuevo se lee todo el CSV
+        anotar_perfil(dataset="nuevo" if descarga.cambio else "sin_cambio")
+        if df_filtrado is None:
+            df_filtrado = filtrar_descarga(descarga, objetivos)
+    except Exception as e:
+        print(f"Error descarga/lectura: {e}")
+        return
+
+    # Todos los cambios del país en una pasada; las alertas de cada objetivo salen de acá,
+    # una sola vez por dataset (un 304 o el mismo hash devuelven el changefeed ya alertado)
+    try:
+        alertas = alertas_del_changefeed(descarga, objetivos)
+    except Exception as e:
+        print(f"⚠️ Changefeed falló: {e}")
+        alertas = {}
+
+    # Competencia cercana (índice espacial sobre el snapshot), solo para lo que se publica
+    try:
+        competencia = contexto_espacial(objetivos)
+    except Exception as e:
+        print(f"⚠️ Índice espacial falló: {e}")
+        competencia = {}
+
+    # Fuentes muertas o precios imposibles: esos objetivos no se publican
+    try:
+        problemas = problemas_de_objetivos(generar_calidad(descarga), objetivos)
+    except Exception as e:
+        print(f"⚠️ Control de calidad falló: {e}")
+        problemas = {}
+
+    # Mediana por provincia y bandera de todo el país, una tabla chica por dataset
+    try:
+        agregados = generar_agregados(descarga)
+    except Exception as e:
+        print(f"⚠️ Agregados nacionales fallaron: {e}")
+        agregados = None
+
+    # Base + deltas diarios de la tabla nacional completa, para reconstruir cualquier día
+    try:
+        generar_archivo(descarga)
+    except Exception as e:
+        print(f"⚠️ Archivo diario falló: {e}")
+
+    # Una sola pasada agrupada resuelve el registro vigente de todos los objetivos
+    registros = resolver_objetivos(df_filtrado, objetivos)
+    for objetivo in objetivos:
+        if objetivo not in registros:
+            print(f"❌ No se encontraron datos para: {objetivo.etiqueta} (idempresa {objetivo.idempresa})")
+    if not registros:
+        return
+
+    for objetivo, reg_df in registros.items():
+        print(f"⛽ {objetivo.etiqueta} (idempresa {objetivo.idempresa})")
+        alerta = alertas.get(objetivo)
+        if alerta is not None and alerta['tipo'] == 'cambio':
+            print(f"   🔔 Cambio en el dataset nacional: ${alerta['precio_anterior']:,.2f} → ${alerta['precio']:,.2f}")
+        for motivo in problemas.get(objetivo, []):
+            print(f"   🚩 {motivo}")
+        with etapa("reporte", objetivo=objetivo.etiqueta) as m:
+            informe_diario, informe_mensual = procesar_objetivo(objetivo, reg_df, historicos)
+
+            # Los reportes se encolan en el outbox; el envío ocurre al final
+            encolado = bool(informe_diario and objetivo.publicar and objetivo not in problemas)
+            if encolado:
+                provincial = contexto_provincial(agregados, reg_df.iloc[0]) if agregados is not None else ""
+                # La respuesta en X no puede pasar de 280 (ponderado): lo opcional entra si hay lugar
+                informe_mensual = armar_respuesta(informe_mensual, competencia.get(objetivo), provincial)
+                encolar_reporte(informe_diario, informe_mensual)
+            m.anotar(encolado=encolado, en_changefeed=alerta is not None, calidad=bool(problemas.get(objetivo)))
+    if alertas:
+        marcar_alertado(descarga.sha256)
+
+    # Aviso por Telegram la primera vez que aparece cada problema
+    avisos = avisos_nuevos(problemas)
+    if avisos:
+        encolar_reporte(texto_aviso(avisos), canales=("telegram",))
+
+    # Envío de reportes (incluye lo que haya quedado de corridas anteriores),
+    # en paralelo con la sincronización en USD
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        envio = pool.submit(enviar_reportes)
+
+        # ── Sincronizar CSV en USD ──────────────────────────────────────────
+        if _USD_SYNC_DISPONIBLE:
+            try:
+                sincronizar_usd(df_tc=df_tc)
+            except Exception as e_usd:
+                print(f"⚠️ usd_sync falló: {e_usd}")
+        else:
+            print("⚠️ usd_sync.py no encontrado — el CSV en USD no se actualizó.")
 
-    # ── Sincronizar CSV en USD ──────────────────────────────────────────────
-    if _USD_SYNC_DISPONIBLE:
         try:
-            sincronizar_usd()
-        except Exception as e_usd:
-            print(f"⚠️ usd_sync falló: {e_usd}")
-    else:
-        print("⚠️ usd_sync.py no encontrado — el CSV en USD no se actualizó.")
+            envio.result()
+        except Exception as e_envio:
+            print(f"⚠️ Envío de reportes falló: {e_envio}")
+
+    # Formato normalizado (lo que se commitea): solo las filas agregadas a los CSV anchos
+    try:
+        with etapa("normalizado") as m:
+            m.anotar(filas=sum(sincronizar_normalizado().values()))
+    except Exception as e:
+        print(f"⚠️ Formato normalizado falló: {e}")
+
+    # Backend SQLite opcional (NAFTA_SQLITE): solo lo agregado a cada CSV, en una transacción
+    if sqlite_habilitada():
+        try:
+            with etapa("sqlite") as m:
+                m.anotar(filas=sum(sincronizar_sqlite().values()))
+        except Exception as e:
+            print(f"⚠️ Base SQLite falló: {e}")
     
     print(f"--- Finalizado: {datetime.now()} ---")
 
@@ -0,0 +1,429 @@
+"""
+normalizado.py
+==============
+Formato de almacenamiento de los históricos, en data/normalizado/:
+
+  estaciones.csv   dimensión: una fila por combinación distinta de columnas
+                   estáticas (idempresa, cuit, empresa, direccion, ..., geojson)
+  precios.csv      hechos: serie, id_estacion, indice_tiempo, fecha_vigencia,
+                   precio, %_variacion, fecha_chequeo, price_usd
+  series.json      esquema: id y cabecera de cada CSV ancho, y la del CSV en USD
+
+Esto es lo que se commitea. Cada fila de historico_precios.csv repite ~16
+columnas estáticas para guardar una fecha y un precio, y el CSV en USD repite
+el ARS entero; acá cada fila de hechos ocupa ~60 bytes y el CSV en USD se
+reduce a la columna price_usd.
+
+Los CSV anchos (data/historico_precios.csv, data/historico_precios_usd.csv,
+data/historicos/) son vistas: no se versionan, se regeneran desde acá cuando
+faltan (`vistas --si-faltan`, al arrancar nafta_tracker.py) y siguen siendo el
+formato de trabajo de historico.py, usd_sync.py y chequeo.py. Después de cada
+corrida se sincronizan hacia acá leyendo solo lo agregado: se guarda el tamaño
+de cada CSV y su última línea, como el índice de historico.py, en
+data/cache/normalizado.json (caché local, no se commitea). Las filas nuevas se
+agregan al final de precios.csv y estaciones.csv sin reescribirlos; solo si un
+CSV ancho se reescribió con otro contenido (backfill, migración) o un price_usd
+ya guardado cambia, precios.csv se vuelve a escribir completo.
+
+Las vistas tienen las mismas columnas y el mismo texto de cada celda. Solo usa
+la biblioteca estándar.
+
+Uso:
+  python normalizado.py                     sincroniza desde los CSV anchos
+  python normalizado.py vistas [--destino DIR] [--si-faltan]
+                                            regenera los CSV anchos
+  python normalizado.py verificar           compara las vistas con los CSV actuales
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+
+from configuracion import ARCHIVO_HISTORICO
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA           = "data"
+DIR_NORMALIZADO    = os.path.join(DIR_DATA, "normalizado")
+ARCHIVO_ESTACIONES = os.path.join(DIR_NORMALIZADO, "estaciones.csv")
+ARCHIVO_HECHOS     = os.path.join(DIR_NORMALIZADO, "precios.csv")
+ARCHIVO_SERIES     = os.path.join(DIR_NORMALIZADO, "series.json")
+ARCHIVO_CURSORES   = os.path.join(DIR_DATA, "cache", "normalizado.json")
+ARCHIVO_USD        = os.path.join(DIR_DATA, "historico_precios_usd.csv")
+DIR_HISTORICOS     = os.path.join(DIR_DATA, "historicos")
+
+VERSION = 2
+COLUMNAS_HECHOS = ['indice_tiempo', 'fecha_vigencia', 'precio', '%_variacion', 'fecha_chequeo']
+COLUMNA_USD     = 'price_usd'
+SIN_USD         = ''      # la fecha no está en el CSV en USD
+USD_VACIO       = 'nan'   # está, pero sin tipo de cambio (celda vacía en el CSV)
+
+
+def escribir_csv(ruta: str, cabecera: list, filas) -> None:
+    """Mismo dialecto que pandas.to_csv: comillas mínimas y '\\n' como fin de línea."""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(cabecera)
+        w.writerows(filas)
+    os.replace(tmp, ruta)
+
+
+def leer_csv(ruta: str) -> tuple:
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = [fila for fila in csv.reader(f) if fila]
+    return (filas[0], filas[1:]) if filas else ([], [])
+
+
+def _escribir_texto(ruta: str, texto: str) -> None:
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+
+
+def _cursor(estado: dict) -> dict:
+    """La parte de un estado de LectorIncremental que cambia en cada corrida."""
+    return {k: estado[k] for k in ("bytes", "ultima") if k in estado}
+
+
+class LectorIncremental:
+    """Lee de un CSV ancho solo lo agregado desde la última sincronización."""
+
+    def __init__(self, ruta: str, estado: dict):
+        self.ruta = ruta
+        self.estado = estado
+
+    def leer(self) -> tuple:
+        """(completo, filas nuevas como dict). completo=True si hubo que releer todo el CSV."""
+        with open(self.ruta, "rb") as f:
+            completo = not self._vigente(f)
+            f.seek(0 if completo else self.estado["bytes"])
+            datos = f.read()
+        texto = datos.decode("utf-8")
+        if completo:
+            primera, _, texto = texto.partition("\n")
+            self.estado["cabecera"] = next(csv.reader([primera.rstrip("\r")]), [])
+        cabecera = self.estado["cabecera"]
+        filas = [dict(zip(cabecera, fila)) for fila in csv.reader(io.StringIO(texto)) if fila]
+        lineas = [l for l in texto.split("\n") if l.strip()]
+        self.estado["bytes"] = len(datos) if completo else self.estado["bytes"] + len(datos)
+        if lineas:
+            self.estado["ultima"] = lineas[-1]
+        elif completo:
+            self.estado["ultima"] = ""
+        return completo, filas
+
+    def _vigente(self, f) -> bool:
+        """El CSV solo creció desde la última lectura: misma cabecera y misma última línea."""
+        previos = self.estado.get("bytes")
+        if not previos or os.path.getsize(self.ruta) < previos:
+            return False
+        primera = f.readline().decode("utf-8").rstrip("\r\n")
+        if next(csv.reader([primera]), []) != self.estado.get("cabecera"):
+            return False
+        if not self.estado.get("ultima"):
+            return f.tell() == previos
+        ultima = (self.estado["ultima"] + "\n").encode("utf-8")
+        if previos < len(ultima):
+            return False
+        f.seek(previos - len(ultima))
+        return f.read(len(ultima)) == ultima
+
+
+class Almacen:
+    """Dimensión de estaciones + tabla de hechos, con vistas anchas a pedido."""
+
+    def __init__(self, directorio: str = DIR_NORMALIZADO, cursores: str = ARCHIVO_CURSORES):
+        self.directorio = directorio
+        self.cursores = cursores
+        self.meta = {"version": VERSION, "series": {}, "usd": {}}
+        self.columnas_estacion = []
+        self.estaciones = []          # filas de la dimensión (sin id; el id es la posición)
+        self._ids = {}                # tupla de valores estáticos → id
+        self.hechos = []              # [serie, id_estacion, *COLUMNAS_HECHOS, price_usd]
+        self._en_disco = (0, 0)       # (estaciones, hechos) ya escritos; lo que sigue se agrega al final
+        self._esquema = ""            # series.json tal como está en disco
+        self.reescribir = False       # un hecho ya escrito cambió: precios.csv va completo
+        self.cambios = False
+
+    def _ruta(self, ruta_por_defecto: str) -> str:
+        return os.path.join(self.directorio, os.path.basename(ruta_por_defecto))
+
+    @classmethod
+    def cargar(cls, directorio: str = DIR_NORMALIZADO, cursores: str = ARCHIVO_CURSORES) -> "Almacen":
+        almacen = cls(directorio, cursores)
+        try:
+            with open(almacen._ruta(ARCHIVO_SERIES), encoding="utf-8") as f:
+                almacen._esquema = f.read()
+            meta = json.loads(almacen._esquema)
+            if meta.get("version") != VERSION:
+                return almacen
+            cabecera, estaciones = leer_csv(almacen._ruta(ARCHIVO_ESTACIONES))
+            _, hechos = leer_csv(almacen._ruta(ARCHIVO_HECHOS))
+        except (OSError, ValueError):
+            return almacen
+        almacen.meta = meta
+        almacen.columnas_estacion = cabecera[1:]
+        almacen.estaciones = [fila[1:] for fila in estaciones]
+        almacen._ids = {tuple(fila): str(i) for i, fila in enumerate(almacen.estaciones)}
+        almacen.hechos = hechos
+        almacen._en_disco = (len(almacen.estaciones), len(almacen.hechos))
+        # Hasta dónde se leyó cada CSV ancho: caché local. Si falta, cada CSV se relee
+        # completo y solo se agrega lo que no estaba (ver sincronizar_serie).
+        try:
+            with open(almacen.cursores, encoding="utf-8") as f:
+                cursores = json.load(f)
+        except (OSError, ValueError):
+            cursores = {}
+        for archivo, estado in meta["series"].items():
+            estado.update(cursores.get("series", {}).get(archivo, {}))
+        meta["usd"].update(cursores.get("usd", {}))
+        return almacen
+
+    def guardar(self) -> None:
+        if not self.cambios:
+            return
+        cabecera_estaciones = ['id_estacion'] + self.columnas_estacion
+        cabecera_hechos = ['serie', 'id_estacion'] + COLUMNAS_HECHOS + [COLUMNA_USD]
+        estaciones = [[str(i)] + fila for i, fila in enumerate(self.estaciones)]
+        n_estaciones, n_hechos = self._en_disco
+        # Solo lo nuevo va al final; se reescribe completo si cambió la cabecera o algo ya escrito
+        if not self._agregar(self._ruta(ARCHIVO_ESTACIONES), cabecera_estaciones, estaciones, n_estaciones):
+            escribir_csv(self._ruta(ARCHIVO_ESTACIONES), cabecera_estaciones, estaciones)
+        if self.reescribir or not self._agregar(self._ruta(ARCHIVO_HECHOS), cabecera_hechos, self.hechos, n_hechos):
+            escribir_csv(self._ruta(ARCHIVO_HECHOS), cabecera_hechos, self.hechos)
+        self._en_disco = (len(self.estaciones), len(self.hechos))
+        self.reescribir = False
+
+        esquema = {"version": VERSION,
+                   "series": {a: {"id": e["id"], "cabecera": e.get("cabecera", [])}
+                              for a, e in self.meta["series"].items()},
+                   "usd": {k: v for k, v in self.meta["usd"].items() if k in ("serie", "cabecera")}}
+        texto = json.dumps(esquema, indent=2, ensure_ascii=False) + "\n"
+        if texto != self._esquema:
+            _escribir_texto(self._ruta(ARCHIVO_SERIES), texto)
+            self._esquema = texto
+        cursores = {"series": {a: _cursor(e) for a, e in self.meta["series"].items()},
+                    "usd": _cursor(self.meta["usd"])}
+        _escribir_texto(self.cursores, json.dumps(cursores, indent=2, ensure_ascii=False))
+        self.cambios = False
+
+    @staticmethod
+    def _agregar(ruta: str, cabecera: list, filas: list, en_disco: int) -> bool:
+        """Agrega filas[en_disco:] al final de `ruta`. False si hay que escribirlo completo."""
+        if en_disco == 0 or not os.path.exists(ruta):
+            return False
+        with open(ruta, newline="", encoding="utf-8") as f:
+            if next(csv.reader(f), []) != cabecera:
+                return False
+        if len(filas) > en_disco:
+            with open(ruta, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f, lineterminator="\n").writerows(filas[en_disco:])
+        return True
+
+    # ── Sincronización desde los CSV anchos ──────────────────────────────────
+    def _id_serie(self, archivo: str) -> str:
+        series = self.meta["series"]
+        if archivo not in series:
+            series[archivo] = {"id": str(len(series))}
+        return series[archivo]["id"]
+
+    def _id_estacion(self, fila: dict) -> str:
+        for col in fila:
+            if col not in COLUMNAS_HECHOS and col != COLUMNA_USD and col not in self.columnas_estacion:
+                self.columnas_estacion.append(col)
+                self.estaciones = [e + [''] for e in self.estaciones]
+                self._ids = {tuple(e): str(i) for i, e in enumerate(self.estaciones)}
+        valores = [fila.get(c, '') for c in self.columnas_estacion]
+        clave = tuple(valores)
+        if clave not in self._ids:
+            self._ids[clave] = str(len(self.estaciones))
+            self.estaciones.append(valores)
+        return self._ids[clave]
+
+    def sincronizar_serie(self, archivo: str) -> int:
+        """Incorpora las filas nuevas de un histórico ancho. Devuelve cuántos hechos se agregaron."""
+        serie = self._id_serie(archivo)
+        estado = self.meta["series"][archivo]
+        completo, filas = LectorIncremental(archivo, estado).leer()
+        nuevos = [[serie, self._id_estacion(fila)] + [fila.get(c, '') for c in COLUMNAS_HECHOS] + [SIN_USD]
+                  for fila in filas]
+        if completo:
+            previos = [h[:7] for h in self.hechos if h[0] == serie]
+            if previos == [h[:7] for h in nuevos[:len(previos)]]:
+                # Mismo contenido más filas al final (p. ej. una vista regenerada sin cursor)
+                nuevos = nuevos[len(previos):]
+            else:
+                self.hechos = [h for h in self.hechos if h[0] != serie]
+                self.reescribir = True
+                if self.meta["usd"].get("serie") == archivo:
+                    self.meta["usd"]["bytes"] = 0   # el CSV en USD se vuelve a asociar completo
+        self.hechos.extend(nuevos)
+        if completo or filas:
+            self.cambios = True
+        return len(nuevos)
+
+    def sincronizar_usd(self, ruta_usd: str = ARCHIVO_USD, archivo_serie: str = ARCHIVO_HISTORICO) -> int:
+        """Asocia price_usd a los hechos de la serie en ARS de la que se deriva el CSV en USD."""
+        serie = self._id_serie(archivo_serie)
+        estado = self.meta["usd"]
+        completo, filas = LectorIncremental(ruta_usd, estado).leer()
+        estado["serie"] = archivo_serie
+        por_fecha = {}
+        antes = {}                    # posición → price_usd antes de esta sincronización
+        for i, h in enumerate(self.hechos):
+            if h[0] == serie:
+                if completo:
+                    antes[i], h[7] = h[7], SIN_USD
+                por_fecha.setdefault(h[6], []).append(i)
+        for fila in filas:
+            candidatos = por_fecha.get(fila.get('fecha_chequeo', ''), [])
+            # Con fechas repetidas, cada fila USD va al primer hecho de esa fecha todavía sin USD
+            libres = [i for i in candidatos if self.hechos[i][7] == SIN_USD]
+            i = libres[0] if libres else (candidatos[-1] if candidatos else None)
+            if i is not None:
+                antes.setdefault(i, self.hechos[i][7])
+                self.hechos[i][7] = fila.get(COLUMNA_USD) or USD_VACIO
+        # Un hecho ya escrito que cambia de price_usd obliga a reescribir precios.csv
+        if any(i < self._en_disco[1] and self.hechos[i][7] != v for i, v in antes.items()):
+            self.reescribir = True
+        if completo or filas:
+            self.cambios = True
+        return len(filas)
+
+    # ── Vistas desnormalizadas ───────────────────────────────────────────────
+    def _filas_vista(self, archivo: str, cabecera: list, usd: bool):
+        serie = self.meta["series"][archivo]["id"]
+        for h in self.hechos:
+            if h[0] != serie or (usd and h[7] == SIN_USD):
+                continue
+            fila = dict(zip(self.columnas_estacion, self.estaciones[int(h[1])]))
+            fila.update(zip(COLUMNAS_HECHOS, h[2:7]))
+            fila[COLUMNA_USD] = '' if h[7] == USD_VACIO else h[7]
+            yield [fila.get(c, '') for c in cabecera]
+
+    def vista(self, archivo: str, destino: str | None = None) -> str:
+        """Regenera el histórico ancho `archivo` (en `destino`, o en su ruta original)."""
+        destino = destino or archivo
+        cabecera = self.meta["series"][archivo]["cabecera"]
+        escribir_csv(destino, cabecera, self._filas_vista(archivo, cabecera, usd=False))
+        return destino
+
+    def vista_usd(self, destino: str | None = None) -> str:
+        destino = destino or ARCHIVO_USD
+        estado = self.meta["usd"]
+        escribir_csv(destino, estado["cabecera"], self._filas_vista(estado["serie"], estado["cabecera"], usd=True))
+        return destino
+
+
+def historicos_existentes() -> list:
+    """El histórico principal más los de data/historicos/."""
+    rutas = [ARCHIVO_HISTORICO] if os.path.exists(ARCHIVO_HISTORICO) else []
+    if os.path.isdir(DIR_HISTORICOS):
+        rutas += sorted(os.path.join(DIR_HISTORICOS, n) for n in os.listdir(DIR_HISTORICOS) if n.endswith(".csv"))
+    return rutas
+
+
+def sincronizar(archivos: list | None = None) -> dict:
+    """Sincroniza todos los históricos (y el CSV en USD) hacia el formato normalizado."""
+    almacen = Almacen.cargar()
+    leidas = {a: almacen.sincronizar_serie(a) for a in (archivos or historicos_existentes())}
+    if os.path.exists(ARCHIVO_USD) and ARCHIVO_HISTORICO in almacen.meta["series"]:
+        leidas[ARCHIVO_USD] = almacen.sincronizar_usd()
+    almacen.guardar()
+    return leidas
+
+
+def regenerar_vistas(destino: str | None = None, si_faltan: bool = False) -> list:
+    """Escribe los CSV anchos desde el formato normalizado. Devuelve las rutas escritas."""
+    if si_faltan and not destino and not _vistas_faltantes():
+        return []
+    almacen = Almacen.cargar()
+    escritas = []
+    for archivo, estado in almacen.meta["series"].items():
+        ruta = os.path.join(destino, archivo) if destino else archivo
+        if not (si_faltan and os.path.exists(ruta)):
+            escritas.append(almacen.vista(archivo, ruta))
+            if not destino:
+                _al_final(ruta, estado)
+    if almacen.meta["usd"].get("cabecera"):
+        ruta = os.path.join(destino, ARCHIVO_USD) if destino else ARCHIVO_USD
+        if not (si_faltan and os.path.exists(ruta)):
+            escritas.append(almacen.vista_usd(ruta))
+            if not destino:
+                _al_final(ruta, almacen.meta["usd"])
+    # Las vistas en su ruta original ya están sincronizadas: la próxima lectura empieza al final
+    if escritas and not destino:
+        almacen.cambios = True
+        almacen.guardar()
+    return escritas
+
+
+def _vistas_faltantes() -> list:
+    """CSV anchos declarados en series.json que no existen (sin cargar las tablas)."""
+    try:
+        with open(ARCHIVO_SERIES, encoding="utf-8") as f:
+            esquema = json.load(f)
+    except (OSError, ValueError):
+        return []
+    rutas = list(esquema.get("series", {})) + ([ARCHIVO_USD] if esquema.get("usd", {}).get("cabecera") else [])
+    return [r for r in rutas if not os.path.exists(r)]
+
+
+def _al_final(ruta: str, estado: dict) -> None:
+    """Deja el cursor de LectorIncremental al final de un CSV recién escrito."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    lineas = [l for l in datos.decode("utf-8").split("\n") if l.strip()]
+    estado["bytes"] = len(datos)
+    estado["ultima"] = lineas[-1] if len(lineas) > 1 else ""
+
+
+def verificar() -> list:
+    """Archivos cuya vista no coincide celda por celda con el CSV ancho actual."""
+    almacen = Almacen.cargar()
+    distintos = []
+    pares = [(a, lambda a=a: almacen._filas_vista(a, almacen.meta["series"][a]["cabecera"], usd=False))
+             for a in almacen.meta["series"]]
+    if almacen.meta["usd"].get("cabecera"):
+        estado = almacen.meta["usd"]
+        pares.append((ARCHIVO_USD, lambda: almacen._filas_vista(estado["serie"], estado["cabecera"], usd=True)))
+    for archivo, filas in pares:
+        if not os.path.exists(archivo) or leer_csv(archivo)[1] != list(filas()):
+            distintos.append(archivo)
+    return distintos
+
+
+def _tamano(rutas: list) -> int:
+    return sum(os.path.getsize(r) for r in rutas if os.path.exists(r))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Históricos en formato normalizado (dimensión + hechos).")
+    parser.add_argument("accion", nargs="?", default="sincronizar", choices=["sincronizar", "vistas", "verificar"])
+    parser.add_argument("--destino", help="directorio donde escribir las vistas (por defecto, su ruta original)")
+    parser.add_argument("--si-faltan", action="store_true", help="solo regenerar los CSV que no existen")
+    args = parser.parse_args()
+
+    if args.accion == "vistas":
+        for ruta in regenerar_vistas(args.destino, args.si_faltan):
+            print(f"✅ Vista regenerada: {ruta}")
+    elif args.accion == "verificar":
+        distintos = verificar()
+        for ruta in distintos:
+            print(f"❌ La vista no coincide con {ruta}")
+        if not distintos:
+            print("✅ Todas las vistas coinciden con los CSV anchos")
+        raise SystemExit(1 if distintos else 0)
+    else:
+        leidas = sincronizar()
+        for ruta, n in leidas.items():
+            print(f"  {ruta}: {n} fila(s) nueva(s)")
+        anchos = historicos_existentes() + [ARCHIVO_USD]
+        normalizados = [ARCHIVO_ESTACIONES, ARCHIVO_HECHOS, ARCHIVO_SERIES]
+        print(f"✅ Normalizado: {_tamano(normalizados) / 1024:,.1f} KB "
+              f"(CSV anchos: {_tamano(anchos) / 1024:,.1f} KB)")
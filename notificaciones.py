@@ -0,0 +1,301 @@
+"""
+notificaciones.py
+=================
+Outbox de reportes para Telegram y X (Twitter).
+
+Los reportes no se envían en línea: se encolan en data/outbox/ (un JSON por
+reporte, con el estado de cada canal) y después drenar_outbox() los envía:
+  - un hilo por canal, así un X lento no frena a Telegram;
+  - dentro de cada canal se respeta el orden de los reportes;
+  - reintentos con backoff exponencial; ante 429 se espera lo que indique la
+    API (retry_after de Telegram, x-rate-limit-reset de X) hasta MAX_ESPERA;
+  - lo que no se pudo enviar queda en el outbox y se drena en la próxima corrida;
+  - un reporte que la API rechaza (400/403 de X, 4xx de Telegram salvo 429)
+    queda como "fallido" y el canal sigue con los siguientes: solo los rate
+    limits y los errores de red/5xx frenan la cola.
+El cliente de X y la sesión HTTP de Telegram se crean una sola vez por proceso;
+tweepy se importa recién al crear el cliente (las corridas sin nada para
+publicar en X no lo cargan).
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from descargas import obtener_sesion
+
+# --- CONFIGURACIÓN DE CRÉDITOS X (TWITTER) ---
+X_API_KEY = os.getenv("X_API_KEY")
+X_API_SECRET = os.getenv("X_API_SECRET")
+X_ACCESS_TOKEN = os.getenv("X_ACCESS_TOKEN")
+X_ACCESS_SECRET = os.getenv("X_ACCESS_SECRET")
+X_BEARER_TOKEN = os.getenv("X_BEARER_TOKEN")
+
+# --- Claves de Telegram ---
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API = "https://api.telegram.org"
+
+# ── OUTBOX ────────────────────────────────────────────────────────────────────
+DIR_DATA   = "data"
+DIR_OUTBOX = os.path.join(DIR_DATA, "outbox")
+
+CANALES        = ("telegram", "x")
+MAX_INTENTOS   = 4      # por corrida
+BACKOFF_BASE   = 2.0    # segundos; se duplica en cada reintento
+MAX_ESPERA     = 60.0   # si el rate limit pide más, se deja para la próxima corrida
+CADUCIDAD      = timedelta(hours=48)  # un reporte diario viejo ya no se publica
+LIMITE_X       = 280    # largo ponderado de un tuit
+
+# Rangos que X cuenta como 1; el resto (emojis, CJK, ...) cuenta 2
+_RANGOS_SIMPLES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+_SIN_PESO = {0xFE0E, 0xFE0F}  # selectores de variante: van pegados al emoji
+
+_cliente_x = None
+_lock_x = threading.Lock()
+
+
+class EsperaDemasiadoLarga(Exception):
+    """El rate limit pide esperar más de MAX_ESPERA: se reintenta en otra corrida."""
+
+
+class Rechazado(Exception):
+    """La API rechazó el reporte (4xx que no es rate limit): reintentarlo no sirve."""
+
+
+class _Reintentar(Exception):
+    """Rate limit con espera aceptable: se reintenta en esta corrida."""
+
+    def __init__(self, espera: float):
+        super().__init__(f"rate limit: esperar {espera:.0f}s")
+        self.espera = espera
+
+
+def _cliente_twitter() -> "tweepy.Client":
+    global _cliente_x
+    with _lock_x:
+        if _cliente_x is None:
+            import tweepy
+
+            _cliente_x = tweepy.Client(
+                bearer_token=X_BEARER_TOKEN,
+                consumer_key=X_API_KEY,
+                consumer_secret=X_API_SECRET,
+                access_token=X_ACCESS_TOKEN,
+                access_token_secret=X_ACCESS_SECRET
+            )
+        return _cliente_x
+
+
+def _x_configurado() -> bool:
+    return all([X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_SECRET])
+
+
+def _telegram_configurado() -> bool:
+    return bool(TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID)
+
+
+# ── Envío por canal ───────────────────────────────────────────────────────────
+def enviar_telegram(mensaje):
+    """Envía notificación por Telegram. Lanza excepción si la API no la acepta."""
+    url_tg = f"{TELEGRAM_API}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": mensaje}
+    resp = obtener_sesion().post(url_tg, json=payload, timeout=10)
+    if resp.status_code == 429:
+        try:
+            espera = float(resp.json().get("parameters", {}).get("retry_after", BACKOFF_BASE))
+        except ValueError:
+            espera = BACKOFF_BASE
+        raise _rate_limit(espera)
+    if 400 <= resp.status_code < 500:
+        try:
+            detalle = resp.json().get("description", "")
+        except ValueError:
+            detalle = resp.text[:200]
+        raise Rechazado(f"Telegram {resp.status_code}: {detalle}")
+    resp.raise_for_status()
+
+
+def publicar_en_x(texto_principal, texto_mensual=None, estado=None):
+    """
+    Publica el reporte en X (Twitter): tuit diario y, si hay, respuesta mensual.
+    `estado` guarda el id del tuit ya publicado para no duplicarlo al reintentar.
+    """
+    import tweepy
+
+    estado = estado if estado is not None else {}
+    client = _cliente_twitter()
+    try:
+        if not estado.get("tweet_id"):
+            res1 = client.create_tweet(text=texto_principal)
+            estado["tweet_id"] = res1.data['id']
+            print(f"✅ Tuit diario enviado.")
+        if texto_mensual and not estado.get("reply_id"):
+            res2 = client.create_tweet(text=texto_mensual, in_reply_to_tweet_id=estado["tweet_id"])
+            estado["reply_id"] = res2.data['id']
+            print(f"✅ Hilo mensual enviado.")
+    except tweepy.TooManyRequests as e:
+        reset = e.response.headers.get("x-rate-limit-reset") if e.response is not None else None
+        espera = max(0.0, float(reset) - time.time()) if reset else BACKOFF_BASE
+        raise _rate_limit(espera)
+    except (tweepy.BadRequest, tweepy.Forbidden) as e:
+        raise Rechazado(f"X: {e}") from e
+    return estado
+
+
+def largo_x(texto: str) -> int:
+    """Largo del texto como lo cuenta X: los emojis y caracteres fuera de los rangos latinos valen 2."""
+    largo = 0
+    for c in texto:
+        cp = ord(c)
+        if cp in _SIN_PESO:
+            continue
+        largo += 1 if any(a <= cp <= b for a, b in _RANGOS_SIMPLES) else 2
+    return largo
+
+
+def armar_respuesta(principal: str, *opcionales: str, limite: int = LIMITE_X) -> str:
+    """
+    Une `principal` con las líneas opcionales que entren en un tuit, en orden;
+    las que no entran se descartan (el texto principal va siempre).
+    """
+    texto = principal or ""
+    for extra in opcionales:
+        if not extra:
+            continue
+        candidato = f"{texto}\n\n{extra}" if texto else extra
+        if largo_x(candidato) <= limite:
+            texto = candidato
+    return texto
+
+
+def _rate_limit(espera: float) -> Exception:
+    if espera > MAX_ESPERA:
+        return EsperaDemasiadoLarga(f"rate limit: esperar {espera:.0f}s")
+    return _Reintentar(espera)
+
+
+# ── Outbox ────────────────────────────────────────────────────────────────────
+def encolar_reporte(texto_principal: str, texto_mensual: str = "", canales: tuple = CANALES) -> str:
+    """
+    Guarda el reporte en el outbox (escritura atómica) y devuelve su id.
+    Los canales fuera de `canales` quedan omitidos (p. ej. avisos solo para Telegram).
+    """
+    os.makedirs(DIR_OUTBOX, exist_ok=True)
+    ahora = datetime.now()
+    id_reporte = f"{ahora.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    reporte = {
+        "id": id_reporte,
+        "creado": ahora.isoformat(timespec="seconds"),
+        "texto_principal": texto_principal,
+        "texto_mensual": texto_mensual or "",
+        "canales": {c: {"estado": "pendiente" if c in canales else "omitido", "intentos": 0, "error": None}
+                    for c in CANALES},
+    }
+    # Claves fijas: el hilo de X solo reasigna valores mientras otro hilo serializa
+    reporte["canales"]["x"].update({"tweet_id": None, "reply_id": None})
+    _guardar(reporte)
+    return id_reporte
+
+
+def _ruta(id_reporte: str) -> str:
+    return os.path.join(DIR_OUTBOX, f"{id_reporte}.json")
+
+
+def _guardar(reporte: dict) -> None:
+    ruta = _ruta(reporte["id"])
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def pendientes() -> list:
+    """Reportes del outbox con algún canal sin enviar, del más viejo al más nuevo."""
+    if not os.path.isdir(DIR_OUTBOX):
+        return []
+    reportes = []
+    for nombre in sorted(os.listdir(DIR_OUTBOX)):
+        if not nombre.endswith(".json"):
+            continue
+        with open(os.path.join(DIR_OUTBOX, nombre), encoding="utf-8") as f:
+            reportes.append(json.load(f))
+    return reportes
+
+
+def _enviar_canal(canal: str, reporte: dict) -> None:
+    estado = reporte["canales"][canal]
+    if canal == "telegram":
+        enviar_telegram(reporte["texto_principal"])
+    else:
+        publicar_en_x(reporte["texto_principal"], reporte["texto_mensual"] or None, estado)
+
+
+def _drenar_canal(canal: str, reportes: list, lock: threading.Lock) -> None:
+    configurado = _telegram_configurado() if canal == "telegram" else _x_configurado()
+    for reporte in reportes:
+        estado = reporte["canales"][canal]
+        if estado["estado"] != "pendiente":
+            continue
+        if not configurado:
+            estado["estado"] = "omitido"
+            estado["error"] = "sin credenciales"
+        elif datetime.now() - datetime.fromisoformat(reporte["creado"]) > CADUCIDAD:
+            estado["estado"] = "caducado"
+        else:
+            for intento in range(MAX_INTENTOS):
+                estado["intentos"] += 1
+                try:
+                    _enviar_canal(canal, reporte)
+                    estado["estado"] = "enviado"
+                    estado["error"] = None
+                    break
+                except EsperaDemasiadoLarga as e:
+                    estado["error"] = str(e)
+                    print(f"⏳ {canal}: {e}. Queda en el outbox.")
+                    break
+                except Rechazado as e:
+                    estado["estado"] = "fallido"
+                    estado["error"] = str(e)
+                    break
+                except Exception as e:
+                    estado["error"] = str(e)
+                    espera = e.espera if isinstance(e, _Reintentar) else BACKOFF_BASE * (2 ** intento)
+                    if intento + 1 < MAX_INTENTOS:
+                        time.sleep(espera)
+            if estado["estado"] != "enviado":
+                print(f"❌ Error en {canal}: {estado['error']}")
+        with lock:
+            _guardar(reporte)
+        if estado["estado"] == "pendiente" and configurado:
+            # Se corta el canal para no publicar reportes posteriores fuera de orden
+            break
+
+
+def drenar_outbox() -> int:
+    """
+    Envía todo lo pendiente del outbox, un hilo por canal.
+    Borra los reportes ya resueltos en todos los canales. Devuelve cuántos quedan.
+    """
+    reportes = pendientes()
+    if not reportes:
+        return 0
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=len(CANALES)) as pool:
+        futuros = [pool.submit(_drenar_canal, canal, reportes, lock) for canal in CANALES]
+        for futuro in futuros:
+            futuro.result()
+
+    quedan = 0
+    for reporte in reportes:
+        if all(c["estado"] != "pendiente" for c in reporte["canales"].values()):
+            os.remove(_ruta(reporte["id"]))
+        else:
+            quedan += 1
+    if quedan:
+        print(f"📮 {quedan} reporte(s) quedan en el outbox para la próxima corrida.")
+    return quedan
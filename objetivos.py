@@ -0,0 +1,132 @@
+"""
+objetivos.py
+============
+Registro de objetivos de seguimiento: cada objetivo es una tupla
+(idempresa, producto, tipohorario) con su propio histórico y su propio reporte.
+
+  - El objetivo principal (GAS IMPULSO, Nafta súper, Diurno) se arma en
+    nafta_tracker.py y conserva data/historico_precios.csv.
+  - Los objetivos adicionales se declaran en data/objetivos.csv con columnas
+    idempresa, producto, tipohorario, etiqueta, publicar.
+
+Todos los objetivos se resuelven juntos en una sola pasada vectorizada sobre
+el dataset: el costo crece con el tamaño del dataset, no con la cantidad de
+objetivos.
+
+pandas se importa solo en las funciones que filtran el dataset: el registro
+de objetivos se puede cargar sin él (modo liviano de chequeo.py).
+"""
+
+import csv
+import hashlib
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA           = "data"
+ARCHIVO_OBJETIVOS  = os.path.join(DIR_DATA, "objetivos.csv")
+DIR_HISTORICOS     = os.path.join(DIR_DATA, "historicos")
+
+COLUMNAS_CLAVE = ['idempresa', 'producto', 'tipohorario']
+
+
+@dataclass(frozen=True)
+class Objetivo:
+    idempresa: str
+    producto: str
+    tipohorario: str
+    etiqueta: str
+    archivo_historico: str
+    publicar: bool = False
+
+    @property
+    def clave(self) -> tuple:
+        return (str(self.idempresa).strip(), _normalizar(self.producto), _normalizar(self.tipohorario))
+
+
+def _normalizar(texto) -> str:
+    return str(texto).strip().casefold()
+
+
+def _slug(texto: str) -> str:
+    ascii_ = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', ascii_.lower()).strip('_')
+
+
+def ruta_historico(idempresa, producto, tipohorario) -> str:
+    nombre = f"{str(idempresa).strip()}_{_slug(producto)}_{_slug(tipohorario)}.csv"
+    return os.path.join(DIR_HISTORICOS, nombre)
+
+
+def cargar_objetivos(principal: Objetivo, ruta: str = ARCHIVO_OBJETIVOS) -> list:
+    """Devuelve el objetivo principal más los declarados en data/objetivos.csv (sin duplicados)."""
+    objetivos = {principal.clave: principal}
+    if os.path.exists(ruta):
+        with open(ruta, newline='', encoding='utf-8-sig') as f:
+            filas = [{k: (v or '') for k, v in fila.items()} for fila in csv.DictReader(f)]
+        for fila in filas:
+            publicar = fila.get('publicar', '').strip().lower() in ('1', 'true', 'si', 'sí')
+            obj = Objetivo(
+                idempresa=fila['idempresa'].strip(),
+                producto=fila['producto'].strip(),
+                tipohorario=fila['tipohorario'].strip(),
+                etiqueta=fila.get('etiqueta', '').strip() or fila['producto'].strip(),
+                archivo_historico=ruta_historico(fila['idempresa'], fila['producto'], fila['tipohorario']),
+                publicar=publicar,
+            )
+            objetivos.setdefault(obj.clave, obj)
+    return list(objetivos.values())
+
+
+def huella_objetivos(objetivos: list) -> str:
+    """Hash estable del conjunto de claves registradas (para invalidar cachés de filtrado)."""
+    texto = "\n".join("|".join(c) for c in sorted(o.clave for o in objetivos))
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def firma_precios(df: "pd.DataFrame", objetivos: list) -> str:
+    """Hash del precio vigente de cada objetivo: cambia solo si cambió el precio de alguno."""
+    registros = resolver_objetivos(df, objetivos)
+    texto = "\n".join(f"{'|'.join(o.clave)}={float(r['precio'].iloc[0])!r}"
+                      for o, r in sorted(registros.items(), key=lambda item: item[0].clave))
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def claves_normalizadas(df: "pd.DataFrame") -> "pd.MultiIndex":
+    """Clave (idempresa, producto, tipohorario) normalizada de cada fila del dataset."""
+    import pandas as pd
+
+    return pd.MultiIndex.from_arrays([
+        df['idempresa'].str.strip(),
+        df['producto'].str.strip().str.casefold(),
+        df['tipohorario'].str.strip().str.casefold(),
+    ], names=COLUMNAS_CLAVE)
+
+
+def filtrar_objetivos(df: "pd.DataFrame", objetivos: list) -> "pd.DataFrame":
+    """Deja solo las filas cuya clave pertenece a algún objetivo (lookup por hash, una pasada)."""
+    claves = claves_normalizadas(df)
+    return df[claves.isin([o.clave for o in objetivos])]
+
+
+def resolver_objetivos(df: "pd.DataFrame", objetivos: list) -> dict:
+    """
+    Asigna a cada objetivo su registro vigente (el de fecha_vigencia más reciente).
+    Devuelve {Objetivo: DataFrame de una fila}; los objetivos sin datos no aparecen.
+    """
+    import pandas as pd
+
+    if df.empty:
+        return {}
+    df = df.copy()
+    df['fecha_vigencia'] = pd.to_datetime(df['fecha_vigencia'], errors='coerce')
+    claves = claves_normalizadas(df)
+    df['_clave'] = list(claves)
+    vigentes = (df.sort_values('fecha_vigencia', ascending=False, na_position='last')
+                  .groupby('_clave', sort=False)
+                  .head(1))
+    por_clave = {clave: vigentes.loc[[idx]].drop(columns='_clave')
+                 for idx, clave in zip(vigentes.index, vigentes['_clave'])}
+    return {o: por_clave[o.clave] for o in objetivos if o.clave in por_clave}
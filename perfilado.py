@@ -0,0 +1,358 @@
+"""
+perfilado.py
+============
+Perfilado opcional de nafta_tracker.main() y usd_sync.sincronizar_usd(), y
+comparación contra una línea base para detectar regresiones.
+
+Se activa con el argumento `perfil` de esas funciones o con la variable de
+entorno NAFTA_PERFIL:
+  - cprofile   determinista (cProfile): cada llamada, con su sobrecosto
+  - muestreo   cada INTERVALO_MUESTREO segundos se toma la pila de todos los
+               hilos (también la precarga del A3500 y el envío, que corren en
+               hilos aparte); casi sin sobrecosto, apto para el runner
+cProfile solo ve el hilo que abrió el perfil: lo que corre en otros hilos
+(la precarga del A3500 de main()) queda afuera de sus rutas críticas.
+
+Cada corrida perfilada deja en data/perfiles/:
+  <corrida>_<nombre>.json     tiempo propio y acumulado por función
+  <corrida>_<nombre>.prof     (cprofile) para pstats / snakeviz
+  <corrida>_<nombre>.folded   (muestreo) pilas colapsadas para un flamegraph
+  ultimo_<nombre>.json        copia del último resumen
+Se conservan las últimas CONSERVAR corridas de cada nombre. Si main() ya está
+perfilando, el sincronizar_usd() que llama no abre otro perfil.
+
+`comparar` acepta un resumen de perfil o un JSON de benchmarks/bench.py y
+falla (código 1) si algo se volvió más lento que la base en más de `umbral`
+(relativo) y `minimo` segundos (absoluto, para no saltar por ruido). En un
+perfil se comparan solo las RUTAS_CPU (lectura y filtro del dataset, filtro
+de objetivos, histórico, conversión a USD): el total y el A3500 dependen de
+la red y del servidor. En un benchmark, cada etapa de cada tamaño.
+
+Una corrida con el dataset nuevo lee y filtra todo el CSV nacional; con un
+304 o el mismo hash usa las filas ya filtradas. Por eso main() anota en el
+perfil `dataset` ("nuevo" o "sin_cambio") y la base es una por tipo
+(data/perfiles/base/main_nuevo.json, main_sin_cambio.json).
+
+Uso:
+  NAFTA_PERFIL=muestreo python nafta_tracker.py
+  python perfilado.py resumen data/perfiles/ultimo_main.json --top 25
+  python perfilado.py fijar-base data/perfiles/ultimo_main.json [--si-falta]
+  python perfilado.py comparar data/perfiles/ultimo_main.json    (contra la base de su tipo)
+  python perfilado.py comparar bench.json benchmarks/base.json --umbral 0.3
+"""
+
+import argparse
+import cProfile
+import glob
+import json
+import os
+import platform
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import metricas
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA     = "data"
+DIR_PERFILES = os.path.join(DIR_DATA, "perfiles")
+DIR_BASE     = os.path.join(DIR_PERFILES, "base")
+
+VARIABLE_ENTORNO   = "NAFTA_PERFIL"
+MODOS              = ("cprofile", "muestreo")
+INTERVALO_MUESTREO = 0.005   # segundos
+CONSERVAR          = 20
+MAX_FUNCIONES      = 400
+
+UMBRAL = 0.25    # +25 %
+MINIMO = 0.05    # segundos
+
+# Nombre → funciones "archivo.py:funcion" (se suman todas las coincidencias, sin importar la línea).
+# El read_csv por bloques del dataset nacional corre en cada next() del TextFileReader.
+RUTAS_CRITICAS = {
+    "lectura_dataset":  ("nafta_tracker.py:leer_dataset_por_chunks", "readers.py:__next__"),
+    "filtrar_descarga": ("nafta_tracker.py:filtrar_descarga",),
+    "filtro_objetivos": ("objetivos.py:filtrar_objetivos",),
+    "historico":        ("nafta_tracker.py:procesar_objetivo",),
+    "a3500":            ("usd_sync.py:obtener_dolar_a3500",),
+    "conversion_usd":   ("usd_sync.py:convertir_a_usd",),
+    "usd_sync":         ("usd_sync.py:_sincronizar_usd",),
+}
+# Las que se comparan contra la base: sin red (el A3500 y usd_sync pueden ir a buscar la cotización)
+RUTAS_CPU = ("lectura_dataset", "filtrar_descarga", "filtro_objetivos", "historico", "conversion_usd")
+
+_activo = threading.local()
+
+
+# ── PERFILADORES ──────────────────────────────────────────────────────────────
+def modo_pedido(modo: str | None = None) -> str | None:
+    """El modo indicado o el de NAFTA_PERFIL; None si no hay que perfilar."""
+    modo = (modo or os.environ.get(VARIABLE_ENTORNO, "")).strip().lower()
+    if not modo or modo in ("0", "no"):
+        return None
+    if modo not in MODOS:
+        raise ValueError(f"{VARIABLE_ENTORNO} debe ser uno de {MODOS}, no {modo!r}")
+    return modo
+
+
+def _nombre_funcion(archivo: str, linea: int, funcion: str) -> str:
+    return f"{os.path.basename(archivo)}:{linea}({funcion})"
+
+
+class Muestreador:
+    """Perfilador por muestreo: un hilo que cada `intervalo` segundos copia la pila de todos los demás."""
+
+    def __init__(self, intervalo: float = INTERVALO_MUESTREO):
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.acumulado = Counter()   # muestras en las que la función estaba en alguna pila
+        self.muestras = 0
+        self._fin = threading.Event()
+        self._muestreador = threading.Thread(target=self._correr, name="muestreador", daemon=True)
+
+    def _correr(self) -> None:
+        propio = threading.get_ident()
+        while not self._fin.wait(self.intervalo):
+            en_pila = set()
+            for hilo, frame in sys._current_frames().items():
+                if hilo == propio:
+                    continue
+                pila = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pila.append(_nombre_funcion(codigo.co_filename, codigo.co_firstlineno, codigo.co_name))
+                    frame = frame.f_back
+                if pila:
+                    self.pilas[tuple(reversed(pila))] += 1
+                    en_pila.update(pila)
+            self.muestras += 1
+            # Una función activa en dos hilos a la vez cuenta una sola vez por muestra
+            self.acumulado.update(en_pila)
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        self._muestreador.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._muestreador.join()
+        self.segundos = time.perf_counter() - self._t0
+        return False
+
+    def funciones(self) -> list:
+        """
+        Tiempo propio (la función está arriba de la pila) y acumulado (está en
+        alguna pila), estimados. El propio se suma entre hilos.
+        """
+        propio = Counter()
+        for pila, n in self.pilas.items():
+            propio[pila[-1]] += n
+        # Cada espera dura algo más que `intervalo`: se reparte el tiempo real entre las muestras
+        por_muestra = self.segundos / max(self.muestras, 1)
+        return [{"funcion": f, "muestras": n, "propio": round(propio[f] * por_muestra, 4),
+                 "acumulado": round(n * por_muestra, 4)} for f, n in self.acumulado.items()]
+
+    def guardar_pilas(self, ruta: str) -> None:
+        with open(ruta, "w", encoding="utf-8") as f:
+            for pila, n in self.pilas.most_common():
+                f.write(";".join(pila) + f" {n}\n")
+
+
+def _funciones_cprofile(perfil: cProfile.Profile) -> list:
+    stats = pstats.Stats(perfil).stats
+    return [{"funcion": _nombre_funcion(archivo, linea, funcion), "llamadas": llamadas,
+             "propio": round(propio, 4), "acumulado": round(acumulado, 4)}
+            for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in stats.items()]
+
+
+@contextmanager
+def perfilar(nombre: str, modo: str | None = None, directorio: str = DIR_PERFILES):
+    """
+    Perfila el bloque si `modo` (o NAFTA_PERFIL) lo pide y guarda el resultado
+    en `directorio`. Dentro de otro perfil no hace nada.
+    """
+    modo = modo_pedido(modo)
+    if modo is None or getattr(_activo, "nombre", None):
+        yield None
+        return
+    _activo.nombre = nombre
+    _activo.anotaciones = {}
+    inicio = time.perf_counter()
+    perfilador = cProfile.Profile() if modo == "cprofile" else Muestreador()
+    try:
+        if modo == "cprofile":
+            perfilador.enable()
+        else:
+            perfilador.__enter__()
+        yield perfilador
+    finally:
+        if modo == "cprofile":
+            perfilador.disable()
+        else:
+            perfilador.__exit__(None, None, None)
+        _activo.nombre = None
+        try:
+            guardar_perfil(nombre, modo, perfilador, time.perf_counter() - inicio, directorio,
+                           _activo.anotaciones)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el perfil {nombre}: {e}")
+
+
+def anotar(**datos) -> None:
+    """Agrega datos de la corrida (p. ej. dataset="nuevo") al resumen del perfil abierto, si hay uno."""
+    if getattr(_activo, "nombre", None):
+        _activo.anotaciones.update(datos)
+
+
+def guardar_perfil(nombre: str, modo: str, perfilador, segundos: float, directorio: str = DIR_PERFILES,
+                   anotaciones: dict | None = None) -> str:
+    """Escribe el resumen (y el perfil crudo) de una corrida. Devuelve la ruta del resumen."""
+    os.makedirs(directorio, exist_ok=True)
+    prefijo = os.path.join(directorio, f"{metricas.ID_CORRIDA}_{nombre}")
+    if modo == "cprofile":
+        funciones = _funciones_cprofile(perfilador)
+        perfilador.dump_stats(prefijo + ".prof")
+    else:
+        funciones = perfilador.funciones()
+        perfilador.guardar_pilas(prefijo + ".folded")
+    funciones.sort(key=lambda f: f["acumulado"], reverse=True)
+    resumen = {
+        "nombre": nombre,
+        "modo": modo,
+        "corrida": metricas.ID_CORRIDA,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "segundos": round(segundos, 4),
+        **(anotaciones or {}),
+        "rutas": {ruta: round(sum(tiempo_de(funciones, p) for p in patrones), 4)
+                  for ruta, patrones in RUTAS_CRITICAS.items()},
+        "funciones": funciones[:MAX_FUNCIONES],
+    }
+    with open(prefijo + ".json", "w", encoding="utf-8") as f:
+        json.dump(resumen, f, indent=1, ensure_ascii=False)
+    shutil.copy(prefijo + ".json", os.path.join(directorio, f"ultimo_{nombre}.json"))
+
+    corridas = sorted(glob.glob(os.path.join(directorio, f"*_{nombre}.json")))
+    corridas = [c for c in corridas if not os.path.basename(c).startswith("ultimo_")]
+    for vieja in corridas[:-CONSERVAR]:
+        for ruta in glob.glob(vieja[:-len(".json")] + ".*"):
+            os.remove(ruta)
+    print(f"🔬 Perfil {nombre} ({modo}, {segundos:.1f} s): {prefijo}.json")
+    return prefijo + ".json"
+
+
+_FUNCION = re.compile(r"^(?P<archivo>.*):\d+\((?P<funcion>.*)\)$")
+
+
+def tiempo_de(funciones: list, patron: str) -> float:
+    """Tiempo acumulado de las funciones que coinciden con "archivo.py:funcion"."""
+    archivo, funcion = patron.split(":", 1)
+    total = 0.0
+    for f in funciones:
+        m = _FUNCION.match(f["funcion"])
+        if m and m["archivo"] == archivo and m["funcion"] == funcion:
+            total += f["acumulado"]
+    return total
+
+
+# ── COMPARACIÓN ───────────────────────────────────────────────────────────────
+def _leer(ruta: str) -> dict:
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def mediciones(datos: dict) -> dict:
+    """{nombre: segundos} comparables de un resumen de perfil o de un JSON de bench.py."""
+    if "resultados" in datos:
+        return {f"{r['etapa']}@{r.get('filas') or '-'}": r["segundos"]
+                for r in datos["resultados"] if r.get("segundos") is not None}
+    if "funciones" in datos:
+        rutas = datos.get("rutas", {})
+        return {r: rutas[r] for r in RUTAS_CPU if r in rutas}
+    raise ValueError("no es un perfil de perfilado.py ni un resultado de bench.py")
+
+
+def comparar(actual: dict, base: dict, umbral: float = UMBRAL, minimo: float = MINIMO) -> list:
+    """Filas (nombre, base, actual, variación, regresión) de lo medido en los dos."""
+    antes, ahora = mediciones(base), mediciones(actual)
+    filas = []
+    for nombre in [n for n in ahora if n in antes]:
+        b, a = antes[nombre], ahora[nombre]
+        variacion = (a - b) / b if b > 0 else None
+        regresion = a - b >= minimo and (b <= 0 or a > b * (1 + umbral))
+        filas.append((nombre, b, a, variacion, regresion))
+    return filas
+
+
+def ruta_base(actual: str, datos: dict) -> str:
+    """Base del mismo nombre y, si el perfil lo anota, del mismo tipo de dataset."""
+    nombre = datos.get("nombre") or os.path.splitext(os.path.basename(actual))[0]
+    if datos.get("dataset"):
+        nombre = f"{nombre}_{datos['dataset']}"
+    return os.path.join(DIR_BASE, f"{nombre}.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfiles de las corridas y regresiones contra una base.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("resumen", help="funciones más costosas de un perfil")
+    p.add_argument("perfil")
+    p.add_argument("--top", type=int, default=25)
+    p.add_argument("--propio", action="store_true", help="ordenar por tiempo propio")
+    p = sub.add_parser("fijar-base", help="guardar un perfil o benchmark como línea base")
+    p.add_argument("actual")
+    p.add_argument("--base", help=f"destino (por defecto {DIR_BASE}/<nombre>[_<dataset>].json)")
+    p.add_argument("--si-falta", action="store_true", help="no pisar una base existente")
+    p = sub.add_parser("comparar", help="falla si algo es más lento que la base")
+    p.add_argument("actual")
+    p.add_argument("base", nargs="?", help=f"por defecto {DIR_BASE}/<nombre>[_<dataset>].json")
+    p.add_argument("--umbral", type=float, default=UMBRAL, help="aumento relativo tolerado (0.25 = 25 %%)")
+    p.add_argument("--minimo", type=float, default=MINIMO, help="aumento absoluto mínimo en segundos")
+    args = parser.parse_args()
+
+    datos = _leer(args.actual if args.comando != "resumen" else args.perfil)
+    if args.comando == "resumen":
+        clave = "propio" if args.propio else "acumulado"
+        print(f"🔬 {datos['nombre']} ({datos['modo']}, corrida {datos['corrida']}): {datos['segundos']:.2f} s")
+        for ruta, segundos in datos.get("rutas", {}).items():
+            print(f"   {ruta:<18} {segundos:>9.3f} s")
+        print(f"\n   {'acumulado':>10} {'propio':>10}  función")
+        for f in sorted(datos["funciones"], key=lambda f: f[clave], reverse=True)[:args.top]:
+            print(f"   {f['acumulado']:>10.3f} {f['propio']:>10.3f}  {f['funcion']}")
+    elif args.comando == "fijar-base":
+        destino = args.base or ruta_base(args.actual, datos)
+        if args.si_falta and os.path.exists(destino):
+            print(f"ℹ️ Ya hay base en {destino}")
+            raise SystemExit(0)
+        os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+        shutil.copy(args.actual, destino)
+        print(f"📌 Base: {destino}")
+    else:
+        base = args.base or ruta_base(args.actual, datos)
+        if not os.path.exists(base):
+            print(f"ℹ️ No hay base en {base}: fijala con `python perfilado.py fijar-base {args.actual}`.")
+            raise SystemExit(0)
+        datos_base = _leer(base)
+        if datos.get("dataset") != datos_base.get("dataset"):
+            print(f"❌ La base es de otro tipo de corrida (dataset {datos_base.get('dataset')} vs "
+                  f"{datos.get('dataset')}): no se comparan.")
+            raise SystemExit(1)
+        if datos.get("modo") != datos_base.get("modo"):
+            print(f"⚠️ La base es de otro modo ({datos_base.get('modo')} vs {datos.get('modo')}): "
+                  "los tiempos no son comparables del todo.")
+        filas = comparar(datos, datos_base, args.umbral, args.minimo)
+        for nombre, b, a, variacion, regresion in filas:
+            texto = f"{variacion:+.0%}" if variacion is not None else "  n/d"
+            print(f"   {'❌' if regresion else '✅'} {nombre:<26} {b:>9.3f} s → {a:>9.3f} s  {texto:>6}")
+        regresiones = [f[0] for f in filas if f[4]]
+        if regresiones:
+            print(f"\n❌ {len(regresiones)} regresión(es) de más de {args.umbral:.0%} y {args.minimo} s "
+                  f"contra {base}: {', '.join(regresiones)}")
+            raise SystemExit(1)
+        print(f"\n✅ Sin regresiones contra {base} ({len(filas)} mediciones)")
@@ -0,0 +1,146 @@
+"""
+snapshot.py
+===========
+Snapshot columnar del dataset nacional de precios en surtidor.
+
+Después de cada descarga nueva el dataset se guarda ya parseado y tipado en
+data/cache/snapshot/, una columna por archivo .npy:
+  - texto  → códigos int32 + <columna>.categorias.json
+             (empresa, producto, provincia, empresabandera, ...)
+  - precio, latitud, longitud → float64 (decimal con coma ya resuelto)
+  - fecha_vigencia → datetime64[ns]
+
+Los consumidores cargan solo las columnas que necesitan con np.load(mmap_mode='r'):
+no se vuelve a parsear el CSV ni se copia la columna completa a memoria.
+
+Al guardar un snapshot de otro dataset, el vigente pasa a
+data/cache/snapshot_anterior/: cambios.py compara los dos para armar el
+changefeed nacional.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# ── RUTAS ─────────────────────────────────────────────────────────────────────
+DIR_DATA     = "data"
+DIR_SNAPSHOT = os.path.join(DIR_DATA, "cache", "snapshot")
+DIR_SNAPSHOT_ANTERIOR = DIR_SNAPSHOT + "_anterior"
+
+COLUMNAS_FLOAT = ['precio', 'latitud', 'longitud']
+COLUMNAS_FECHA = ['fecha_vigencia']
+
+
+def compactar_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Convierte un bloque leído como texto a tipos compactos (categorías, float, fecha)."""
+    out = {}
+    for col in chunk.columns:
+        serie = chunk[col]
+        if col in COLUMNAS_FLOAT:
+            out[col] = pd.to_numeric(serie.str.replace(',', '.', regex=False), errors='coerce')
+        elif col in COLUMNAS_FECHA:
+            out[col] = pd.to_datetime(serie, errors='coerce')
+        else:
+            out[col] = serie.str.strip().astype('category')
+    return pd.DataFrame(out, index=chunk.index)
+
+
+class ConstructorSnapshot:
+    """Acumula bloques compactados durante la misma pasada que filtra los objetivos."""
+
+    def __init__(self):
+        self.partes = []
+
+    def agregar(self, chunk: pd.DataFrame) -> None:
+        self.partes.append(compactar_chunk(chunk))
+
+    def construir(self) -> pd.DataFrame:
+        if not self.partes:
+            return pd.DataFrame()
+        columnas = {}
+        for col in self.partes[0].columns:
+            series = [p[col] for p in self.partes]
+            if isinstance(series[0].dtype, pd.CategoricalDtype):
+                columnas[col] = pd.Series(union_categoricals(series, ignore_order=True))
+            else:
+                columnas[col] = pd.concat(series, ignore_index=True)
+        return pd.DataFrame(columnas)
+
+    def guardar(self, sha256: str, directorio: str = DIR_SNAPSHOT) -> int:
+        df = self.construir()
+        guardar_snapshot(df, sha256, directorio)
+        return len(df)
+
+
+def guardar_snapshot(df: pd.DataFrame, sha256: str, directorio: str = DIR_SNAPSHOT) -> None:
+    """
+    Escribe el snapshot (una columna por .npy) de forma atómica. Si el que se
+    reemplaza es de otro dataset, se conserva en `<directorio>_anterior`.
+    """
+    tmp = directorio + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp, f"{col}.npy"), serie.cat.codes.to_numpy(dtype=np.int32))
+            with open(os.path.join(tmp, f"{col}.categorias.json"), "w", encoding="utf-8") as f:
+                json.dump([str(c) for c in serie.cat.categories], f, ensure_ascii=False)
+            columnas[col] = {"tipo": "categoria"}
+        elif col in COLUMNAS_FECHA:
+            np.save(os.path.join(tmp, f"{col}.npy"), serie.to_numpy(dtype="datetime64[ns]"))
+            columnas[col] = {"tipo": "fecha"}
+        else:
+            np.save(os.path.join(tmp, f"{col}.npy"), serie.to_numpy(dtype=np.float64))
+            columnas[col] = {"tipo": "float"}
+    meta = {
+        "sha256": sha256,
+        "filas": len(df),
+        "creado": datetime.now().isoformat(timespec="seconds"),
+        "columnas": columnas,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    previo = leer_meta_snapshot(directorio).get("sha256")
+    if previo and previo != sha256:
+        anterior = directorio + "_anterior"
+        shutil.rmtree(anterior, ignore_errors=True)
+        os.replace(directorio, anterior)
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.replace(tmp, directorio)
+
+
+def leer_meta_snapshot(directorio: str = DIR_SNAPSHOT) -> dict:
+    ruta = os.path.join(directorio, "meta.json")
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cargar_snapshot(columnas: list | None = None, directorio: str = DIR_SNAPSHOT) -> pd.DataFrame:
+    """
+    Carga el snapshot (solo `columnas` si se indican) mapeando los .npy en memoria.
+    Lanza FileNotFoundError si todavía no hay snapshot.
+    """
+    meta = leer_meta_snapshot(directorio)
+    if not meta:
+        raise FileNotFoundError(f"No hay snapshot en {directorio}")
+    nombres = columnas or list(meta["columnas"])
+    datos = {}
+    for col in nombres:
+        info = meta["columnas"][col]
+        arr = np.load(os.path.join(directorio, f"{col}.npy"), mmap_mode="r")
+        if info["tipo"] == "categoria":
+            with open(os.path.join(directorio, f"{col}.categorias.json"), encoding="utf-8") as f:
+                categorias = json.load(f)
+            datos[col] = pd.Categorical.from_codes(arr, categories=categorias, validate=False)
+        else:
+            datos[col] = arr
+    return pd.DataFrame(datos, copy=False)
@@ -0,0 +1,19 @@
+"""
+Configuración común de los tests: los módulos viven en la raíz del repo y
+usan rutas relativas ("data/..."), así que cada test corre en un directorio
+temporal propio.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def en_tmp(tmp_path, monkeypatch):
+    """Corre el test con tmp_path como directorio de trabajo."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+
+import archivo_diario
+from archivo_diario import archivar_tabla, reconstruir, tabla_vigente
+from snapshot import compactar_chunk
+
+
+def _tabla(precios: dict) -> pd.DataFrame:
+    """Tabla vigente normalizada con una fila por estación (idempresa -> precio)."""
+    filas = [{"idempresa": i, "idproducto": "2", "idtipohorario": "2", "empresa": f"EST {i}",
+              "provincia": "CORDOBA", "producto": "Nafta (súper) entre 92 y 95 Ron", "tipohorario": "Diurno",
+              "precio": p, "fecha_vigencia": "2026-10-01 08:00:00", "latitud": "-31,4", "longitud": ""}
+             for i, p in precios.items()]
+    return tabla_vigente(compactar_chunk(pd.DataFrame(filas, dtype=str)))
+
+
+DIAS = [
+    ("2026-10-01", {"1": "1500", "2": "1600", "3": "1700"}),
+    ("2026-10-02", {"1": "1500", "2": "1650", "4": "1800"}),   # cambio 2, baja 3, alta 4
+    ("2026-10-03", {"1": "1510", "2": "1650", "4": "1800"}),
+    ("2026-10-04", {"1": "1510", "2": "1650", "3": "1750", "4": "1800"}),
+    ("2026-10-05", {"1": "1520", "4": "1790"}),
+]
+
+
+def test_archivar_y_reconstruir_con_rebase(en_tmp, monkeypatch):
+    monkeypatch.setattr(archivo_diario, "REBASE_ENTRADAS", 3)
+    monkeypatch.setattr(archivo_diario, "REBASE_FRACCION", 10.0)
+    entradas = []
+    for n, (fecha, precios) in enumerate(DIAS):
+        if n == 2:
+            # Sin el estado en caché el delta se arma reconstruyendo la última entrada
+            os.remove(archivo_diario.ARCHIVO_ESTADO)
+        entradas.append(archivar_tabla(_tabla(precios), f"{n:064d}", fecha))
+
+    assert [e["tipo"] for e in entradas] == ["base", "delta", "delta", "base", "delta"]
+    assert (entradas[1]["altas"], entradas[1]["cambios"], entradas[1]["bajas"]) == (1, 1, 1)
+    assert (entradas[4]["altas"], entradas[4]["cambios"], entradas[4]["bajas"]) == (0, 2, 2)
+
+    for fecha, precios in DIAS:
+        pd.testing.assert_frame_equal(reconstruir(fecha=fecha), _tabla(precios), check_dtype=False)
+
+
+def test_mismo_dataset_no_se_archiva_dos_veces(en_tmp):
+    primera = archivar_tabla(_tabla(DIAS[0][1]), "a" * 64, DIAS[0][0])
+    assert archivar_tabla(_tabla(DIAS[0][1]), "a" * 64, DIAS[1][0]) == primera
+    assert len(archivo_diario.leer_indice()["entradas"]) == 1
@@ -0,0 +1,39 @@
+import csv
+import os
+
+import pytest
+
+import base_sqlite
+from configuracion import ARCHIVO_HISTORICO
+
+CABECERA = ["idempresa", "idproducto", "idtipohorario", "precio", "fecha_vigencia", "%_variacion", "fecha_chequeo"]
+FILAS = [["1519", "2", "2", "1500", "2026-10-15 08:00:00", "0.0", "2026-10-15"],
+         ["1519", "2", "2", "1500", "2026-10-15 08:00:00", "0.0", "2026-10-16"],
+         # El precio cambió en el día: dos filas con la misma fecha_chequeo
+         ["1519", "2", "2", "1550", "2026-10-16 15:00:00", "3.33", "2026-10-16"]]
+
+
+def _leer(ruta):
+    with open(ruta, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_exportar_conserva_todas_las_filas(en_tmp):
+    (en_tmp / "data").mkdir()
+    with open(ARCHIVO_HISTORICO, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, lineterminator="\r\n").writerows([CABECERA] + FILAS)
+    base = str(en_tmp / "nafta.sqlite")
+
+    assert base_sqlite.sincronizar([ARCHIVO_HISTORICO], tc=False, ruta=base) == {ARCHIVO_HISTORICO: 3}
+    con = base_sqlite.conectar(base)
+    assert base_sqlite.precio_en(con, "1519", "2026-10-16")["precio"] == 1550
+    con.close()
+
+    escritas = base_sqlite.exportar("exportado", base)
+    assert escritas == [os.path.join("exportado", ARCHIVO_HISTORICO)]
+    assert _leer(escritas[0]) == [CABECERA] + FILAS
+
+
+def test_exportar_no_pisa_los_originales(en_tmp):
+    with pytest.raises(ValueError):
+        base_sqlite.exportar(".", str(en_tmp / "nafta.sqlite"))
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from cambios import calcular_cambios, marcar_alertado
+from nafta_tracker import alertas_del_changefeed
+from objetivos import Objetivo
+from snapshot import compactar_chunk, guardar_snapshot
+
+
+def _dataset(precios: dict) -> pd.DataFrame:
+    """Snapshot compacto con una fila por estación (idempresa -> precio)."""
+    filas = [{"idempresa": i, "idproducto": "2", "idtipohorario": "2", "empresa": f"EST {i}",
+              "empresabandera": "YPF", "provincia": "CORDOBA", "localidad": "CORDOBA",
+              "producto": "Nafta (súper) entre 92 y 95 Ron", "tipohorario": "Diurno",
+              "precio": p, "fecha_vigencia": "2026-10-01 08:00:00"} for i, p in precios.items()]
+    return compactar_chunk(pd.DataFrame(filas, dtype=str))
+
+
+def test_altas_bajas_y_cambios():
+    cambios = calcular_cambios(_dataset({"1": "1500", "2": "1600", "3": "1700"}),
+                               _dataset({"1": "1500", "2": "1650", "4": "1800"}))
+    tipos = dict(zip(cambios["idempresa"].astype(str), cambios["tipo"]))
+    assert tipos == {"2": "cambio", "3": "baja", "4": "alta"}
+
+
+def test_mismo_dataset_no_repite_alertas(en_tmp):
+    objetivo = Objetivo("2", "Nafta (súper) entre 92 y 95 Ron", "Diurno", "Súper", "data/historicos/x.csv")
+    guardar_snapshot(_dataset({"1": "1500", "2": "1600"}), "a" * 64)
+    guardar_snapshot(_dataset({"1": "1500", "2": "1650"}), "b" * 64)
+    descarga = SimpleNamespace(sha256="b" * 64)
+
+    alertas = alertas_del_changefeed(descarga, [objetivo])
+    assert alertas[objetivo]["precio"] == 1650
+    marcar_alertado(descarga.sha256)
+
+    # Otra corrida sobre el mismo hash (304): el changefeed se reutiliza, sin alertas
+    assert alertas_del_changefeed(descarga, [objetivo]) == {}
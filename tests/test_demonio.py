@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+import demonio
+from configuracion import OBJETIVO_PRINCIPAL
+
+
+def _residente(monkeypatch, datasets):
+    """Residente con red, filtrado y corrida reemplazados; `datasets` es [(sha256, precio)] por sondeo."""
+    corridas = []
+    sondeos = iter(datasets)
+    actual = {}
+
+    def descargar():
+        actual["sha"], actual["precio"] = next(sondeos)
+        return SimpleNamespace(sha256=actual["sha"])
+
+    def filtrar(descarga, objetivos):
+        return pd.DataFrame([{"idempresa": OBJETIVO_PRINCIPAL.idempresa, "producto": OBJETIVO_PRINCIPAL.producto,
+                              "tipohorario": OBJETIVO_PRINCIPAL.tipohorario, "precio": actual["precio"],
+                              "fecha_vigencia": "2026-10-01 08:00:00"}])
+
+    monkeypatch.setattr(demonio, "descargar_dataset", descargar)
+    monkeypatch.setattr(demonio, "filtrar_descarga", filtrar)
+    monkeypatch.setattr(demonio, "main", lambda **kw: corridas.append(kw["descarga"].sha256))
+    monkeypatch.setattr(demonio, "nueva_corrida", lambda: None)
+    for nombre in ("generar_changefeed", "generar_agregados", "generar_calidad", "generar_archivo"):
+        monkeypatch.setattr(demonio, nombre, lambda descarga: None)
+    monkeypatch.setattr(demonio.Residente, "_tabla_tc", lambda self: None)
+    return demonio.Residente(corte=24), corridas
+
+
+def test_cambio_de_precio_en_el_dia_vuelve_a_correr(en_tmp, monkeypatch):
+    residente, corridas = _residente(monkeypatch, [("a", 1500.0), ("a", 1500.0), ("b", 1500.0), ("c", 1550.0)])
+    assert residente.sondear()        # primera corrida del día
+    assert not residente.sondear()    # 304: mismo dataset
+    assert not residente.sondear()    # dataset nuevo, mismos precios de los objetivos
+    assert residente.sondear()        # el precio del objetivo cambió a la tarde
+    assert corridas == ["a", "c"]
@@ -0,0 +1,22 @@
+import metricas
+
+
+def test_recortar_deja_las_ultimas_corridas(en_tmp, monkeypatch):
+    for corrida in ("c1", "c2", "c3"):
+        monkeypatch.setattr(metricas, "ID_CORRIDA", corrida)
+        metricas.registrar("descarga", 1.0)
+        metricas.registrar("filtro", 0.5)
+
+    assert metricas.recortar(2) == 2
+    assert [r["corrida"] for r in metricas.leer_metricas()] == ["c2", "c2", "c3", "c3"]
+    assert metricas.recortar(2) == 0
+
+
+def test_usar_archivo_no_toca_el_versionado(en_tmp, monkeypatch):
+    versionado = metricas.ARCHIVO_METRICAS
+    monkeypatch.setattr(metricas, "ARCHIVO_METRICAS", versionado)   # se restaura al terminar
+    metricas.usar_archivo("data/cache/metricas_api.jsonl")
+    metricas.registrar("api_recarga", 0.01)
+
+    assert not (en_tmp / versionado).exists()
+    assert [r["etapa"] for r in metricas.leer_metricas()] == ["api_recarga"]
@@ -0,0 +1,53 @@
+import csv
+import os
+
+import normalizado
+from configuracion import ARCHIVO_HISTORICO
+from normalizado import ARCHIVO_CURSORES, ARCHIVO_HECHOS, ARCHIVO_USD
+
+CABECERA = ["indice_tiempo", "idempresa", "empresa", "precio", "fecha_vigencia", "%_variacion", "fecha_chequeo"]
+FILAS = [["2026-10", "1519", "GAS IMPULSO", "1500", "2026-10-15 08:00:00", "0.0", "2026-10-15"],
+         ["2026-10", "1519", "GAS IMPULSO", "1500", "2026-10-15 08:00:00", "0.0", "2026-10-16"],
+         ["2026-10", "1519", "GAS IMPULSO", "1550", "2026-10-16 15:00:00", "3.33", "2026-10-16"]]
+USD = ["1.05", "1.05", "1.08"]
+
+
+def _escribir(filas, usd):
+    normalizado.escribir_csv(ARCHIVO_HISTORICO, CABECERA, filas)
+    normalizado.escribir_csv(ARCHIVO_USD, CABECERA + ["price_usd"], [f + [u] for f, u in zip(filas, usd)])
+
+
+def _leer(ruta):
+    with open(ruta, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_vistas_regeneradas_desde_las_tablas(en_tmp):
+    _escribir(FILAS, USD)
+    assert normalizado.sincronizar() == {ARCHIVO_HISTORICO: 3, ARCHIVO_USD: 3}
+
+    # Checkout nuevo: sin CSV anchos ni cursores, solo data/normalizado/
+    for ruta in (ARCHIVO_HISTORICO, ARCHIVO_USD, ARCHIVO_CURSORES):
+        os.remove(ruta)
+    assert normalizado.regenerar_vistas(si_faltan=True) == [ARCHIVO_HISTORICO, ARCHIVO_USD]
+    assert _leer(ARCHIVO_HISTORICO) == [CABECERA] + FILAS
+    assert _leer(ARCHIVO_USD)[-1] == FILAS[-1] + ["1.08"]
+    assert normalizado.regenerar_vistas(si_faltan=True) == []
+
+
+def test_filas_nuevas_se_agregan_al_final(en_tmp):
+    _escribir(FILAS, USD)
+    normalizado.sincronizar()
+    with open(ARCHIVO_HECHOS, "rb") as f:
+        antes = f.read()
+
+    nueva = ["2026-10", "1519", "GAS IMPULSO", "1600", "2026-10-17 08:00:00", "3.23", "2026-10-17"]
+    _escribir(FILAS + [nueva], USD + ["1.10"])
+    os.remove(ARCHIVO_CURSORES)   # sin cursor se relee todo, pero solo se agrega lo nuevo
+    assert normalizado.sincronizar()[ARCHIVO_HISTORICO] == 1
+
+    with open(ARCHIVO_HECHOS, "rb") as f:
+        despues = f.read()
+    assert despues.startswith(antes)
+    assert despues[len(antes):].decode("utf-8").strip().endswith("1600,3.23,2026-10-17,1.10")
+    assert normalizado.verificar() == []
@@ -0,0 +1,40 @@
+import itertools
+from types import SimpleNamespace
+
+import notificaciones as nt
+
+
+def _drenar(monkeypatch, fallas):
+    """Drena el outbox por X con un envío que falla según `fallas` (id -> excepción)."""
+    enviados = []
+
+    def enviar(canal, reporte):
+        if reporte["texto_principal"] in fallas:
+            raise fallas[reporte["texto_principal"]]
+        enviados.append(reporte["texto_principal"])
+
+    monkeypatch.setattr(nt, "_enviar_canal", enviar)
+    monkeypatch.setattr(nt, "_x_configurado", lambda: True)
+    monkeypatch.setattr(nt.time, "sleep", lambda s: None)
+    # Ids crecientes aunque se encolen en el mismo segundo
+    contador = itertools.count()
+    monkeypatch.setattr(nt.uuid, "uuid4", lambda: SimpleNamespace(hex=f"{next(contador):08d}"))
+    for texto in ("uno", "dos", "tres"):
+        nt.encolar_reporte(texto, canales=("x",))
+    quedan = nt.drenar_outbox()
+    return enviados, quedan
+
+
+def test_rechazado_no_frena_la_cola(en_tmp, monkeypatch):
+    enviados, quedan = _drenar(monkeypatch, {"uno": nt.Rechazado("X: 403 Forbidden")})
+    assert enviados == ["dos", "tres"]
+    assert quedan == 0
+
+
+def test_error_de_red_frena_la_cola(en_tmp, monkeypatch):
+    enviados, quedan = _drenar(monkeypatch, {"dos": ConnectionError("sin red")})
+    assert enviados == ["uno"]
+    assert quedan == 2
+    estados = {r["texto_principal"]: r["canales"]["x"] for r in nt.pendientes()}
+    assert estados["dos"]["intentos"] == nt.MAX_INTENTOS
+    assert estados["tres"]["estado"] == "pendiente"
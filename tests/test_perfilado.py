@@ -0,0 +1,43 @@
+import json
+import os
+import threading
+import time
+
+from perfilado import DIR_BASE, Muestreador, anotar, comparar, perfilar, ruta_base, tiempo_de
+
+
+def _trabajo_en_otro_hilo():
+    time.sleep(0.3)
+
+
+def test_muestreo_ve_los_otros_hilos():
+    with Muestreador(intervalo=0.005) as muestreador:
+        hilo = threading.Thread(target=_trabajo_en_otro_hilo)
+        hilo.start()
+        hilo.join()
+    funciones = muestreador.funciones()
+    assert tiempo_de(funciones, "test_perfilado.py:_trabajo_en_otro_hilo") > 0.15
+    # El acumulado no pasa del tiempo real aunque la función esté en dos pilas (hilo principal y worker)
+    assert max(f["acumulado"] for f in funciones) <= round(muestreador.segundos, 4)
+
+
+def test_comparar_solo_rutas_de_cpu():
+    base = {"funciones": [], "segundos": 10.0,
+            "rutas": {"a3500": 1.0, "historico": 2.0, "lectura_dataset": 1.0}}
+    # El total y el A3500 (red) empeoran mucho: no cuentan; la lectura del dataset sí
+    actual = {"funciones": [], "segundos": 30.0,
+              "rutas": {"a3500": 9.0, "historico": 2.01, "lectura_dataset": 2.0}}
+    filas = comparar(actual, base)
+    assert {nombre for nombre, *_ in filas} == {"historico", "lectura_dataset"}
+    assert {nombre for nombre, *_, regresion in filas if regresion} == {"lectura_dataset"}
+
+
+def test_base_por_tipo_de_dataset(en_tmp):
+    with perfilar("main", "muestreo", directorio="perfiles"):
+        anotar(dataset="sin_cambio")
+    with open(os.path.join("perfiles", "ultimo_main.json"), encoding="utf-8") as f:
+        datos = json.load(f)
+    assert datos["dataset"] == "sin_cambio"
+    assert ruta_base("ultimo_main.json", datos) == os.path.join(DIR_BASE, "main_sin_cambio.json")
+    # Sin perfil abierto, anotar no hace nada
+    anotar(dataset="nuevo")
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from agregados import TODAS, contexto_provincial
+from espacial import IndiceEspacial, contexto_competencia
+from nafta_tracker import texto_comparativa
+from notificaciones import LIMITE_X, armar_respuesta, largo_x
+
+
+def _peor_caso():
+    """Las tres piezas de la respuesta mensual con los valores más largos posibles."""
+    mensual = texto_comparativa(-1_234_567.89, 9_876_543.21, 30)
+
+    ids = np.array(["1", "2"], dtype=object)
+    indice = IndiceEspacial(ids, np.array([-34.6, -34.61]), np.array([-58.4, -58.41]))
+    precios = pd.DataFrame({"precio": [9_999_999.99, 1_111_111.11],
+                            "empresa": ["X" * 40, "ESTACION DE SERVICIO CON NOMBRE LARGUISIMO"]},
+                           index=pd.Index(ids, name="idempresa"))
+    competencia = contexto_competencia(indice, precios, "1")
+
+    bandera = "SHELL C.A.P.S.A. Y OTRAS BANDERAS"
+    grupo = {"provincia": "TIERRA DEL FUEGO, ANTARTIDA E ISLAS DEL ATLANTICO SUR",
+             "producto": "Nafta (premium) de más de 95 Ron", "tipohorario": "Diurno"}
+    tabla = pd.DataFrame([{**grupo, "empresabandera": TODAS, "estaciones": 50, "mediana": 1_000_000.0},
+                          {**grupo, "empresabandera": bandera, "estaciones": 9, "mediana": 8_888_888.88}])
+    registro = pd.Series({**grupo, "empresabandera": bandera, "precio": 9_999_999.99})
+    provincial = contexto_provincial(tabla, registro)
+    return mensual, competencia, provincial
+
+
+def test_largo_x_cuenta_emojis_doble():
+    assert largo_x("abc") == 3
+    assert largo_x("ñá — –") == 6
+    assert largo_x("⛽🔺") == 4
+    assert largo_x("⚠️") == 2
+
+
+def test_peor_caso_no_pasa_el_limite():
+    mensual, competencia, provincial = _peor_caso()
+    assert competencia and provincial
+    assert largo_x("\n\n".join((mensual, competencia, provincial))) > LIMITE_X
+
+    texto = armar_respuesta(mensual, competencia, provincial)
+    assert largo_x(texto) <= LIMITE_X
+    assert texto.startswith(mensual)
+
+
+def test_lo_opcional_entra_si_hay_lugar():
+    assert armar_respuesta("📊 base", "🏁 extra", "📍 otra") == "📊 base\n\n🏁 extra\n\n📍 otra"
+    assert armar_respuesta("", "🏁 extra", "") == "🏁 extra"
+    assert armar_respuesta("a" * 270, "b" * 20, "c" * 5) == "a" * 270 + "\n\n" + "c" * 5
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+import usd_sync
+from descargas import leer_meta
+
+HOY = pd.Timestamp.now().normalize()
+VIEJA = HOY - pd.Timedelta(days=120)
+
+
+def _serie(desde, fuente):
+    fechas = pd.bdate_range(desde, HOY)
+    return pd.DataFrame({"fecha": fechas, "tc_vendedor": 1400.0, "fuente": fuente})
+
+
+def _matba_ventana_corta(desde=None):
+    return _serie(HOY - pd.Timedelta(days=20), "matbarofex")
+
+
+def test_ventana_corta_no_marca_como_cubierto_lo_anterior(en_tmp, monkeypatch):
+    def xls_caido(desde=None):
+        raise ConnectionError("sin XLS")
+
+    monkeypatch.setattr(usd_sync, "descargar_dolar_a3500", _matba_ventana_corta)
+    monkeypatch.setattr(usd_sync, "descargar_dolar_xls", xls_caido)
+    usd_sync.obtener_dolar_a3500([VIEJA, HOY])
+
+    meta = leer_meta(usd_sync.ARCHIVO_TC)
+    assert pd.Timestamp(meta["consultado_desde"]) == _matba_ventana_corta()["fecha"].min()
+    assert usd_sync.fechas_sin_cubrir([VIEJA, HOY], meta) == [VIEJA]
+
+
+def test_lo_anterior_a_matba_sale_del_xls(en_tmp, monkeypatch):
+    monkeypatch.setattr(usd_sync, "descargar_dolar_a3500", _matba_ventana_corta)
+    monkeypatch.setattr(usd_sync, "descargar_dolar_xls", lambda desde=None: _serie(desde, "x")[["fecha", "tc_vendedor"]])
+    df_tc = usd_sync.obtener_dolar_a3500([VIEJA, HOY])
+
+    meta = leer_meta(usd_sync.ARCHIVO_TC)
+    assert usd_sync.fechas_sin_cubrir([VIEJA, HOY], meta) == []
+    assert df_tc["fecha"].min() <= VIEJA + pd.Timedelta(days=3)
+    assert set(df_tc.loc[df_tc["fecha"] >= _matba_ventana_corta()["fecha"].min(), "fuente"]) == {"matbarofex"}
+
+
+@pytest.mark.filterwarnings("error::FutureWarning")
+def test_primera_creacion_del_csv_usd_sin_warnings(en_tmp, monkeypatch):
+    (en_tmp / "data").mkdir()
+    dias = pd.bdate_range(end=HOY, periods=3)
+    pd.DataFrame({"idempresa": "1519", "precio": [1500.0, 1510.0, 1520.0],
+                  "fecha_vigencia": "2026-10-01 08:00:00", "%_variacion": 0.0,
+                  "fecha_chequeo": dias.strftime("%Y-%m-%d")}).to_csv(usd_sync.ARCHIVO_PRECIOS, index=False)
+    df_tc = _serie(HOY - pd.Timedelta(days=30), "bcra_xls")
+
+    usd_sync.sincronizar_usd(df_tc=df_tc)
+    assert len(pd.read_csv(usd_sync.ARCHIVO_USD)) == 3
+
+
+def test_backfill_sin_tc_conserva_el_valor_de_cada_fila_del_dia(en_tmp, monkeypatch):
+    (en_tmp / "data").mkdir()
+    # El precio cambió en el día: dos filas con la misma fecha_chequeo y distinto price_usd
+    precios = pd.DataFrame({"idempresa": "1519", "precio": [1500.0, 1500.0, 1550.0],
+                            "fecha_vigencia": "2026-10-15 08:00:00", "%_variacion": 0.0,
+                            "fecha_chequeo": ["2026-10-15", "2026-10-16", "2026-10-16"]})
+    precios.to_csv(usd_sync.ARCHIVO_PRECIOS, index=False)
+    precios.assign(price_usd=[1.0, 1.05, 1.08]).to_csv(usd_sync.ARCHIVO_USD, index=False)
+    monkeypatch.setattr(usd_sync, "actualizar_analitica_usd", lambda df: None)
+
+    # No hay TC en o antes de esas fechas: todo sale de los valores previos
+    df_tc = pd.DataFrame({"fecha": pd.to_datetime(["2026-10-19"]), "tc_vendedor": 1400.0})
+    usd_sync.sincronizar_usd(backfill=True, df_tc=df_tc)
+    assert pd.read_csv(usd_sync.ARCHIVO_USD)["price_usd"].tolist() == [1.0, 1.05, 1.08]
@@ -9,20 +9,42 @@ Fuentes de datos (en orden de prioridad):
   1. Matba Rofex (scraping HTML - más rápido y confiable)
   2. XLS BCRA (backup - últimos 2 meses)
 
+La tabla A3500 se guarda en data/dolar_a3500.csv (fecha, tc_vendedor, fuente).
+Solo se consulta la red si alguna fecha necesaria no está cubierta por la
+caché; lo descargado se incorpora a la tabla local.
+
+La página de Matba Rofex se lee con un extractor rápido sobre lxml; si el
+formato de la tabla cambia, se usa el parser tolerante con BeautifulSoup.
+lxml, BeautifulSoup y xlrd (vía pandas.read_excel) se cargan recién cuando hay
+que ir a la red.
+
 Lógica:
   price_usd = precio / dolar_a3500_del_dia
   Si el día exacto no está en la tabla A3500, usa el último día hábil anterior.
+  La conversión es un as-of join vectorizado (merge_asof) sobre fechas ordenadas:
+  todas las filas pendientes se convierten en una sola pasada.
+
+Uso:
+  python usd_sync.py              agrega al CSV USD las filas nuevas
+  python usd_sync.py --backfill   recalcula price_usd para todo el histórico
+                                  (estación nueva con historia, o TC revisado)
 
 Se puede ejecutar manualmente o agregar al cron junto con nafta_tracker.py.
 """
 
+import numpy as np
 import pandas as pd
-import requests
 import io
 import os
+import argparse
 import warnings
 from datetime import datetime
-from bs4 import BeautifulSoup
+
+from descargas import leer_meta, actualizar_meta, obtener_sesion, primera_valida
+from metricas import etapa
+from perfilado import perfilar
+from analitica import actualizar_serie
+from base_sqlite import habilitada as sqlite_habilitada, sincronizar as sincronizar_sqlite
 
 # Suprimir advertencias de SSL
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
@@ -31,18 +53,78 @@ warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 DIR_DATA           = "data"
 ARCHIVO_PRECIOS    = os.path.join(DIR_DATA, "historico_precios.csv")
 ARCHIVO_USD        = os.path.join(DIR_DATA, "historico_precios_usd.csv")
+ARCHIVO_TC         = os.path.join(DIR_DATA, "dolar_a3500.csv")
 
 # ── FUENTES DEL DÓLAR A3500 ───────────────────────────────────────────────────
 URL_MATBA_ROFEX = "https://matbarofex.com.ar/DolarA3500/BuscarCotizacion"
 URL_XLS_BCRA = "https://www.bcra.gob.ar/archivos/Pdfs/PublicacionesEstadisticas/com3500.xls"
+INICIO_XLS = pd.Timestamp('2026-01-01')  # el XLS se recorta desde acá salvo que se pida antes
 
 
 def descargar_dolar_matbarofex() -> pd.DataFrame:
     print(f"  Scrapeando Matba Rofex: {URL_MATBA_ROFEX} ...")
-    resp = requests.get(URL_MATBA_ROFEX, timeout=20,
-                       headers={"User-Agent": "Mozilla/5.0"})
+    resp = obtener_sesion().get(URL_MATBA_ROFEX, timeout=20)
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, 'html.parser')
+    df, parser = parsear_matbarofex(resp.text)
+    print(f"  Matba Rofex OK ({parser}): {len(df)} filas, desde {df['fecha'].min().date()} hasta {df['fecha'].max().date()}")
+    return df
+
+
+def parsear_matbarofex(html: str) -> tuple:
+    """
+    Extrae (fecha, tc_vendedor) de la primera tabla de la página de Matba Rofex.
+    Prueba primero el extractor rápido con lxml; si la página no tiene el formato
+    esperado (o lxml no está instalado) usa el parser tolerante con BeautifulSoup.
+    Devuelve (DataFrame ordenado por fecha, nombre del parser usado).
+    """
+    try:
+        return _parsear_matbarofex_lxml(html), "lxml"
+    except (ImportError, ValueError) as e:
+        print(f"  ⚠️ Extractor rápido no aplicable ({e}); se usa BeautifulSoup")
+    return _parsear_matbarofex_bs4(html), "bs4"
+
+
+def _parsear_matbarofex_lxml(html: str) -> pd.DataFrame:
+    """
+    Camino rápido: lxml arma el árbol en C (elementos simples, sin las clases
+    de lxml.html) y las columnas se convierten directo a arrays tipados.
+    Es estricto: cualquier fila que no sea "dd/mm/aaaa | 1.234,5678" es un
+    cambio de formato y se delega al parser tolerante.
+    """
+    from lxml import etree
+
+    doc = etree.HTML(html)
+    tabla = doc.find('.//table') if doc is not None else None
+    if tabla is None:
+        raise ValueError("sin tabla")
+    fechas, tcs = [], []
+    # Igual que el parser tolerante: se saltea la primera fila (encabezado)
+    for fila in tabla.findall('.//tr')[1:]:
+        celdas = fila.findall('td')
+        if len(celdas) < 2:
+            continue
+        fecha = "".join(celdas[0].itertext()).strip()
+        if len(fecha) != 10 or fecha[2] != '/' or fecha[5] != '/':
+            raise ValueError(f"fecha con formato inesperado: {fecha!r}")
+        fechas.append(f"{fecha[6:]}-{fecha[3:5]}-{fecha[:2]}")
+        tcs.append("".join(celdas[1].itertext()).strip().replace('.', '').replace(',', '.'))
+    if not fechas:
+        raise ValueError("tabla sin filas de datos")
+
+    # np.array valida cada fecha/número: un valor inválido lanza ValueError
+    fecha = np.array(fechas, dtype='datetime64[D]').astype('datetime64[ns]')
+    tc = np.array(tcs, dtype=float)
+    if not np.isfinite(tc).all():
+        raise ValueError("tipo de cambio no numérico")
+    df = pd.DataFrame({'fecha': fecha, 'tc_vendedor': tc})
+    return df.sort_values('fecha', kind='stable').reset_index(drop=True)
+
+
+def _parsear_matbarofex_bs4(html: str) -> pd.DataFrame:
+    """Parser tolerante con BeautifulSoup: descarta las filas que no se pueden interpretar."""
+    from bs4 import BeautifulSoup  # solo hace falta si el extractor rápido no aplica
+
+    soup = BeautifulSoup(html, 'html.parser')
     table = soup.find('table')
     if not table:
         raise ValueError("No se encontró tabla en la página de Matba Rofex")
@@ -65,14 +147,12 @@ def descargar_dolar_matbarofex() -> pd.DataFrame:
     df['tc_vendedor'] = pd.to_numeric(df['tc_vendedor'], errors='coerce')
     df = df.dropna(subset=['fecha', 'tc_vendedor'])
     df = df.sort_values('fecha').reset_index(drop=True)
-    print(f"  Matba Rofex OK: {len(df)} filas, desde {df['fecha'].min().date()} hasta {df['fecha'].max().date()}")
     return df
 
 
-def descargar_dolar_xls() -> pd.DataFrame:
+def descargar_dolar_xls(desde: pd.Timestamp | None = None) -> pd.DataFrame:
     print(f"  Descargando XLS BCRA A3500 desde {URL_XLS_BCRA} ...")
-    resp = requests.get(URL_XLS_BCRA, timeout=30, verify=False,
-                        headers={"User-Agent": "Mozilla/5.0"})
+    resp = obtener_sesion().get(URL_XLS_BCRA, timeout=30, verify=False)
     resp.raise_for_status()
     xls = pd.read_excel(io.BytesIO(resp.content), sheet_name=0,
                        skiprows=3, engine="xlrd")
@@ -90,7 +170,7 @@ def descargar_dolar_xls() -> pd.DataFrame:
     df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce", dayfirst=True)
     df["tc_vendedor"] = pd.to_numeric(df["tc_vendedor"], errors="coerce")
     df = df.dropna(subset=["fecha", "tc_vendedor"])
-    fecha_inicio = pd.Timestamp('2026-01-01')
+    fecha_inicio = min(desde, INICIO_XLS) if desde is not None else INICIO_XLS
     fecha_hoy = pd.Timestamp(datetime.now().date())
     df = df[(df["fecha"] >= fecha_inicio) & (df["fecha"] <= fecha_hoy)]
     df = df.sort_values("fecha").reset_index(drop=True)
@@ -98,19 +178,119 @@ def descargar_dolar_xls() -> pd.DataFrame:
     return df
 
 
-def obtener_dolar_a3500() -> pd.DataFrame:
+def descargar_dolar_a3500(desde: pd.Timestamp | None = None) -> pd.DataFrame:
+    """
+    Descarga el A3500 de la red con columna `fuente`. Matba Rofex tiene prioridad;
+    el XLS BCRA se lanza en paralelo si Matba falla o tarda (hedging) y se usa
+    la primera respuesta válida.
+    """
     try:
-        return descargar_dolar_matbarofex()
-    except Exception as e_matba:
-        print(f"  Matba Rofex falló ({e_matba}), probando XLS ...")
+        fuente, df = primera_valida([
+            ("matbarofex", descargar_dolar_matbarofex),
+            ("bcra_xls", lambda: descargar_dolar_xls(desde)),
+        ])
+    except RuntimeError as e:
+        raise RuntimeError(f"No se pudo obtener el tipo de cambio A3500.\n{e}")
+    return df.assign(fuente=fuente)
+
+
+def cargar_cache_tc() -> pd.DataFrame:
+    """Tabla A3500 local (fecha, tc_vendedor, fuente), ordenada por fecha."""
+    if not os.path.exists(ARCHIVO_TC):
+        return pd.DataFrame({"fecha": pd.Series(dtype="datetime64[ns]"),
+                             "tc_vendedor": pd.Series(dtype=float),
+                             "fuente": pd.Series(dtype=object)})
+    df = pd.read_csv(ARCHIVO_TC, parse_dates=["fecha"])
+    return df.sort_values("fecha").reset_index(drop=True)
+
+
+def fechas_sin_cubrir(fechas, meta: dict) -> list:
+    """
+    Fechas cuyo TC no está resuelto en la caché. Una fecha está cubierta si cae
+    dentro del rango ya consultado [consultado_desde, consultado_hasta], que es
+    lo que las fuentes devolvieron de verdad: desde la primera fecha descargada
+    (o desde donde se pidió, si respondió el XLS BCRA, que trae la serie completa)
+    hasta el día de la consulta.
+    """
+    desde = pd.Timestamp(meta["consultado_desde"]) if meta.get("consultado_desde") else None
+    hasta = pd.Timestamp(meta["consultado_hasta"]) if meta.get("consultado_hasta") else None
+    faltantes = []
+    for fecha in pd.to_datetime(pd.Series(fechas)).dropna().dt.normalize().unique():
+        if desde is None or hasta is None or not (desde <= fecha <= hasta):
+            faltantes.append(pd.Timestamp(fecha))
+    return sorted(faltantes)
+
+
+def rango_consultado(nuevo: pd.DataFrame, desde: pd.Timestamp | None) -> pd.Timestamp | None:
+    """
+    Primera fecha que la descarga cubre de verdad. Si respondió el XLS BCRA (la
+    serie completa), desde donde se le pidió; si no, desde la primera fecha recibida.
+    """
+    if nuevo.empty:
+        return None
+    if (nuevo["fuente"] == "bcra_xls").any():
+        return min(desde, INICIO_XLS) if desde is not None else INICIO_XLS
+    return nuevo["fecha"].min()
+
+
+def obtener_dolar_a3500(fechas=None) -> pd.DataFrame:
+    """
+    Devuelve la tabla A3500 necesaria para convertir `fechas`.
+    Usa la caché local y solo va a la red si hay fechas sin cubrir
+    (sin `fechas`, siempre actualiza). Lo descargado se mezcla en la caché.
+    """
+    with etapa("tc_a3500") as m:
+        df_tc = _obtener_dolar_a3500(fechas, m)
+        m.anotar(filas=len(df_tc))
+    return df_tc
+
+
+def _obtener_dolar_a3500(fechas, m) -> pd.DataFrame:
+    cache = cargar_cache_tc()
+    meta = leer_meta(ARCHIVO_TC)
+    faltantes = fechas_sin_cubrir(fechas, meta) if fechas is not None else None
+
+    if faltantes == [] and not cache.empty:
+        print(f"  ♻️ A3500 desde caché local: {len(cache)} filas, hasta {cache['fecha'].max().date()} (sin red)")
+        m.anotar(red=False)
+        return cache
+
+    desde = faltantes[0] if faltantes else None
+    nuevo = descargar_dolar_a3500(desde)
+    nuevo = nuevo[["fecha", "tc_vendedor", "fuente"]]
+    m.anotar(red=True, fuente=nuevo["fuente"].iloc[0] if len(nuevo) else None, filas_descargadas=len(nuevo))
+
+    # Matba Rofex publica una ventana corta: lo pedido antes de esa ventana sale del XLS
+    if desde is not None and len(nuevo) and nuevo["fuente"].iloc[0] != "bcra_xls" and desde < nuevo["fecha"].min():
         try:
-            return descargar_dolar_xls()
-        except Exception as e_xls:
-            raise RuntimeError(
-                f"No se pudo obtener el tipo de cambio A3500.\n"
-                f"  Error Matba Rofex: {e_matba}\n"
-                f"  Error XLS BCRA: {e_xls}"
-            )
+            previo = descargar_dolar_xls(desde).assign(fuente="bcra_xls")
+            nuevo = pd.concat([previo[previo["fecha"] < nuevo["fecha"].min()], nuevo], ignore_index=True)
+            m.anotar(xls_previo=len(previo))
+        except Exception as e:
+            print(f"  ⚠️ XLS BCRA para fechas anteriores a Matba falló: {e}")
+
+    # Los valores recién descargados reemplazan a los cacheados (TC revisado)
+    combinado = (pd.concat([cache, nuevo], ignore_index=True)
+                 .drop_duplicates(subset="fecha", keep="last")
+                 .sort_values("fecha")
+                 .reset_index(drop=True))
+    os.makedirs(DIR_DATA, exist_ok=True)
+    combinado.to_csv(ARCHIVO_TC, index=False, date_format="%Y-%m-%d")
+
+    # Queda consultado solo lo que las fuentes devolvieron: no se vuelve a ir a la red por esas fechas
+    hoy = pd.Timestamp(datetime.now().date())
+    consultado_desde = rango_consultado(nuevo, desde)
+    if consultado_desde is not None:
+        previo_desde = pd.Timestamp(meta["consultado_desde"]) if meta.get("consultado_desde") else None
+        previo_hasta = pd.Timestamp(meta["consultado_hasta"]) if meta.get("consultado_hasta") else None
+        # El rango anterior se suma solo si no deja un hueco sin consultar en el medio
+        if previo_desde is not None and previo_hasta is not None and previo_hasta + pd.Timedelta(days=1) >= consultado_desde:
+            consultado_desde = min(consultado_desde, previo_desde)
+        actualizar_meta(ARCHIVO_TC,
+                        consultado_desde=str(consultado_desde.date()),
+                        consultado_hasta=str(hoy.date()))
+    print(f"  ✅ Caché A3500 actualizada: {len(combinado) - len(cache)} fecha(s) nueva(s), {len(combinado)} en total")
+    return combinado
 
 
 def _detectar_columna(df: pd.DataFrame, candidatos: list) -> str | None:
@@ -125,17 +305,66 @@ def _detectar_columna(df: pd.DataFrame, candidatos: list) -> str | None:
 
 
 def get_tc_para_fecha(fecha: pd.Timestamp, df_tc: pd.DataFrame) -> float | None:
-    df_prev = df_tc[df_tc["fecha"] <= fecha]
-    if df_prev.empty:
+    """TC del día o del último día hábil anterior (búsqueda binaria; df_tc ordenado por fecha)."""
+    i = df_tc["fecha"].searchsorted(fecha, side="right")
+    if i == 0:
         return None
-    return float(df_prev.iloc[-1]["tc_vendedor"])
+    return float(df_tc["tc_vendedor"].iloc[i - 1])
+
+
+def orden_en_dia(fechas: pd.Series) -> pd.Series:
+    """Posición de cada fila entre las de su mismo día (0, 1, ... si el precio cambió en el día)."""
+    return fechas.groupby(fechas.dt.date, dropna=False).cumcount()
+
+
+def _clave_en_dia(fechas: pd.Series) -> pd.MultiIndex:
+    return pd.MultiIndex.from_arrays([fechas.dt.date, orden_en_dia(fechas)])
+
+
+def convertir_a_usd(df_precios: pd.DataFrame, df_tc: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega columnas tc_a3500 y price_usd a todas las filas de una vez.
+    As-of join hacia atrás: cada fecha_chequeo toma el último TC con fecha <= a ella.
+    Conserva el orden original de las filas.
+    """
+    df = df_precios.reset_index(drop=True)
+    tc = (df_tc[["fecha", "tc_vendedor"]].dropna()
+          .sort_values("fecha")
+          .rename(columns={"fecha": "_fecha_tc", "tc_vendedor": "tc_a3500"}))
+    claves = df[["fecha_chequeo"]].assign(_pos=range(len(df)))
+    validas = claves.dropna(subset=["fecha_chequeo"]).sort_values("fecha_chequeo")
+    unidas = pd.merge_asof(validas, tc, left_on="fecha_chequeo", right_on="_fecha_tc",
+                           direction="backward")
+    tc_por_fila = pd.Series(float("nan"), index=df.index)
+    tc_por_fila.iloc[unidas["_pos"].to_numpy()] = unidas["tc_a3500"].to_numpy()
+    df["tc_a3500"] = tc_por_fila
+    tc_valido = df["tc_a3500"].where(df["tc_a3500"] > 0)
+    df["price_usd"] = (df["precio"] / tc_valido).round(4)
+    return df
+
+
+def sincronizar_usd(backfill: bool = False, df_tc: pd.DataFrame | None = None, perfil: str | None = None):
+    """
+    Función principal: lee el CSV de precios, calcula price_usd y actualiza el CSV USD.
+    Con backfill=True recalcula price_usd para todo el histórico y reescribe el CSV USD.
+    `df_tc` permite pasar una tabla A3500 ya obtenida y evitar la descarga.
+    `perfil` ('cprofile' o 'muestreo', por defecto NAFTA_PERFIL) guarda el perfil en data/perfiles/.
+    Con NAFTA_SQLITE, el CSV USD y el A3500 también se suben a la base (base_sqlite.py).
+    """
+    with perfilar("usd_sync", perfil), etapa("usd_total", backfill=backfill):
+        _sincronizar_usd(backfill, df_tc)
+        if sqlite_habilitada():
+            try:
+                with etapa("usd_sqlite") as m:
+                    m.anotar(filas=sum(sincronizar_sqlite([ARCHIVO_USD]).values()))
+            except Exception as e:
+                print(f"⚠️ Base SQLite falló: {e}")
 
 
-def sincronizar_usd():
-    """Función principal: lee el CSV de precios, calcula price_usd y actualiza el CSV USD."""
+def _sincronizar_usd(backfill: bool, df_tc: pd.DataFrame | None):
 
     print(f"\n{'='*60}")
-    print(f"  USD SYNC — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"  USD SYNC{' (BACKFILL)' if backfill else ''} — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}")
 
     # ── 1. Verificar que existe el CSV de precios ──────────────────────────────
@@ -145,9 +374,11 @@ def sincronizar_usd():
 
     # ── 2. Cargar CSV de precios ───────────────────────────────────────────────
     print("\n[1/4] Cargando CSV de precios ...")
-    df_precios = pd.read_csv(ARCHIVO_PRECIOS)
-    df_precios["fecha_chequeo"] = pd.to_datetime(df_precios["fecha_chequeo"], errors="coerce")
-    df_precios["precio"] = pd.to_numeric(df_precios["precio"], errors="coerce")
+    with etapa("usd_lectura") as m:
+        df_precios = pd.read_csv(ARCHIVO_PRECIOS)
+        df_precios["fecha_chequeo"] = pd.to_datetime(df_precios["fecha_chequeo"], errors="coerce")
+        df_precios["precio"] = pd.to_numeric(df_precios["precio"], errors="coerce")
+        m.anotar(bytes=os.path.getsize(ARCHIVO_PRECIOS), filas=len(df_precios))
     print(f"  {len(df_precios)} filas en {ARCHIVO_PRECIOS}")
 
     # ── 3. Cargar CSV USD existente (si existe) ────────────────────────────────
@@ -155,47 +386,62 @@ def sincronizar_usd():
     if os.path.exists(ARCHIVO_USD):
         df_usd = pd.read_csv(ARCHIVO_USD)
         df_usd["fecha_chequeo"] = pd.to_datetime(df_usd["fecha_chequeo"], errors="coerce")
-        fechas_ya_en_usd = set(df_usd["fecha_chequeo"].dt.date.dropna())
+        fechas_ya_en_usd = df_usd["fecha_chequeo"].dt.date.value_counts()
         print(f"  {len(df_usd)} filas ya en {ARCHIVO_USD}")
     else:
         df_usd = pd.DataFrame(columns=list(df_precios.columns) + ["price_usd"])
-        fechas_ya_en_usd = set()
+        fechas_ya_en_usd = pd.Series(dtype=int)
         print(f"  Archivo {ARCHIVO_USD} no existe, se creará.")
 
-    # ── 4. Detectar filas nuevas ───────────────────────────────────────────────
-    filas_nuevas = df_precios[
-        ~df_precios["fecha_chequeo"].dt.date.isin(fechas_ya_en_usd)
-    ].copy()
+    # ── 4. Detectar filas a convertir ──────────────────────────────────────────
+    if backfill:
+        filas_nuevas = df_precios.copy()
+        print(f"\n[3/4] Backfill: se recalculan {len(filas_nuevas)} fila(s).")
+    else:
+        # Un día puede tener más de una fila (precio que cambió en el día): se cuentan por fecha
+        dias = df_precios["fecha_chequeo"].dt.date
+        filas_nuevas = df_precios[
+            orden_en_dia(df_precios["fecha_chequeo"]) >= dias.map(fechas_ya_en_usd).fillna(0)
+        ].copy()
 
-    if filas_nuevas.empty:
-        print("\n✅ El CSV USD ya está al día. No hay filas nuevas para agregar.")
-        return
+        if filas_nuevas.empty:
+            print("\n✅ El CSV USD ya está al día. No hay filas nuevas para agregar.")
+            actualizar_analitica_usd(df_usd)
+            return
 
-    print(f"\n[3/4] {len(filas_nuevas)} fila(s) nueva(s) detectada(s):")
-    for _, r in filas_nuevas.iterrows():
-        print(f"  → {r['fecha_chequeo'].date()} | precio: ${r['precio']}")
+        print(f"\n[3/4] {len(filas_nuevas)} fila(s) nueva(s) detectada(s):")
+        for fecha, precio in zip(filas_nuevas["fecha_chequeo"], filas_nuevas["precio"]):
+            print(f"  → {fecha.date()} | precio: ${precio}")
 
     # ── 5. Obtener tipo de cambio A3500 ────────────────────────────────────────
     print("\n[4/4] Obteniendo tipo de cambio A3500 ...")
-    df_tc = obtener_dolar_a3500()
-
-    # ── 6. Calcular price_usd para cada fila nueva ────────────────────────────
-    resultados = []
-    for _, fila in filas_nuevas.iterrows():
-        fecha = fila["fecha_chequeo"]
-        precio_ars = fila["precio"]
-        tc = get_tc_para_fecha(fecha, df_tc)
-        if tc is None or tc == 0:
-            print(f"  ⚠️  Sin TC para {fecha.date()} — se asigna NaN")
-            price_usd = float("nan")
-        else:
-            price_usd = round(precio_ars / tc, 4)
-            print(f"  ✓  {fecha.date()} | ${precio_ars} ARS / {tc:.2f} A3500 = ${price_usd:.4f} USD")
-        fila_nueva = fila.copy()
-        fila_nueva["price_usd"] = price_usd
-        resultados.append(fila_nueva)
-
-    df_nuevas_usd = pd.DataFrame(resultados)
+    if df_tc is None:
+        df_tc = obtener_dolar_a3500(filas_nuevas["fecha_chequeo"])
+
+    # ── 6. Calcular price_usd para todas las filas en una pasada ──────────────
+    with etapa("usd_conversion", filas=len(filas_nuevas)):
+        df_nuevas_usd = convertir_a_usd(filas_nuevas, df_tc)
+
+    if backfill:
+        # Donde no hay TC disponible se conserva el valor ya calculado
+        if "price_usd" in df_usd.columns and not df_usd.empty:
+            # Misma clave que el camino incremental: (día, orden dentro del día), porque un día
+            # con varias filas tiene un price_usd distinto por fila
+            usd_previo = df_usd.dropna(subset=["fecha_chequeo"])
+            previos = pd.Series(usd_previo["price_usd"].to_numpy(), index=_clave_en_dia(usd_previo["fecha_chequeo"]))
+            conservados = previos.reindex(_clave_en_dia(df_nuevas_usd["fecha_chequeo"])).to_numpy()
+            df_nuevas_usd["price_usd"] = df_nuevas_usd["price_usd"].fillna(
+                pd.Series(conservados, index=df_nuevas_usd.index))
+        sin_tc = df_nuevas_usd["tc_a3500"].isna().sum()
+        print(f"  ✓  {len(df_nuevas_usd) - sin_tc} fila(s) recalculada(s), {sin_tc} sin TC (se conserva el valor previo)")
+    else:
+        for fecha, precio_ars, tc, price_usd in zip(df_nuevas_usd["fecha_chequeo"], df_nuevas_usd["precio"],
+                                                     df_nuevas_usd["tc_a3500"], df_nuevas_usd["price_usd"]):
+            if pd.isna(price_usd):
+                print(f"  ⚠️  Sin TC para {fecha.date()} — se asigna NaN")
+            else:
+                print(f"  ✓  {fecha.date()} | ${precio_ars} ARS / {tc:.2f} A3500 = ${price_usd:.4f} USD")
+    df_nuevas_usd = df_nuevas_usd.drop(columns="tc_a3500")
 
     # ── 7. Asegurar orden de columnas igual al CSV USD ─────────────────────────
     if "price_usd" not in df_usd.columns:
@@ -207,8 +453,37 @@ def sincronizar_usd():
     df_nuevas_usd = df_nuevas_usd.reindex(columns=cols_finales)
 
     # ── 8. Escribir al CSV USD ─────────────────────────────────────────────────
+    with etapa("usd_escritura", filas=len(df_nuevas_usd)) as m:
+        escribir_usd(df_nuevas_usd, backfill)
+        m.anotar(bytes=os.path.getsize(ARCHIVO_USD))
+
+    # ── 9. Estadísticas rodantes en USD (solo las filas nuevas) ────────────────
+    # Sin CSV USD previo df_usd está vacío: se deja afuera del concat (FutureWarning de pandas)
+    partes = [df_nuevas_usd] if backfill else [d for d in (df_usd, df_nuevas_usd) if not d.empty]
+    completo = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+    actualizar_analitica_usd(completo)
+
+
+def actualizar_analitica_usd(df_usd: pd.DataFrame):
+    """Actualiza las estadísticas rodantes de price_usd a partir del CSV USD ya cargado."""
+    if df_usd.empty or "price_usd" not in df_usd.columns:
+        return None
+    fechas = pd.to_datetime(df_usd["fecha_chequeo"], errors="coerce")
+    orden = fechas.sort_values(kind="stable").index
+    return actualizar_serie(ARCHIVO_USD, "price_usd",
+                            fechas.loc[orden].dt.strftime("%Y-%m-%d").fillna("").tolist(),
+                            pd.to_numeric(df_usd.loc[orden, "price_usd"], errors="coerce").tolist())
+
+
+def escribir_usd(df_nuevas_usd: pd.DataFrame, backfill: bool) -> None:
+    """Reescribe (backfill) o agrega al final del CSV USD las filas convertidas."""
     os.makedirs(DIR_DATA, exist_ok=True)
 
+    if backfill:
+        df_nuevas_usd.to_csv(ARCHIVO_USD, index=False)
+        print(f"\n✅ {ARCHIVO_USD} regenerado con {len(df_nuevas_usd)} fila(s)")
+        return
+
     if os.path.exists(ARCHIVO_USD):
         with open(ARCHIVO_USD, 'rb') as f:
             f.seek(-1, 2)
@@ -225,5 +500,11 @@ def sincronizar_usd():
 
 
 if __name__ == "__main__":
-    sincronizar_usd()
+    parser = argparse.ArgumentParser(description="Sincroniza el CSV de precios en USD (A3500).")
+    parser.add_argument("--backfill", action="store_true",
+                        help="recalcula price_usd para todo el histórico y reescribe el CSV USD")
+    parser.add_argument("--perfil", choices=("cprofile", "muestreo"),
+                        help="perfilar la corrida (resultado en data/perfiles/)")
+    args = parser.parse_args()
+    sincronizar_usd(backfill=args.backfill, perfil=args.perfil)
   